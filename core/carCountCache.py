@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: carCountCache.py
+Description: This script defines the CarCountCache, which keeps the number of
+ cars matching each combination of listing filters. A count is computed once
+ with COUNT(*), then kept up to date as cars are created and deleted, so the
+ totals of paginated listings cost nothing after the first request.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import threading
+from collections import OrderedDict
+from .database import config
+
+# Car columns the listing filters on, in the order of the cache keys
+FILTER_COLUMNS = ("size", "doors", "fuel", "transmission")
+
+
+class CarCountCache:
+  """
+  Least recently used cache of car counts per filter combination.
+
+  Attributes:
+    maxEntries (int): The maximum number of filter combinations kept.
+    counts (OrderedDict): The counts, by filter values, least recently used
+      first.
+  """
+
+  def __init__(self, maxEntries: int):
+    """
+    Initialize an empty cache.
+
+    Args:
+      maxEntries (int): The maximum number of filter combinations kept.
+    """
+    self.maxEntries = maxEntries
+    self.counts = OrderedDict()
+    # Bumped on every invalidation and adjustment, so that counts computed
+    # before one are not stored
+    self.generation = 0
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def key(filters: dict) -> tuple:
+    """
+    Build the cache key of listing filters; empty filters match every car.
+
+    Args:
+      filters (dict): The filters, as accepted by applyCarFilters.
+
+    Returns:
+      tuple: The filter values, None for the unused ones.
+    """
+    return tuple(filters.get(column) or None for column in FILTER_COLUMNS)
+
+  def get(self, filters: dict) -> int | None:
+    """
+    Read the count of cars matching the filters.
+
+    Args:
+      filters (dict): The listing filters.
+
+    Returns:
+      int | None: The count, or None if it is not cached.
+    """
+    key = self.key(filters)
+    with self._lock:
+      count = self.counts.get(key)
+      if count is not None:
+        self.counts.move_to_end(key)
+      return count
+
+  def set(self, filters: dict, count: int, generation: int):
+    """
+    Store a count computed from the database.
+
+    Args:
+      filters (dict): The listing filters.
+      count (int): The number of matching cars.
+      generation (int): The generation read before counting; the count is
+        dropped if the cache was invalidated or adjusted since.
+    """
+    with self._lock:
+      if generation != self.generation:
+        return
+      self.counts[self.key(filters)] = count
+      self.counts.move_to_end(self.key(filters))
+      while len(self.counts) > self.maxEntries:
+        self.counts.popitem(last=False)
+
+  def adjust(self, car: dict, delta: int):
+    """
+    Add a created car to, or remove a deleted car from, the counts of the
+    filters it matches.
+
+    Args:
+      car (dict): The car columns.
+      delta (int): 1 for a created car, -1 for a deleted one.
+    """
+    values = tuple(car.get(column) for column in FILTER_COLUMNS)
+    with self._lock:
+      for key in self.counts:
+        if all(filterValue is None or filterValue == value
+               for filterValue, value in zip(key, values)):
+          self.counts[key] += delta
+      # A count running concurrently may have missed this car
+      self.generation += 1
+
+  def invalidate(self):
+    """
+    Drop every count, after changes the cache cannot follow, such as updates
+    that move cars between filters.
+    """
+    with self._lock:
+      self.counts.clear()
+      self.generation += 1
+
+
+### Global Variables ###
+carCountCache = CarCountCache(maxEntries=config.CAR_COUNT_CACHE_SIZE)
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: carIndex.py
+Description: This script defines an optional in-memory columnar mirror of the
+ car table. Each car column is kept in a NumPy array, with the string columns
+ dictionary encoded, so filtered listings and facet counts become vectorized
+ mask operations instead of database queries.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from threading import RLock
+from sqlmodel import Session, select
+from models import Car
+from models.carCodeModel import encodeCarValue
+from .database import config
+
+try:
+  import numpy as np
+except ImportError:  # NumPy is optional, the index stays disabled without it
+  np = None
+
+# Code used for missing (None) values in the encoded columns
+NULL_CODE = -1
+
+
+def _facetOrder(column: str, value: str | int | None) -> tuple:
+  """
+  Get the sort key of a facet value, following SQL's ORDER BY on the column:
+  doors by number, the enumerated columns by their stored code (the order of
+  CAR_VALUES), and missing values last.
+
+  Args:
+    column (str): The facet column.
+    value (str | int, optional): The facet value.
+
+  Returns:
+    tuple: The sort key.
+  """
+  if value is None:
+    return (1, 0)
+  return (0, value if column == "doors" else encodeCarValue(column, value))
+
+
+class CarIndex:
+  """
+  In-memory columnar index of the car table.
+
+  The index is "cold" until load() is called and becomes cold again after
+  invalidate(). While cold every read method returns None, so callers fall
+  back to SQL. Writers keep a warm index current through upsert() and remove()
+  after their transaction commits.
+
+  The Car objects returned by query() are built once per row and shared by
+  every reader, so they must be treated as read-only.
+
+  Attributes:
+    enabled (bool): Whether the index is turned on and NumPy is available.
+    ready (bool): Whether the index is loaded (warm).
+    ENCODED_COLUMNS (tuple[str]): The dictionary encoded string columns.
+  """
+  ENCODED_COLUMNS = ("size", "fuel", "transmission")
+
+  def __init__(self, enabled: bool):
+    """
+    Initialize an empty, cold index.
+
+    Args:
+      enabled (bool): Whether the index should be used at all.
+    """
+    self.enabled = enabled and np is not None
+    self.ready = False
+    self._lock = RLock()
+    if self.enabled:
+      self._reset(0)
+
+  def _reset(self, capacity: int):
+    """
+    Drop every row and allocate empty columns for `capacity` rows.
+
+    Args:
+      capacity (int): The number of rows to allocate.
+    """
+    self.length = 0
+    self.deleted = 0
+    self.positions = {}
+    self.cars = [None] * capacity
+    self.ids = np.zeros(capacity, dtype=np.int64)
+    self.alive = np.zeros(capacity, dtype=bool)
+    self.doors = np.full(capacity, NULL_CODE, dtype=np.int32)
+    self.codes = {
+        name: np.full(capacity, NULL_CODE, dtype=np.int32)
+        for name in self.ENCODED_COLUMNS
+    }
+    self.dictionaries = {name: [] for name in self.ENCODED_COLUMNS}
+    self.lookups = {name: {} for name in self.ENCODED_COLUMNS}
+
+  def _grow(self, capacity: int):
+    """
+    Enlarge every column to hold at least `capacity` rows.
+
+    Args:
+      capacity (int): The minimum number of rows to hold.
+    """
+    if capacity <= len(self.ids):
+      return
+    capacity = max(capacity, 2 * len(self.ids), 1024)
+    extra = capacity - len(self.ids)
+    self.cars.extend([None] * extra)
+    self.ids = np.concatenate([self.ids, np.zeros(extra, dtype=np.int64)])
+    self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+    self.doors = np.concatenate(
+        [self.doors, np.full(extra, NULL_CODE, dtype=np.int32)])
+    for name in self.ENCODED_COLUMNS:
+      self.codes[name] = np.concatenate(
+          [self.codes[name],
+           np.full(extra, NULL_CODE, dtype=np.int32)])
+
+  def _encode(self, name: str, value: str | None) -> int:
+    """
+    Get the dictionary code of a value, adding it to the dictionary if new.
+
+    Args:
+      name (str): The encoded column name.
+      value (str, optional): The value to encode.
+
+    Returns:
+      int: The code of the value.
+    """
+    if value is None:
+      return NULL_CODE
+    lookup = self.lookups[name]
+    if value not in lookup:
+      lookup[value] = len(self.dictionaries[name])
+      self.dictionaries[name].append(value)
+    return lookup[value]
+
+  def _write(self, row: int, values: dict):
+    """
+    Store the values of a car in the given row.
+
+    Args:
+      row (int): The row to write.
+      values (dict): The car column values, including its id.
+    """
+    self.ids[row] = values["id"]
+    self.alive[row] = True
+    # Drop the cached Car, it is rebuilt from the columns on the next read
+    self.cars[row] = None
+    doors = values.get("doors")
+    self.doors[row] = NULL_CODE if doors is None else doors
+    for name in self.ENCODED_COLUMNS:
+      self.codes[name][row] = self._encode(name, values.get(name))
+    self.positions[values["id"]] = row
+
+  def _compact(self):
+    """
+    Drop the rows of deleted cars once they take up half of the index.
+    """
+    if self.deleted * 2 < self.length:
+      return
+    keep = np.flatnonzero(self.alive[:self.length])
+    self.cars = [self.cars[row] for row in keep.tolist()]
+    self.ids = self.ids[keep]
+    self.alive = self.alive[keep]
+    self.doors = self.doors[keep]
+    for name in self.ENCODED_COLUMNS:
+      self.codes[name] = self.codes[name][keep]
+    self.length = len(keep)
+    self.deleted = 0
+    self.positions = {int(carId): row for row, carId in enumerate(self.ids)}
+
+  def load(self, session: Session):
+    """
+    Load every car from the database and mark the index as warm.
+
+    Args:
+      session (Session): The database session.
+    """
+    if not self.enabled:
+      return
+    query = select(Car.id, Car.size, Car.fuel, Car.doors, Car.transmission)
+    rows = session.exec(query).all()
+    with self._lock:
+      self._reset(len(rows))
+      for row, (carId, size, fuel, doors, transmission) in enumerate(rows):
+        self._write(
+            row, {
+                "id": carId,
+                "size": size,
+                "fuel": fuel,
+                "doors": doors,
+                "transmission": transmission
+            })
+      self.length = len(rows)
+      self.ready = True
+
+  def invalidate(self):
+    """
+    Mark the index as cold, so reads fall back to SQL until the next load.
+    """
+    with self._lock:
+      self.ready = False
+
+  def upsert(self, values: dict):
+    """
+    Insert or replace a car in a warm index.
+
+    Args:
+      values (dict): The car column values, including its id.
+    """
+    if not self.ready:
+      return
+    with self._lock:
+      row = self.positions.get(values["id"])
+      if row is None:
+        self._grow(self.length + 1)
+        row = self.length
+        self.length += 1
+      self._write(row, values)
+
+  def remove(self, carId: int):
+    """
+    Remove a car from a warm index.
+
+    Args:
+      carId (int): The ID of the car to remove.
+    """
+    if not self.ready:
+      return
+    with self._lock:
+      row = self.positions.pop(carId, None)
+      if row is None:
+        return
+      self.alive[row] = False
+      self.deleted += 1
+      self._compact()
+
+  def refresh(self, session: Session, carId: int | None):
+    """
+    Reread a car changed by another worker, or the whole table.
+
+    Args:
+      session (Session): The database session.
+      carId (int, optional): The ID of the changed car, None to reload every
+        car.
+    """
+    if carId is None:
+      self.load(session)
+      return
+    if not self.ready:
+      return
+    query = select(Car.id, Car.size, Car.fuel, Car.doors,
+                   Car.transmission).where(Car.id == carId)
+    row = session.exec(query).one_or_none()
+    if row is None:
+      self.remove(carId)
+    else:
+      self.upsert(row._asdict())
+
+  def _mask(self, size, doors, fuel, transmission):
+    """
+    Build the boolean mask of the live rows matching the filters.
+
+    Returns:
+      ndarray: The mask over the first `length` rows.
+    """
+    mask = self.alive[:self.length].copy()
+    if doors:
+      mask &= self.doors[:self.length] == doors
+    for name, value in (("size", size), ("fuel", fuel), ("transmission",
+                                                         transmission)):
+      if not value:
+        continue
+      code = self.lookups[name].get(value)
+      if code is None:
+        # The value was never stored, so nothing can match it
+        mask[:] = False
+        break
+      mask &= self.codes[name][:self.length] == code
+    return mask
+
+  def query(self,
+            size: str | None = None,
+            doors: int | None = None,
+            fuel: str | None = None,
+            transmission: str | None = None) -> list[Car] | None:
+    """
+    Get the cars matching the filters, or None when the index is cold.
+
+    Args:
+      size (str, optional): The size to filter cars by.
+      doors (int, optional): The number of doors to filter cars by.
+      fuel (str, optional): The fuel type to filter cars by.
+      transmission (str, optional): The transmission to filter cars by.
+
+    Returns:
+      list[Car] | None: The matching cars, ordered by ID.
+    """
+    if not self.ready:
+      return None
+    with self._lock:
+      rows = np.flatnonzero(self._mask(size, doors, fuel, transmission))
+      rows = rows[np.argsort(self.ids[rows], kind="stable")]
+      cars = []
+      for row in rows.tolist():
+        car = self.cars[row]
+        if car is None:
+          car = self.cars[row] = self._build(row)
+        cars.append(car)
+    return cars
+
+  def _build(self, row: int) -> Car:
+    """
+    Build the Car stored in a row, skipping validation since the values were
+    already validated on their way to the database.
+
+    Args:
+      row (int): The row to build the car from.
+
+    Returns:
+      Car: The car stored in the row.
+    """
+    values = {"id": int(self.ids[row])}
+    doors = int(self.doors[row])
+    values["doors"] = None if doors == NULL_CODE else doors
+    for name in self.ENCODED_COLUMNS:
+      code = int(self.codes[name][row])
+      values[name] = None if code == NULL_CODE else self.dictionaries[name][code]
+    return Car.model_construct(**values)
+
+  def facets(self, filters: dict) -> dict | None:
+    """
+    Count the cars per value of every column, or None when the index is cold.
+
+    Each column is counted with every filter applied except its own, as the
+    facets endpoint does in SQL.
+
+    Args:
+      filters (dict): The size, doors, fuel and transmission filters.
+
+    Returns:
+      dict | None: The (value, count) pairs of each column, sorted by value.
+    """
+    if not self.ready:
+      return None
+    facets = {}
+    with self._lock:
+      for name in ("size", "fuel", "doors", "transmission"):
+        mask = self._mask(**{**filters, name: None})
+        if name == "doors":
+          values, counts = np.unique(self.doors[:self.length][mask],
+                                     return_counts=True)
+          pairs = [(None if value == NULL_CODE else value, count)
+                   for value, count in zip(values.tolist(), counts.tolist())]
+        else:
+          codes = self.codes[name][:self.length][mask]
+          # Shift by one so that NULL_CODE lands in bin 0
+          counts = np.bincount(codes + 1,
+                               minlength=len(self.dictionaries[name]) + 1)
+          pairs = [(None if code == 0 else self.dictionaries[name][code - 1],
+                    count)
+                   for code, count in enumerate(counts.tolist())
+                   if count]
+        facets[name] = sorted(pairs,
+                              key=lambda pair: _facetOrder(name, pair[0]))
+    return facets
+
+
+### Global Variables ###
+carIndex = CarIndex(enabled=config.CAR_INDEX_ENABLED)
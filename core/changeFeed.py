@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: changeFeed.py
+Description: This script defines the ChangeFeed, an in-memory feed of the car
+ and trip mutations. Events carry monotonically increasing sequence numbers and
+ are kept in a bounded ring buffer, from which every subscriber reads at its own
+ pace, so clients can resume from the last event they saw.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import asyncio
+import time
+from collections import deque
+from threading import Lock
+from .database import config
+
+
+class ChangeFeed:
+  """
+  Bounded, sequenced feed of mutation events.
+
+  Publishers call publish() from any thread. Subscribers never hold events of
+  their own: they read the shared ring buffer from their last sequence number,
+  so a slow consumer cannot make the feed grow. A consumer that falls further
+  behind than the buffer holds receives a "reset" event and should reload its
+  state before following the feed again.
+
+  Attributes:
+    capacity (int): The number of events kept in the ring buffer.
+    lastSeq (int): The sequence number of the last published event.
+  """
+
+  def __init__(self, capacity: int):
+    """
+    Initialize an empty feed.
+
+    Args:
+      capacity (int): The number of events kept in the ring buffer.
+    """
+    self.capacity = capacity
+    self.lastSeq = 0
+    self._events = deque(maxlen=capacity)
+    self._lock = Lock()
+    self._waiters = set()
+
+  def publish(self,
+              entity: str,
+              action: str,
+              id: int,
+              data: dict | None = None) -> dict:
+    """
+    Append an event to the feed and wake up the subscribers.
+
+    Args:
+      entity (str): The mutated entity ("car" or "trip").
+      action (str): The mutation ("created", "updated" or "deleted").
+      id (int): The ID of the mutated entity.
+      data (dict, optional): The new state of the entity.
+
+    Returns:
+      dict: The published event.
+    """
+    with self._lock:
+      self.lastSeq += 1
+      event = {
+          "seq": self.lastSeq,
+          "entity": entity,
+          "action": action,
+          "id": id,
+          "data": data,
+          "timestamp": time.time()
+      }
+      self._events.append(event)
+      waiters = list(self._waiters)
+
+    for loop, wakeUp in waiters:
+      try:
+        loop.call_soon_threadsafe(wakeUp.set)
+      except RuntimeError:
+        # The subscriber's event loop is closed, it will not read anymore
+        self._waiters.discard((loop, wakeUp))
+    return event
+
+  def since(self, lastSeq: int) -> tuple[list[dict], bool]:
+    """
+    Get the events published after a sequence number.
+
+    Args:
+      lastSeq (int): The sequence number of the last event already seen.
+
+    Returns:
+      tuple[list[dict], bool]: The newer events, and whether some events
+        between `lastSeq` and the oldest kept event were lost. A `lastSeq`
+        ahead of the feed comes from another process (a restarted or a
+        different worker), so it is reported as lost along with every kept
+        event.
+    """
+    with self._lock:
+      if lastSeq > self.lastSeq:
+        return list(self._events), True
+      if not self._events or lastSeq == self.lastSeq:
+        return [], False
+      oldestSeq = self._events[0]["seq"]
+      missed = lastSeq < oldestSeq - 1
+      skip = max(0, lastSeq - oldestSeq + 1)
+      return list(self._events)[skip:], missed
+
+  async def subscribe(self, lastSeq: int | None, heartbeat: float):
+    """
+    Follow the feed from a sequence number, until the caller stops iterating.
+
+    Args:
+      lastSeq (int, optional): The last sequence number already seen; None to
+        follow only the events published from now on.
+      heartbeat (float): Seconds without events after which None is yielded,
+        so the caller can keep the connection alive.
+
+    Yields:
+      dict | None: The next event, or None as a heartbeat.
+    """
+    if lastSeq is None:
+      lastSeq = self.lastSeq
+    wakeUp = asyncio.Event()
+    waiter = (asyncio.get_running_loop(), wakeUp)
+    self._waiters.add(waiter)
+    try:
+      while True:
+        wakeUp.clear()
+        events, missed = self.since(lastSeq)
+        if missed:
+          lastSeq = events[0]["seq"] - 1 if events else 0
+          yield {
+              "seq": lastSeq,
+              "entity": None,
+              "action": "reset",
+              "id": None,
+              "data": None,
+              "timestamp": time.time()
+          }
+        for event in events:
+          lastSeq = event["seq"]
+          yield event
+        if events:
+          continue
+        try:
+          await asyncio.wait_for(wakeUp.wait(), timeout=heartbeat)
+        except asyncio.TimeoutError:
+          yield None
+    finally:
+      self._waiters.discard(waiter)
+
+
+### Global Variables ###
+changeFeed = ChangeFeed(capacity=config.CHANGE_FEED_CAPACITY)
@@ -11,8 +11,12 @@ Contact Information: mathteixeira55
 
 ### Imports ###
 from dotenv import load_dotenv
+import json
 import os
 
+# Modes of the total count of paginated car listings
+CAR_COUNT_MODES = ("exact", "estimate", "cached", "none")
+
 
 class Config:
   """
@@ -24,11 +28,111 @@ class Config:
     DB_HOST (str): Database host.
     DB_PORT (str): Database port.
     DB_NAME (str): Database name.
+    DB_DRIVER (str): PostgreSQL driver, psycopg2 or psycopg (version 3).
+    DB_STATEMENT_CACHE_SIZE (int): Compiled statements cached by the engine.
+    DB_PREPARE_THRESHOLD (int, optional): Executions after which psycopg 3
+      prepares a statement on the server (None to never prepare, as needed
+      behind PgBouncer in transaction mode).
+    CAR_INDEX_ENABLED (bool): Whether car listings are served from the
+      in-memory columnar car index.
+    CHANGE_FEED_CAPACITY (int): Number of events kept by the change feed.
+    CHANGE_FEED_HEARTBEAT (float): Seconds between change feed keep-alives.
+    TRIP_QUEUE_SIZE (int): Maximum number of trips waiting to be written.
+    TRIP_QUEUE_BATCH_SIZE (int): Maximum number of trips written per insert.
+    TRIP_QUEUE_FLUSH_INTERVAL (float): Maximum seconds a queued trip waits.
+    TRIP_QUEUE_DRAIN_TIMEOUT (float): Maximum seconds the shutdown waits for
+      the queued trips to be written.
+    PASSWORD_HASH_WORKERS (int, optional): Processes hashing passwords in bulk
+      (None for one per usable core). The pool is created once per server
+      worker, with this many processes.
+    USER_PROVISIONING_BATCH_SIZE (int): Maximum number of users per insert.
+    PROFILER_ENABLED (bool): Whether requests may be profiled.
+    PROFILER_TOKEN (str, optional): X-Profile header value forcing a capture.
+    PROFILER_SAMPLE_RATE (float): Fraction of requests profiled at random.
+    PROFILER_DIR (str): Directory the request profiles are written to.
+    PROFILER_MAX_BYTES (int): Maximum disk usage of the profile directory.
+    PROFILER_MAX_CONCURRENT (int): Maximum number of simultaneous captures.
+    PROFILER_INTERVAL (float): Seconds between two stack samples.
+    SERVER_HOST (str): Address the production server binds to.
+    SERVER_PORT (int): Port the production server listens on.
+    SERVER_WORKERS (int, optional): Worker processes (None for one per core).
+    SERVER_KEEP_ALIVE (int): Seconds an idle keep-alive connection is kept.
+    SERVER_BACKLOG (int): Maximum number of pending connections.
+    SERVER_GRACEFUL_TIMEOUT (int): Seconds given to in-flight requests on
+      shutdown.
+    SERVER_PRELOAD (bool): Whether the app is imported before forking workers.
+    SERVER_MAX_REQUESTS (int): Requests after which a worker is recycled
+      (0 to never recycle).
+    SERVER_MAX_REQUESTS_JITTER (int): Random extra requests per worker, so the
+      workers are not all recycled at once.
+    HEALTH_CACHE_SECONDS (float): Seconds a readiness database probe is reused.
+    HEALTH_MAX_POOL_USAGE (float): Connection pool utilization, from 0 to 1,
+      above which the API is not ready.
+    HEALTH_FAILURE_THRESHOLD (int): Consecutive failed database probes after
+      which the API is not ready.
+    HEALTH_PROBE_TIMEOUT (float): Seconds the readiness database probe may
+      take to connect, and to run.
+    CAR_COUNT_MODE (str): Default total count of paginated car listings:
+      exact, estimate, cached or none.
+    CAR_COUNT_CACHE_SIZE (int): Filter combinations whose car count is cached.
+    INVALIDATION_BUS_ENABLED (bool): Whether cache invalidations are shared
+      between workers through PostgreSQL LISTEN/NOTIFY.
+    INVALIDATION_CHANNEL (str): The NOTIFY channel of the invalidations.
+    INVALIDATION_RECONNECT_DELAY (float): Seconds between two attempts to
+      reconnect the invalidation listener.
+    CAR_BATCH_MAX_IDS (int): Maximum number of cars read by ID in one request.
+    CAR_TRIP_LIMIT (int): Default maximum number of trips per car in detailed
+      car listings (0 for every trip).
+    THREADPOOL_SIZE (int, optional): Worker threads running the sync routes
+      (None for the database pool connections plus the headroom).
+    THREADPOOL_HEADROOM (int): Worker threads added to the database pool
+      connections, for the routes that do not use the database.
+    THREADPOOL_PROBE_INTERVAL (float): Seconds between two probes of the wait
+      for a worker thread (0 to disable them).
+    TRIP_ARCHIVE_DIR (str): Directory of the archived trip segments.
+    TRIP_ARCHIVE_KEEP (int): Newest trips of each car kept in the table by the
+      archival job (0 to keep every trip).
+    TRIP_ARCHIVE_BEFORE_ID (int, optional): Trip ID below which the archival
+      job moves trips out of the table.
+    TRIP_ARCHIVE_BATCH_SIZE (int): Maximum number of trips per segment.
+    REQUEST_DEADLINE (float): Seconds a request may spend in the database
+      (30 by default, 0 for no deadline), unless its route has its own. It is
+      set as the statement_timeout of every session, so a slower request is
+      answered with a 504 (see the README).
+    ROUTE_DEADLINES (dict): Deadlines of single routes, in seconds, by route
+      name, such as {"bulkUpdateCars": 600}, from a JSON object; they override
+      DEFAULT_ROUTE_DEADLINES of core.requestDeadline (5 to 10 for the car
+      lookups, the facets and login, 120 for the bulk writes).
+    MEMORY_DIAGNOSTICS_ENABLED (bool): Whether the memory diagnostics
+      endpoints may be used.
+    MEMORY_DIAGNOSTICS_TOKEN (str, optional): X-Diagnostics-Token header value
+      required by the memory diagnostics endpoints, and by the thread,
+      statement, loop and trip queue metrics endpoints.
+    MEMORY_SAMPLE_RATE (float): Fraction of requests whose peak allocation is
+      measured while tracing.
+    MEMORY_TRACE_FRAMES (int): Frames kept per traced allocation.
+    MEMORY_TRACE_MAX_SECONDS (float): Longest allocation tracing period.
+    MEMORY_SNAPSHOT_DIR (str): Directory the heap snapshot diffs are written
+      to.
+    MEMORY_SNAPSHOT_MAX_BYTES (int): Maximum disk usage of the snapshot
+      directory.
+    MEMORY_SNAPSHOT_TOP (int): Lines written per heap snapshot diff.
+    LOOP_MONITOR_ENABLED (bool): Whether the event-loop lag is measured and
+      blocking calls detected.
+    LOOP_MONITOR_INTERVAL (float): Seconds between two ticks of the loop.
+    LOOP_BLOCK_THRESHOLD (float): Seconds the loop may stay blocked before
+      the blocking stack is captured.
+    LOOP_MONITOR_STRICT (bool): Whether requests during which the loop
+      blocked fail, for tests.
+    LOOP_MONITOR_MAX_EVENTS (int): Number of blocking events kept.
   """
 
   def __init__(self):
     """
     Initialize the Config class and load environment variables from a .env file.
+
+    Raises:
+      ValueError: If CAR_COUNT_MODE is not one of CAR_COUNT_MODES.
     """
     load_dotenv()
     self.DB_USERNAME = os.getenv("DB_USERNAME")
@@ -36,3 +140,100 @@ class Config:
     self.DB_HOST = os.getenv("DB_HOST")
     self.DB_PORT = os.getenv("DB_PORT")
     self.DB_NAME = os.getenv("DB_NAME")
+    self.DB_DRIVER = os.getenv("DB_DRIVER", "psycopg2")
+    self.DB_STATEMENT_CACHE_SIZE = int(
+        os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+    prepareThreshold = os.getenv("DB_PREPARE_THRESHOLD", "5")
+    self.DB_PREPARE_THRESHOLD = int(
+        prepareThreshold) if prepareThreshold else None
+    self.CAR_INDEX_ENABLED = os.getenv("CAR_INDEX_ENABLED",
+                                       "false").lower() == "true"
+    self.CHANGE_FEED_CAPACITY = int(os.getenv("CHANGE_FEED_CAPACITY", "1000"))
+    self.CHANGE_FEED_HEARTBEAT = float(
+        os.getenv("CHANGE_FEED_HEARTBEAT", "15"))
+    self.TRIP_QUEUE_SIZE = int(os.getenv("TRIP_QUEUE_SIZE", "10000"))
+    self.TRIP_QUEUE_BATCH_SIZE = int(os.getenv("TRIP_QUEUE_BATCH_SIZE", "500"))
+    self.TRIP_QUEUE_FLUSH_INTERVAL = float(
+        os.getenv("TRIP_QUEUE_FLUSH_INTERVAL", "0.5"))
+    self.TRIP_QUEUE_DRAIN_TIMEOUT = float(
+        os.getenv("TRIP_QUEUE_DRAIN_TIMEOUT", "10"))
+    hashWorkers = os.getenv("PASSWORD_HASH_WORKERS")
+    self.PASSWORD_HASH_WORKERS = int(hashWorkers) if hashWorkers else None
+    self.USER_PROVISIONING_BATCH_SIZE = int(
+        os.getenv("USER_PROVISIONING_BATCH_SIZE", "1000"))
+    self.PROFILER_ENABLED = os.getenv("PROFILER_ENABLED",
+                                      "false").lower() == "true"
+    self.PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+    self.PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+    self.PROFILER_DIR = os.getenv("PROFILER_DIR", "profiles")
+    self.PROFILER_MAX_BYTES = int(
+        os.getenv("PROFILER_MAX_BYTES", str(100 * 1024 * 1024)))
+    self.PROFILER_MAX_CONCURRENT = int(
+        os.getenv("PROFILER_MAX_CONCURRENT", "1"))
+    self.PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))
+    self.SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+    self.SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    serverWorkers = os.getenv("SERVER_WORKERS")
+    self.SERVER_WORKERS = int(serverWorkers) if serverWorkers else None
+    self.SERVER_KEEP_ALIVE = int(os.getenv("SERVER_KEEP_ALIVE", "5"))
+    self.SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+    self.SERVER_GRACEFUL_TIMEOUT = int(
+        os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    self.SERVER_PRELOAD = os.getenv("SERVER_PRELOAD", "false").lower() == "true"
+    self.SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+    self.SERVER_MAX_REQUESTS_JITTER = int(
+        os.getenv("SERVER_MAX_REQUESTS_JITTER", "0"))
+    self.HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "2"))
+    self.HEALTH_MAX_POOL_USAGE = float(
+        os.getenv("HEALTH_MAX_POOL_USAGE", "0.9"))
+    self.HEALTH_FAILURE_THRESHOLD = int(
+        os.getenv("HEALTH_FAILURE_THRESHOLD", "1"))
+    self.HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "2"))
+    self.CAR_COUNT_MODE = os.getenv("CAR_COUNT_MODE", "estimate").lower()
+    if self.CAR_COUNT_MODE not in CAR_COUNT_MODES:
+      raise ValueError(f"CAR_COUNT_MODE must be one of "
+                       f"{', '.join(CAR_COUNT_MODES)}, not "
+                       f"{self.CAR_COUNT_MODE!r}")
+    self.CAR_COUNT_CACHE_SIZE = int(os.getenv("CAR_COUNT_CACHE_SIZE", "1024"))
+    self.INVALIDATION_BUS_ENABLED = os.getenv("INVALIDATION_BUS_ENABLED",
+                                              "false").lower() == "true"
+    self.INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL",
+                                          "cache_invalidation")
+    self.INVALIDATION_RECONNECT_DELAY = float(
+        os.getenv("INVALIDATION_RECONNECT_DELAY", "1"))
+    self.CAR_BATCH_MAX_IDS = int(os.getenv("CAR_BATCH_MAX_IDS", "1000"))
+    self.CAR_TRIP_LIMIT = int(os.getenv("CAR_TRIP_LIMIT", "0"))
+    threadPoolSize = os.getenv("THREADPOOL_SIZE")
+    self.THREADPOOL_SIZE = int(threadPoolSize) if threadPoolSize else None
+    self.THREADPOOL_HEADROOM = int(os.getenv("THREADPOOL_HEADROOM", "10"))
+    self.THREADPOOL_PROBE_INTERVAL = float(
+        os.getenv("THREADPOOL_PROBE_INTERVAL", "1"))
+    self.TRIP_ARCHIVE_DIR = os.getenv("TRIP_ARCHIVE_DIR", "archive")
+    self.TRIP_ARCHIVE_KEEP = int(os.getenv("TRIP_ARCHIVE_KEEP", "0"))
+    archiveBeforeId = os.getenv("TRIP_ARCHIVE_BEFORE_ID")
+    self.TRIP_ARCHIVE_BEFORE_ID = int(
+        archiveBeforeId) if archiveBeforeId else None
+    self.TRIP_ARCHIVE_BATCH_SIZE = int(
+        os.getenv("TRIP_ARCHIVE_BATCH_SIZE", "10000"))
+    self.REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "30"))
+    self.ROUTE_DEADLINES = json.loads(os.getenv("ROUTE_DEADLINES", "{}"))
+    self.MEMORY_DIAGNOSTICS_ENABLED = os.getenv("MEMORY_DIAGNOSTICS_ENABLED",
+                                                "false").lower() == "true"
+    self.MEMORY_DIAGNOSTICS_TOKEN = os.getenv("MEMORY_DIAGNOSTICS_TOKEN")
+    self.MEMORY_SAMPLE_RATE = float(os.getenv("MEMORY_SAMPLE_RATE", "0.1"))
+    self.MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+    self.MEMORY_TRACE_MAX_SECONDS = float(
+        os.getenv("MEMORY_TRACE_MAX_SECONDS", "600"))
+    self.MEMORY_SNAPSHOT_DIR = os.getenv("MEMORY_SNAPSHOT_DIR", "memory")
+    self.MEMORY_SNAPSHOT_MAX_BYTES = int(
+        os.getenv("MEMORY_SNAPSHOT_MAX_BYTES", str(10 * 1024 * 1024)))
+    self.MEMORY_SNAPSHOT_TOP = int(os.getenv("MEMORY_SNAPSHOT_TOP", "50"))
+    self.LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED",
+                                          "true").lower() == "true"
+    self.LOOP_MONITOR_INTERVAL = float(
+        os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+    self.LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.25"))
+    self.LOOP_MONITOR_STRICT = os.getenv("LOOP_MONITOR_STRICT",
+                                         "false").lower() == "true"
+    self.LOOP_MONITOR_MAX_EVENTS = int(
+        os.getenv("LOOP_MONITOR_MAX_EVENTS", "20"))
@@ -12,8 +12,10 @@ Contact Information: mathteixeira55
 """
 
 ### Imports ###
+from fastapi import Request
 from sqlmodel import SQLModel, Session, create_engine
 from .config import Config
+from .requestDeadline import RequestDeadlines
 
 
 class Database:
@@ -27,11 +29,22 @@ class Database:
     host (str): Database host.
     port (str): Database port.
     dbName (str): Database name.
+    driver (str): PostgreSQL driver, psycopg2 or psycopg.
+    deadlines (RequestDeadlines, optional): Database deadlines of the routes.
     DATABASE_URL (str): Full database URL.
     engine (Engine): SQLAlchemy engine connected to the PostgreSQL database.
   """
 
-  def __init__(self, userName, password, host, port, dbName):
+  def __init__(self,
+               userName,
+               password,
+               host,
+               port,
+               dbName,
+               driver="psycopg2",
+               statementCacheSize=500,
+               prepareThreshold=5,
+               deadlines=None):
     """
     Initialize the Database class with the provided configuration values.
 
@@ -41,15 +54,30 @@ class Database:
       host (str): Database host.
       port (str): Database port.
       dbName (str): Database name.
+      driver (str): PostgreSQL driver, psycopg2 or psycopg.
+      statementCacheSize (int): Compiled statements cached by the engine.
+      prepareThreshold (int, optional): Executions after which psycopg 3
+        prepares a statement on the server, None to never prepare.
+      deadlines (RequestDeadlines, optional): Database deadlines of the
+        routes, None for none.
     """
     self.userName = userName
     self.password = password
     self.host = host
     self.port = port
     self.dbName = dbName
+    self.driver = driver
+    self.deadlines = deadlines
 
-    self.DATABASE_URL = f"postgresql://{self.userName}:{self.password}@{self.host}:{self.port}/{self.dbName}"
-    self.engine = create_engine(self.DATABASE_URL)
+    self.DATABASE_URL = f"postgresql+{self.driver}://{self.userName}:{self.password}@{self.host}:{self.port}/{self.dbName}"
+    # Statements repeated with the same SQL, as the cached statements are, are
+    # prepared on the server by psycopg 3, skipping their parsing and planning
+    connectArgs = {}
+    if self.driver == "psycopg":
+      connectArgs["prepare_threshold"] = prepareThreshold
+    self.engine = create_engine(self.DATABASE_URL,
+                                query_cache_size=statementCacheSize,
+                                connect_args=connectArgs)
 
   def init(self):
     """
@@ -57,20 +85,47 @@ class Database:
     FastAPI will call this method to create the database tables.
     """
     SQLModel.metadata.create_all(self.engine)
+    # create_all skips the tables that exist, so indexes added to them later
+    # are created here
+    for table in SQLModel.metadata.sorted_tables:
+      for index in table.indexes:
+        index.create(self.engine, checkfirst=True)
 
-  def getSession(self):
+  def getSession(self, request: Request = None):
     """
     Provide a database session. This method is used as a dependency in FastAPI to ensure
     that each request has its own database session.
 
+    Args:
+      request (Request, optional): The request the session is for, whose
+        route deadline bounds the queries of the session.
+
     Yields:
       session (Session): The database session.
+
+    Raises:
+      HTTPException: 504 if the request deadline was exceeded, 503 if no
+        connection was available or the client disconnected.
     """
     # Session wraps the database connection and transaction, ensuring that the
     # changes are committed to the database at once, if no errors occur.
     # No partial changes are committed to the database.
-    with Session(self.engine) as session:
-      yield session
+    # Objects are not expired on commit, so routes can return what they wrote
+    # without a refresh SELECT.
+    with Session(self.engine, expire_on_commit=False) as session:
+      if request is None or self.deadlines is None:
+        yield session
+        return
+      tracker = self.deadlines.attach(session, request)
+      try:
+        yield session
+      except Exception as e:
+        # Routes report database failures as 500s; the ones caused by the
+        # deadline are turned into their own status
+        error = self.deadlines.httpError(e, tracker)
+        if error is None:
+          raise
+        raise error from e
 
 
 ### Load Configuration ###
@@ -81,4 +136,10 @@ carsDb = Database(userName=config.DB_USERNAME,
                   password=config.DB_PASSWORD,
                   host=config.DB_HOST,
                   port=config.DB_PORT,
-                  dbName=config.DB_NAME)
+                  dbName=config.DB_NAME,
+                  driver=config.DB_DRIVER,
+                  statementCacheSize=config.DB_STATEMENT_CACHE_SIZE,
+                  prepareThreshold=config.DB_PREPARE_THRESHOLD,
+                  deadlines=RequestDeadlines(
+                      default=config.REQUEST_DEADLINE,
+                      routes=config.ROUTE_DEADLINES))
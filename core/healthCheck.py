@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: healthCheck.py
+Description: This script defines the HealthCheck, which tells the orchestrator
+ whether the car sharing API can serve traffic. The database probe is cached
+ for a short interval, so frequent readiness probes never add load, and is
+ skipped when the connection pool is saturated instead of queuing for a
+ connection. It runs on a connection of its own, whose connection and
+ statements time out, so a hung database cannot hold the probe callers.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import math
+import threading
+import time
+from sqlalchemy import Engine, create_engine, text
+from .database import carsDb, config
+
+# Probe result reported before the first probe has finished
+UNKNOWN_PROBE = {"database": False, "latencyMs": None, "error": None}
+
+
+class HealthCheck:
+  """
+  Readiness check of the database and its connection pool.
+
+  Attributes:
+    engine (Engine): The engine of the probed database.
+    cacheSeconds (float): How long a probe result is reused.
+    maxPoolUsage (float): The pool utilization above which the API is not ready.
+    failureThreshold (int): The consecutive failed probes after which the API
+      is not ready.
+    timeout (float): The seconds a probe may take to connect, and to run.
+    failures (int): The current number of consecutive failed probes.
+  """
+
+  def __init__(self,
+               engine: Engine,
+               cacheSeconds: float,
+               maxPoolUsage: float,
+               failureThreshold: int,
+               timeout: float = 2):
+    """
+    Initialize the check; the first readiness call runs the first probe.
+
+    Args:
+      engine (Engine): The engine of the probed database.
+      cacheSeconds (float): How long a probe result is reused.
+      maxPoolUsage (float): The pool utilization above which the API is not
+        ready.
+      failureThreshold (int): The consecutive failed probes after which the API
+        is not ready.
+      timeout (float, optional): The seconds a probe may take to connect, and
+        to run.
+    """
+    self.engine = engine
+    self.cacheSeconds = cacheSeconds
+    self.maxPoolUsage = maxPoolUsage
+    self.failureThreshold = failureThreshold
+    self.timeout = timeout
+    self.failures = 0
+    self._probeEngine = probeEngine(engine, timeout)
+    self._probe = None
+    self._probedAt = float("-inf")
+    self._lock = threading.Lock()
+
+  def poolStatus(self) -> dict:
+    """
+    Read the connection pool counters.
+
+    Returns:
+      dict: The pool size, checked out and overflow connections, and the
+        utilization, from 0 to 1, of the connections the pool may open.
+    """
+    pool = self.engine.pool
+    if not hasattr(pool, "checkedout"):
+      # Pools without a limit, like SQLite's, are never saturated
+      return {"size": 0, "checkedOut": 0, "overflow": 0, "utilization": 0.0}
+    size = pool.size()
+    checkedOut = pool.checkedout()
+    capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+    return {
+        "size": size,
+        "checkedOut": checkedOut,
+        "overflow": max(pool.overflow(), 0),
+        "utilization": checkedOut / capacity if capacity else 0.0
+    }
+
+  def probe(self) -> dict:
+    """
+    Run a SELECT 1 against the database, or reuse the last result if recent.
+
+    Concurrent callers do not wait for a running probe, they get the last
+    result.
+
+    Returns:
+      dict: Whether the database answered, the probe latency and error.
+    """
+    if not self._lock.acquire(blocking=False):
+      return self._probe or UNKNOWN_PROBE
+    try:
+      if time.monotonic() - self._probedAt < self.cacheSeconds:
+        return self._probe
+      start = time.perf_counter()
+      try:
+        with self._probeEngine.connect() as connection:
+          connection.execute(text("SELECT 1"))
+        self.failures = 0
+        error = None
+      except Exception as e:
+        self.failures += 1
+        # The message may hold the database address, only the type is shown
+        error = type(e).__name__
+      self._probe = {
+          "database": error is None,
+          "latencyMs": round((time.perf_counter() - start) * 1000, 2),
+          "error": error
+      }
+      self._probedAt = time.monotonic()
+      return self._probe
+    finally:
+      self._lock.release()
+
+  def readiness(self) -> dict:
+    """
+    Tell whether the API is ready to serve traffic.
+
+    Returns:
+      dict: The readiness, the reasons it is not ready, the probe result and
+        the pool status.
+    """
+    pool = self.poolStatus()
+    reasons = []
+    if pool["utilization"] >= self.maxPoolUsage:
+      # A probe would wait for a connection, and add to the saturation
+      reasons.append(f"Connection pool {pool['utilization']:.0%} in use")
+      probe = self._probe or UNKNOWN_PROBE
+    else:
+      probe = self.probe()
+    if self.failures >= self.failureThreshold:
+      reasons.append(f"{self.failures} consecutive database probes failed")
+    return {"ready": not reasons, "reasons": reasons, **probe, "pool": pool}
+
+
+def probeEngine(engine: Engine, timeout: float) -> Engine:
+  """
+  Build the engine of the probes. On PostgreSQL, it holds one connection of
+  its own, out of the pool of the requests, which times out when connecting
+  and when running a statement; other databases are probed through the
+  engine itself.
+
+  Args:
+    engine (Engine): The engine of the probed database.
+    timeout (float): The seconds a probe may take to connect, and to run.
+
+  Returns:
+    Engine: The engine to probe with.
+  """
+  if engine.dialect.name != "postgresql":
+    return engine
+  return create_engine(engine.url,
+                       pool_size=1,
+                       max_overflow=0,
+                       pool_timeout=timeout,
+                       connect_args={
+                           "connect_timeout": max(math.ceil(timeout), 1),
+                           "options":
+                               f"-c statement_timeout={int(timeout * 1000)}"
+                       })
+
+
+### Global Variables ###
+healthCheck = HealthCheck(engine=carsDb.engine,
+                          cacheSeconds=config.HEALTH_CACHE_SECONDS,
+                          maxPoolUsage=config.HEALTH_MAX_POOL_USAGE,
+                          failureThreshold=config.HEALTH_FAILURE_THRESHOLD,
+                          timeout=config.HEALTH_PROBE_TIMEOUT)
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: invalidationBus.py
+Description: This script defines the InvalidationBus, which keeps the
+ in-process caches of every worker coherent. Writers publish compact
+ (entity, id) messages through PostgreSQL NOTIFY, sent in the transaction of
+ the write, so they are delivered when it commits and dropped if it rolls
+ back, and a background listener in each worker evicts the matching local
+ entries. Every cache is flushed when the listener (re)connects, since
+ messages sent while it was disconnected are lost. An in-process broker
+ stands in for PostgreSQL in tests.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import json
+import logging
+import secrets
+import select
+from queue import Queue, Empty
+from threading import Event, Lock, Thread
+from typing import Callable
+from sqlalchemy import Engine, event, text
+from sqlmodel import Session
+from .database import carsDb, config
+
+logger = logging.getLogger(__name__)
+
+# Key of the messages waiting for the commit in the session info
+PENDING_KEY = "pendingInvalidations"
+
+
+class InProcessBroker:
+  """
+  Stand-in for PostgreSQL LISTEN/NOTIFY delivering messages between the buses
+  of a single process.
+  """
+
+  def __init__(self):
+    """
+    Initialize a broker without listeners.
+    """
+    self._queues = []
+    self._lock = Lock()
+
+  def publish(self, session: Session, payload: str):
+    """
+    Deliver a message to every connected listener when the transaction of the
+    session commits, as NOTIFY does.
+
+    Args:
+      session (Session): The session of the write.
+      payload (str): The message.
+    """
+    # Join the transaction, as NOTIFY runs on its connection
+    session.connection()
+    session.info.setdefault(PENDING_KEY, []).append(payload)
+    if not event.contains(session, "after_commit", self._commit):
+      event.listen(session, "after_commit", self._commit)
+      event.listen(session, "after_soft_rollback", self._rollback)
+
+  def _commit(self, session: Session):
+    """
+    Deliver the messages of a committed transaction.
+
+    Args:
+      session (Session): The session of the write.
+    """
+    for payload in session.info.pop(PENDING_KEY, []):
+      self.deliver(payload)
+
+  def _rollback(self, session: Session, previousTransaction):
+    """
+    Drop the messages of a rolled back transaction.
+
+    Args:
+      session (Session): The session of the write.
+      previousTransaction (SessionTransaction): The rolled back transaction.
+    """
+    session.info.pop(PENDING_KEY, None)
+
+  def deliver(self, payload: str):
+    """
+    Deliver a message to every connected listener now.
+
+    Args:
+      payload (str): The message.
+    """
+    with self._lock:
+      for queue in self._queues:
+        queue.put(payload)
+
+  def disconnect(self):
+    """
+    Drop every listener connection, as a database restart would.
+    """
+    with self._lock:
+      for queue in self._queues:
+        queue.put(None)
+
+  def listen(self, onMessage: Callable[[str], None],
+             onConnect: Callable[[], None], stopped: Event):
+    """
+    Deliver the published messages until stopped or disconnected.
+
+    Args:
+      onMessage (Callable[[str], None]): Called with each message.
+      onConnect (Callable[[], None]): Called once listening.
+      stopped (Event): Set to stop listening.
+
+    Raises:
+      ConnectionError: If the broker dropped the connection.
+    """
+    queue = Queue()
+    with self._lock:
+      self._queues.append(queue)
+    try:
+      onConnect()
+      while not stopped.is_set():
+        try:
+          payload = queue.get(timeout=0.1)
+        except Empty:
+          continue
+        if payload is None:
+          raise ConnectionError("Broker disconnected")
+        onMessage(payload)
+    finally:
+      with self._lock:
+        self._queues.remove(queue)
+
+
+class PostgresBroker:
+  """
+  Broker over PostgreSQL LISTEN/NOTIFY.
+
+  Attributes:
+    engine (Engine): The engine of the database relaying the messages.
+    channel (str): The notification channel.
+  """
+
+  def __init__(self, engine: Engine, channel: str):
+    """
+    Initialize the broker.
+
+    Args:
+      engine (Engine): The engine of the database relaying the messages.
+      channel (str): The notification channel.
+    """
+    self.engine = engine
+    self.channel = channel
+
+  def publish(self, session: Session, payload: str):
+    """
+    Send a message to every listening worker, on the connection of the write:
+    PostgreSQL delivers it when the transaction commits, and not at all if
+    it rolls back.
+
+    Args:
+      session (Session): The session of the write.
+      payload (str): The message, shorter than 8000 bytes.
+    """
+    session.connection().execute(
+        text("SELECT pg_notify(:channel, :payload)"), {
+            "channel": self.channel,
+            "payload": payload
+        })
+
+  def listen(self, onMessage: Callable[[str], None],
+             onConnect: Callable[[], None], stopped: Event):
+    """
+    Deliver the notifications of the channel until stopped.
+
+    The listener holds its own connection, outside the pool, so it does not
+    take one from the requests.
+
+    Args:
+      onMessage (Callable[[str], None]): Called with each message.
+      onConnect (Callable[[], None]): Called once listening.
+      stopped (Event): Set to stop listening.
+    """
+    dialect = self.engine.dialect
+    args, kwargs = dialect.create_connect_args(self.engine.url)
+    connection = dialect.connect(*args, **kwargs)
+    try:
+      connection.autocommit = True
+      cursor = connection.cursor()
+      cursor.execute(f'LISTEN "{self.channel}"')
+      onConnect()
+      while not stopped.is_set():
+        if hasattr(connection, "notifies") and callable(connection.notifies):
+          # psycopg 3
+          for notify in connection.notifies(timeout=0.5):
+            onMessage(notify.payload)
+            if stopped.is_set():
+              break
+        else:
+          # psycopg2
+          if select.select([connection], [], [], 0.5)[0]:
+            connection.poll()
+            while connection.notifies:
+              onMessage(connection.notifies.pop(0).payload)
+    finally:
+      connection.close()
+
+
+class InvalidationBus:
+  """
+  Publishes and applies cache invalidations across the workers.
+
+  Messages are (entity, id, worker) JSON arrays. An id of None invalidates
+  every entry of the entity. They are sent in the transactions of the writes,
+  so they need no ordering of their own: PostgreSQL delivers them in commit
+  order to every connected listener, and only a reconnect may lose some.
+
+  Attributes:
+    broker (PostgresBroker | InProcessBroker): The message broker.
+    enabled (bool): Whether invalidations are published and listened to.
+    reconnectDelay (float): The seconds between two connection attempts.
+    workerId (str): The identifier of this worker in the messages.
+  """
+
+  def __init__(self, broker, enabled: bool, reconnectDelay: float):
+    """
+    Initialize a stopped bus.
+
+    Args:
+      broker (PostgresBroker | InProcessBroker): The message broker.
+      enabled (bool): Whether invalidations are published and listened to.
+      reconnectDelay (float): The seconds between two connection attempts.
+    """
+    self.broker = broker
+    self.enabled = enabled
+    self.reconnectDelay = reconnectDelay
+    self.workerId = secrets.token_hex(4)
+    self._handlers = {}
+    self._stopped = Event()
+    self._thread = None
+
+  def subscribe(self, entity: str, handler: Callable[[int | None], None]):
+    """
+    Register the eviction of a local cache.
+
+    Args:
+      entity (str): The entity the cache holds, such as "car".
+      handler (Callable[[int | None], None]): Called with the ID of the
+        invalidated entity, or None to flush the cache.
+    """
+    handlers = self._handlers.setdefault(entity, [])
+    if handler not in handlers:
+      handlers.append(handler)
+
+  def publish(self, session: Session, entity: str, id: int | None):
+    """
+    Tell the other workers that an entity changes, in the transaction of the
+    write, before it commits. A failure fails the write, so the caches never
+    miss a committed change.
+
+    Args:
+      session (Session): The session of the write.
+      entity (str): The changed entity, such as "car".
+      id (int, optional): The ID of the changed entity, None for all of them.
+    """
+    if not self.enabled:
+      return
+    payload = json.dumps([entity, id, self.workerId], separators=(",", ":"))
+    self.broker.publish(session, payload)
+
+  def start(self):
+    """
+    Start the listener thread.
+    """
+    if not self.enabled or self._thread is not None:
+      return
+    self._stopped.clear()
+    self._thread = Thread(target=self._run,
+                          name="invalidationBus",
+                          daemon=True)
+    self._thread.start()
+
+  def stop(self):
+    """
+    Stop the listener thread.
+    """
+    if self._thread is None:
+      return
+    self._stopped.set()
+    self._thread.join()
+    self._thread = None
+
+  def _run(self):
+    """
+    Listen until stopped, reconnecting after failures.
+    """
+    while not self._stopped.is_set():
+      try:
+        self.broker.listen(self._receive, self.flush, self._stopped)
+      except Exception:
+        logger.exception("Invalidation listener disconnected")
+      self._stopped.wait(self.reconnectDelay)
+
+  def _receive(self, payload: str):
+    """
+    Apply a message from another worker.
+
+    Args:
+      payload (str): The message.
+    """
+    try:
+      entity, id, workerId = json.loads(payload)
+    except (ValueError, TypeError):
+      logger.warning("Ignoring malformed invalidation %r", payload)
+      return
+    if workerId == self.workerId:
+      return
+    self._evict(entity, id)
+
+  def _evict(self, entity: str, id: int | None):
+    """
+    Call the handlers of an entity.
+
+    Args:
+      entity (str): The invalidated entity.
+      id (int, optional): The ID of the invalidated entity, None for all.
+    """
+    for handler in self._handlers.get(entity, []):
+      try:
+        handler(id)
+      except Exception:
+        logger.exception("Failed to evict %s %s", entity, id)
+
+  def flush(self):
+    """
+    Flush every local cache, after messages may have been lost.
+    """
+    for entity in self._handlers:
+      self._evict(entity, None)
+
+
+### Global Variables ###
+invalidationBus = InvalidationBus(
+    broker=PostgresBroker(carsDb.engine, config.INVALIDATION_CHANNEL),
+    enabled=config.INVALIDATION_BUS_ENABLED,
+    reconnectDelay=config.INVALIDATION_RECONNECT_DELAY)
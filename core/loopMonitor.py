@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: loopMonitor.py
+Description: This script defines the LoopMonitor, a watchdog of the event loop
+ of the car sharing API. A task ticking on the loop measures how late it is
+ woken up, the event-loop lag, and a watchdog thread captures the stack and
+ the route of the loop whenever a callback blocks it for longer than a
+ threshold, such as an async route calling the database or bcrypt, along
+ with the request whose task was running. In strict mode, meant for tests,
+ that request fails.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from .database import config
+
+logger = logging.getLogger(__name__)
+
+# Directory of the route modules, to tell which route a blocked stack runs
+ROUTERS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                           "routers")
+# Innermost frames kept per captured stack
+STACK_DEPTH = 30
+
+
+class BlockingCallError(RuntimeError):
+  """
+  Raised in strict mode by a request whose task blocked the event loop.
+  """
+
+
+class LoopMonitor:
+  """
+  Event-loop lag monitor and blocking call detector.
+
+  Attributes:
+    enabled (bool): Whether the loop is monitored.
+    interval (float): The seconds between two ticks of the loop.
+    threshold (float): The seconds the loop may stay blocked before its stack
+      is captured.
+    strict (bool): Whether the requests that blocked the loop fail.
+    events (deque): The latest blocking events, oldest first.
+  """
+
+  def __init__(self, enabled: bool, interval: float, threshold: float,
+               strict: bool, maxEvents: int):
+    """
+    Initialize a stopped monitor.
+
+    Args:
+      enabled (bool): Whether the loop is monitored.
+      interval (float): The seconds between two ticks of the loop.
+      threshold (float): The seconds the loop may stay blocked before its
+        stack is captured.
+      strict (bool): Whether the requests that blocked the loop fail.
+      maxEvents (int): The number of blocking events kept.
+    """
+    self.enabled = enabled
+    self.interval = interval
+    self.threshold = threshold
+    self.strict = strict
+    self.events = deque(maxlen=maxEvents)
+    self.blockedCount = 0
+    self._beat = time.monotonic()
+    self._reported = None
+    self._requests = {}
+    self._loop = None
+    self._loopThreadId = None
+    self._task = None
+    self._watchdog = None
+    self._stopped = threading.Event()
+    self._stats = {
+        "ticks": 0,
+        "lastLagMs": 0.0,
+        "maxLagMs": 0.0,
+        "totalLagMs": 0.0
+    }
+
+  async def start(self):
+    """
+    Start ticking on the running event loop, and the watchdog thread.
+    Called from the lifespan.
+    """
+    if not self.enabled or self._task is not None:
+      return
+    self._loop = asyncio.get_running_loop()
+    self._loopThreadId = threading.get_ident()
+    self._beat = time.monotonic()
+    self._stopped.clear()
+    self._task = asyncio.create_task(self._tick())
+    self._watchdog = threading.Thread(target=self._watch,
+                                      name="loopWatchdog",
+                                      daemon=True)
+    self._watchdog.start()
+
+  async def stop(self):
+    """
+    Stop ticking and the watchdog thread.
+    """
+    if self._task is None:
+      return
+    self._stopped.set()
+    self._task.cancel()
+    try:
+      await self._task
+    except asyncio.CancelledError:
+      pass
+    self._task = None
+    self._watchdog.join()
+    self._watchdog = None
+
+  async def _tick(self):
+    """
+    Wake up every interval, and measure how late the wake-up was.
+    """
+    while True:
+      expected = time.monotonic() + self.interval
+      await asyncio.sleep(self.interval)
+      now = time.monotonic()
+      lagMs = max(now - expected, 0) * 1000
+      stats = self._stats
+      stats["ticks"] += 1
+      stats["lastLagMs"] = lagMs
+      stats["maxLagMs"] = max(stats["maxLagMs"], lagMs)
+      stats["totalLagMs"] += lagMs
+      event = self._reported
+      if event is not None and event["durationMs"] is None:
+        # The blocking call returned; its full duration is now known
+        event["durationMs"] = round(
+            (now - self._beat - self.interval) * 1000, 1)
+      self._beat = now
+
+  def _watch(self):
+    """
+    Capture the stack of the loop each time it stays blocked past the
+    threshold, once per blocking.
+    """
+    while not self._stopped.wait(min(self.interval, self.threshold) / 2):
+      beat = self._beat
+      blocked = time.monotonic() - beat - self.interval
+      if blocked < self.threshold:
+        continue
+      if self._reported is not None and self._reported["beat"] == beat:
+        continue
+      frame = sys._current_frames().get(self._loopThreadId)
+      if frame is None:
+        continue
+      # The task stepping on the loop is the one blocking it
+      self._record(beat, blocked, frame, asyncio.current_task(self._loop))
+
+  def _record(self, beat: float, blocked: float, frame, task):
+    """
+    Record a blocking event, and add it to the request of the blocking task.
+
+    Args:
+      beat (float): The last tick before the loop blocked.
+      blocked (float): The seconds the loop has been blocked so far.
+      frame (FrameType): The innermost frame of the loop thread.
+      task (Task, optional): The task running on the loop.
+    """
+    stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+    request = self._requests.get(task)
+    event = {
+        "beat": beat,
+        "at": time.time(),
+        "blockedMs": round(blocked * 1000, 1),
+        "durationMs": None,
+        "route": blockingRoute(stack),
+        "request": request["label"] if request else None,
+        "stack": traceback.format_list(stack)
+    }
+    self.events.append(event)
+    self.blockedCount += 1
+    self._reported = event
+    if request is not None:
+      request["events"].append(event)
+    logger.warning("Event loop blocked for %.0f ms in %s:\n%s",
+                   event["blockedMs"], event["route"] or "no route",
+                   "".join(event["stack"]))
+
+  def track(self, task: asyncio.Task, label: str) -> dict:
+    """
+    Attribute the blocking events of a task to a request.
+
+    Args:
+      task (Task): The task running the request.
+      label (str): The method and path of the request.
+
+    Returns:
+      dict: The request, whose events list receives its blocking events.
+    """
+    request = {"label": label, "events": []}
+    self._requests[task] = request
+    return request
+
+  def untrack(self, task: asyncio.Task):
+    """
+    Stop attributing the blocking events of a task.
+
+    Args:
+      task (Task): The task running the request.
+    """
+    self._requests.pop(task, None)
+
+  def check(self, request: dict):
+    """
+    In strict mode, fail a request that blocked the loop.
+
+    Args:
+      request (dict): The request, as returned by track.
+
+    Raises:
+      BlockingCallError: In strict mode, if the request blocked the loop.
+    """
+    if not (self.strict and request["events"]):
+      return
+    event = request["events"][0]
+    raise BlockingCallError(
+        f"{request['label']} blocked the event loop for "
+        f"{event['blockedMs']:.0f} ms in {event['route'] or 'no route'}:\n" +
+        "".join(event["stack"]))
+
+  @property
+  def running(self) -> bool:
+    """
+    Whether the loop is being monitored.
+    """
+    return self._task is not None
+
+  def metrics(self) -> dict:
+    """
+    Get the event-loop lag and the latest blocking events.
+
+    Returns:
+      dict: The lag statistics, the number of blocking events, and the latest
+        ones, with their route and stack.
+    """
+    stats = dict(self._stats)
+    totalLagMs = stats.pop("totalLagMs")
+    ticks = stats["ticks"]
+    return {
+        "enabled": self.enabled,
+        "running": self.running,
+        **stats, "avgLagMs": totalLagMs / ticks if ticks else 0.0,
+        "thresholdMs": self.threshold * 1000,
+        "blockedCount": self.blockedCount,
+        "events": [{
+            key: value for key, value in event.items() if key != "beat"
+        } for event in list(self.events)]
+    }
+
+
+def blockingRoute(stack: traceback.StackSummary) -> str | None:
+  """
+  Find the route a blocked stack runs: the innermost frame of a route module,
+  whose function is named as the route.
+
+  Args:
+    stack (StackSummary): The stack, outermost frame first.
+
+  Returns:
+    str | None: The route name, None if no route is on the stack.
+  """
+  for frame in reversed(stack):
+    if os.path.dirname(os.path.abspath(frame.filename)) == ROUTERS_DIR:
+      return frame.name
+  return None
+
+
+class LoopMonitorMiddleware:
+  """
+  ASGI middleware attributing the blocking events to the request whose task
+  blocked the loop, and failing it in strict mode.
+
+  It must be the innermost middleware: the routes then run in its task,
+  while the middlewares of FastAPI run the app in tasks of their own.
+
+  Attributes:
+    app (ASGIApp): The wrapped application.
+    monitor (LoopMonitor): The loop monitor.
+  """
+
+  def __init__(self, app, monitor: LoopMonitor):
+    """
+    Wrap an application.
+
+    Args:
+      app (ASGIApp): The wrapped application.
+      monitor (LoopMonitor): The loop monitor.
+    """
+    self.app = app
+    self.monitor = monitor
+
+  async def __call__(self, scope, receive, send):
+    monitor = self.monitor
+    if scope["type"] != "http" or not monitor.running:
+      await self.app(scope, receive, send)
+      return
+
+    task = asyncio.current_task()
+    request = monitor.track(task, f"{scope['method']} {scope['path']}")
+
+    async def sendMessage(message):
+      # Fail before answering, when the route blocked
+      if message["type"] == "http.response.start":
+        monitor.check(request)
+      await send(message)
+
+    try:
+      await self.app(scope, receive, sendMessage)
+    finally:
+      monitor.untrack(task)
+    # The response body may also have blocked
+    monitor.check(request)
+
+
+### Global Variables ###
+loopMonitor = LoopMonitor(enabled=config.LOOP_MONITOR_ENABLED,
+                          interval=config.LOOP_MONITOR_INTERVAL,
+                          threshold=config.LOOP_BLOCK_THRESHOLD,
+                          strict=config.LOOP_MONITOR_STRICT,
+                          maxEvents=config.LOOP_MONITOR_MAX_EVENTS)
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: memoryDiagnostics.py
+Description: This script defines the MemoryDiagnostics, an opt-in view of
+ where the memory of a worker goes. While tracing, which is turned on for a
+ bounded time only, a sample of the requests records its peak allocation per
+ route. Heap snapshots can be diffed against the previous one and written to
+ files, and the live ORM instances and Pydantic models counted, to tell apart
+ identity maps, schemas and response buffers.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import gc
+import os
+import random
+import secrets
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from fastapi import HTTPException, Request
+from pydantic import BaseModel
+from sqlmodel import Session
+from .database import config
+
+# Frames of the tracing machinery itself, left out of the snapshots
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryDiagnostics:
+  """
+  Opt-in memory diagnostics, capped in time, sampled requests and disk usage.
+
+  Peak allocations are measured with the process-wide tracemalloc peak, so
+  one request is sampled at a time, and the peak also holds what concurrent
+  requests allocated meanwhile; it is an upper bound.
+
+  Attributes:
+    enabled (bool): Whether the diagnostics may be used at all.
+    token (str, optional): The X-Diagnostics-Token header value required by
+      the diagnostics endpoints.
+    sampleRate (float): The fraction of requests whose peak is measured while
+      tracing.
+    frames (int): The frames kept per traced allocation.
+    maxSeconds (float): The longest tracing period.
+    directory (str): The directory the snapshot diffs are written to.
+    maxBytes (int): The maximum disk usage of the directory.
+    top (int): The number of lines written per snapshot diff.
+  """
+
+  def __init__(self, enabled: bool, token: str | None, sampleRate: float,
+               frames: int, maxSeconds: float, directory: str, maxBytes: int,
+               top: int):
+    """
+    Initialize the diagnostics, without tracing.
+
+    Args:
+      enabled (bool): Whether the diagnostics may be used at all.
+      token (str, optional): The X-Diagnostics-Token header value required by
+        the diagnostics endpoints.
+      sampleRate (float): The fraction of requests whose peak is measured
+        while tracing.
+      frames (int): The frames kept per traced allocation.
+      maxSeconds (float): The longest tracing period.
+      directory (str): The directory the snapshot diffs are written to.
+      maxBytes (int): The maximum disk usage of the directory.
+      top (int): The number of lines written per snapshot diff.
+    """
+    self.enabled = enabled
+    self.token = token
+    self.sampleRate = sampleRate
+    self.frames = frames
+    self.maxSeconds = maxSeconds
+    self.directory = directory
+    self.maxBytes = maxBytes
+    self.top = top
+    self.stopsAt = None
+    self.routes = {}
+    self._snapshot = None
+    self._timer = None
+    self._slot = threading.BoundedSemaphore(1)
+    self._lock = threading.Lock()
+
+  def authorize(self, request: Request):
+    """
+    Let the diagnostics endpoints run only when enabled in Config, for
+    callers holding the token. Used as a route dependency.
+
+    Args:
+      request (Request): The request.
+
+    Raises:
+      HTTPException: 404 if the diagnostics are disabled, 403 if the token is
+        missing or wrong.
+    """
+    if not self.enabled:
+      raise HTTPException(status_code=404,
+                          detail="Memory diagnostics are disabled")
+    self.authorizeToken(request)
+
+  def authorizeToken(self, request: Request):
+    """
+    Let only the callers holding the token read the runtime metrics (threads,
+    statements, loop stacks, trip queue), which are cheap enough to stay
+    available without enabling the memory diagnostics. Used as a route
+    dependency.
+
+    Args:
+      request (Request): The request.
+
+    Raises:
+      HTTPException: 403 if the token is missing or wrong.
+    """
+    header = request.headers.get("X-Diagnostics-Token")
+    if not (header and self.token and
+            secrets.compare_digest(header, self.token)):
+      raise HTTPException(status_code=403,
+                          detail="Invalid diagnostics token")
+
+  @property
+  def tracing(self) -> bool:
+    """
+    Whether allocations are being traced.
+    """
+    return tracemalloc.is_tracing()
+
+  def start(self, seconds: float) -> float:
+    """
+    Trace the allocations for a while, then stop on its own, so tracing
+    left on by mistake does not keep slowing the worker down.
+
+    Args:
+      seconds (float): The tracing period, capped at maxSeconds.
+
+    Returns:
+      float: The tracing period.
+    """
+    seconds = min(seconds, self.maxSeconds)
+    with self._lock:
+      if not tracemalloc.is_tracing():
+        tracemalloc.start(self.frames)
+      if self._timer is not None:
+        self._timer.cancel()
+      self._timer = threading.Timer(seconds, self.stop)
+      self._timer.daemon = True
+      self._timer.start()
+      self.stopsAt = time.time() + seconds
+    return seconds
+
+  def stop(self):
+    """
+    Stop the tracing started by start, and free the traces and the baseline
+    snapshot.
+    """
+    with self._lock:
+      if self._timer is not None:
+        self._timer.cancel()
+        self._timer = None
+      if self.stopsAt is not None:
+        tracemalloc.stop()
+      self._snapshot = None
+      self.stopsAt = None
+
+  async def __call__(self, request: Request, callNext):
+    """
+    Run a request, measuring its peak allocation when tracing, selected and
+    no other request is measured.
+
+    Args:
+      request (Request): The incoming request.
+      callNext (callable): The next step of the middleware chain.
+
+    Returns:
+      Response: The response.
+    """
+    if (not self.enabled or not self.tracing or
+        random.random() >= self.sampleRate or
+        not self._slot.acquire(blocking=False)):
+      return await callNext(request)
+
+    try:
+      tracemalloc.reset_peak()
+      before = tracemalloc.get_traced_memory()[0]
+      response = await callNext(request)
+      peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+      self._slot.release()
+
+    route = request.scope.get("route")
+    self.record(getattr(route, "name", None) or request.url.path, peak)
+    return response
+
+  def record(self, routeName: str, peak: int):
+    """
+    Add a peak allocation to the statistics of a route.
+
+    Args:
+      routeName (str): The name of the route.
+      peak (int): The bytes allocated at the peak of the request.
+    """
+    with self._lock:
+      stats = self.routes.setdefault(routeName, {
+          "samples": 0,
+          "totalPeakBytes": 0,
+          "maxPeakBytes": 0,
+          "lastPeakBytes": 0
+      })
+      stats["samples"] += 1
+      stats["totalPeakBytes"] += peak
+      stats["maxPeakBytes"] = max(stats["maxPeakBytes"], peak)
+      stats["lastPeakBytes"] = peak
+
+  def metrics(self) -> dict:
+    """
+    Get the tracing state, the traced memory and the peaks per route.
+
+    Returns:
+      dict: The metrics, with the routes by decreasing maximum peak.
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    with self._lock:
+      routes = {
+          name: {
+              **stats, "avgPeakBytes":
+                  stats["totalPeakBytes"] // stats["samples"]
+          } for name, stats in sorted(self.routes.items(),
+                                      key=lambda item: -item[1]["maxPeakBytes"])
+      }
+    return {
+        "tracing": self.tracing,
+        "stopsAt": self.stopsAt,
+        "tracedBytes": current,
+        "tracedPeakBytes": peak,
+        "rssBytes": rssBytes(),
+        "routes": routes
+    }
+
+  def snapshot(self) -> dict:
+    """
+    Take a heap snapshot, and write its difference with the previous one, or
+    its largest allocations for the first one, to the diagnostics directory.
+
+    Returns:
+      dict: The file name, and the size and count differences.
+
+    Raises:
+      HTTPException: If allocations are not being traced.
+    """
+    if not self.tracing:
+      raise HTTPException(status_code=409,
+                          detail="Start tracing before taking snapshots")
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    with self._lock:
+      previous, self._snapshot = self._snapshot, snapshot
+
+    if previous is None:
+      stats = snapshot.statistics("lineno")[:self.top]
+      kind = "top"
+    else:
+      stats = snapshot.compare_to(previous, "lineno")[:self.top]
+      kind = "diff"
+    lines = [str(stat) for stat in stats]
+    fileName = (f"{time.strftime('%Y%m%dT%H%M%S')}_{kind}_"
+                f"{secrets.token_hex(3)}.txt")
+    written = self.write(fileName, "\n".join(lines) + "\n")
+    return {
+        "file": fileName if written else None,
+        "kind": kind,
+        "sizeDiffBytes": sum(getattr(stat, "size_diff", 0) for stat in stats),
+        "countDiff": sum(getattr(stat, "count_diff", 0) for stat in stats),
+        "lines": lines[:10]
+    }
+
+  def write(self, fileName: str, content: str) -> bool:
+    """
+    Write a file to the diagnostics directory, evicting the oldest files to
+    stay under the disk cap.
+
+    Args:
+      fileName (str): The file name.
+      content (str): The file content.
+
+    Returns:
+      bool: Whether the file could fit.
+    """
+    size = len(content.encode())
+    if size > self.maxBytes:
+      return False
+    with self._lock:
+      os.makedirs(self.directory, exist_ok=True)
+      files = sorted((entry for entry in os.scandir(self.directory)
+                      if entry.is_file()),
+                     key=lambda entry: entry.stat().st_mtime)
+      used = sum(entry.stat().st_size for entry in files)
+      while files and used + size > self.maxBytes:
+        oldest = files.pop(0)
+        used -= oldest.stat().st_size
+        os.remove(oldest.path)
+      with open(os.path.join(self.directory, fileName), "w") as file:
+        file.write(content)
+    return True
+
+  def objects(self) -> dict:
+    """
+    Count the live ORM instances, sessions and Pydantic models, by walking
+    every object tracked by the garbage collector; it takes a while on a
+    large heap, so it only runs on demand.
+
+    Returns:
+      dict: The live Car and Trip instances, sessions, and the Pydantic
+        models by class name, most numerous first.
+    """
+    # Imported here, as the models import the core modules
+    from models import Car, Trip
+
+    counts = Counter()
+    models = Counter()
+    for obj in gc.get_objects():
+      objType = type(obj)
+      if objType is Car or objType is Trip:
+        counts[objType.__name__] += 1
+      elif isinstance(obj, Session):
+        counts["Session"] += 1
+      elif isinstance(obj, BaseModel):
+        models[objType.__name__] += 1
+    return {
+        "cars": counts["Car"],
+        "trips": counts["Trip"],
+        "sessions": counts["Session"],
+        "pydanticModels": dict(models.most_common(self.top))
+    }
+
+
+def rssBytes() -> int | None:
+  """
+  Read the resident memory of the process, on Linux.
+
+  Returns:
+    int | None: The resident bytes, None where /proc is not available.
+  """
+  try:
+    with open("/proc/self/statm") as file:
+      return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+  except (OSError, ValueError, IndexError):
+    return None
+
+
+### Global Variables ###
+memoryDiagnostics = MemoryDiagnostics(
+    enabled=config.MEMORY_DIAGNOSTICS_ENABLED,
+    token=config.MEMORY_DIAGNOSTICS_TOKEN,
+    sampleRate=config.MEMORY_SAMPLE_RATE,
+    frames=config.MEMORY_TRACE_FRAMES,
+    maxSeconds=config.MEMORY_TRACE_MAX_SECONDS,
+    directory=config.MEMORY_SNAPSHOT_DIR,
+    maxBytes=config.MEMORY_SNAPSHOT_MAX_BYTES,
+    top=config.MEMORY_SNAPSHOT_TOP)
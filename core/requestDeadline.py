@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: requestDeadline.py
+Description: This script defines the request deadlines of the car sharing API.
+ Each route may spend a limited time in the database: the time left is set as
+ the PostgreSQL statement_timeout of every transaction of its session, so a
+ runaway query is stopped by the server and answered with a 504, instead of
+ holding a pooled connection. The DeadlineMiddleware also cancels the queries
+ of a request whose client disconnected.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import asyncio
+import logging
+import threading
+import time
+from fastapi import HTTPException, Request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+# Deadlines of the routes that need another one than the default, in
+# seconds, by route name (the name of the endpoint function);
+# Config.ROUTE_DEADLINES overrides them
+DEFAULT_ROUTE_DEADLINES = {
+    "getCarById": 5,
+    "getCarsByIds": 10,
+    "getCarFacets": 10,
+    "login": 5,
+    # Bulk writes touch many rows on purpose
+    "bulkUpdateCars": 120,
+    "bulkDeleteCars": 120,
+    "bulkSignup": 120
+}
+# Key of the request tracker in the request state
+TRACKER_KEY = "requestTracker"
+# SQLSTATE of a statement cancelled by a timeout or a cancel request
+QUERY_CANCELED = "57014"
+
+
+class DeadlineExceeded(Exception):
+  """
+  Raised when a transaction begins after the deadline of its request.
+  """
+
+
+class RequestTracker:
+  """
+  The start time of a request, and the database connections it is using, so
+  their queries can be cancelled from the event loop.
+
+  Attributes:
+    startedAt (float): The monotonic time the request was received.
+    disconnected (bool): Whether the client disconnected.
+    finished (bool): Whether the response was sent.
+  """
+
+  def __init__(self):
+    """
+    Initialize the tracker of a request received now.
+    """
+    self.startedAt = time.monotonic()
+    self.disconnected = False
+    self.finished = False
+    self._connections = []
+    self._lock = threading.Lock()
+
+  def track(self, connection):
+    """
+    Register a DBAPI connection running a transaction of the request.
+
+    Args:
+      connection: The DBAPI connection.
+    """
+    with self._lock:
+      self._connections.append(connection)
+
+  def release(self):
+    """
+    Forget the connections, once their transactions ended; they go back to
+    the pool and may run the queries of other requests.
+    """
+    with self._lock:
+      self._connections.clear()
+
+  def cancel(self) -> int:
+    """
+    Cancel the running queries of the request. Blocking, since the cancel
+    request is sent over its own connection to the database.
+
+    Returns:
+      int: The number of connections a cancel was sent to.
+    """
+    with self._lock:
+      if self.finished:
+        return 0
+      cancelled = 0
+      for connection in self._connections:
+        # psycopg 3, psycopg2, then sqlite3
+        cancel = (getattr(connection, "cancel_safe", None) or
+                  getattr(connection, "cancel", None) or
+                  getattr(connection, "interrupt", None))
+        if cancel is None:
+          continue
+        try:
+          cancel()
+          cancelled += 1
+        except Exception:
+          logger.exception("Failed to cancel a query")
+      return cancelled
+
+
+class RequestDeadlines:
+  """
+  The database deadline of each route, applied to the sessions of its
+  requests.
+
+  Attributes:
+    default (float): The deadline of the routes without their own, in
+      seconds, 0 for none.
+    routes (dict): The deadlines by route name.
+  """
+
+  def __init__(self, default: float, routes: dict):
+    """
+    Initialize the deadlines.
+
+    Args:
+      default (float): The deadline of the routes without their own, in
+        seconds, 0 for none.
+      routes (dict): The deadlines by route name, added to
+        DEFAULT_ROUTE_DEADLINES.
+    """
+    self.default = default
+    self.routes = {**DEFAULT_ROUTE_DEADLINES, **routes}
+
+  def deadlineFor(self, name: str) -> float | None:
+    """
+    Get the deadline of a route.
+
+    Args:
+      name (str): The name of the route, such as getCarById.
+
+    Returns:
+      float | None: The deadline in seconds, None for none.
+    """
+    return self.routes.get(name, self.default) or None
+
+  def attach(self, session: Session, request: Request) -> RequestTracker:
+    """
+    Apply the deadline of a request to its session: every transaction sets
+    the time left as its statement_timeout, and registers its connection to
+    be cancelled if the client disconnects.
+
+    Args:
+      session (Session): The session of the request.
+      request (Request): The request.
+
+    Returns:
+      RequestTracker: The tracker of the request.
+    """
+    state = request.scope.setdefault("state", {})
+    # Set by the DeadlineMiddleware; requests that did not go through it
+    # start now
+    tracker = state.setdefault(TRACKER_KEY, RequestTracker())
+    route = request.scope.get("route")
+    deadline = self.deadlineFor(route.name) if route is not None else None
+    expiresAt = tracker.startedAt + deadline if deadline else None
+
+    @event.listens_for(session, "after_begin")
+    def applyDeadline(session, transaction, connection):
+      tracker.track(connection.connection.dbapi_connection)
+      if expiresAt is None:
+        return
+      remaining = expiresAt - time.monotonic()
+      if remaining <= 0:
+        raise DeadlineExceeded(f"The deadline of {deadline}s has passed")
+      if connection.dialect.name == "postgresql":
+        # LOCAL ends with the transaction, so the pooled connection keeps
+        # the server default
+        connection.exec_driver_sql(
+            f"SET LOCAL statement_timeout = {max(int(remaining * 1000), 1)}")
+
+    @event.listens_for(session, "after_transaction_end")
+    def releaseConnections(session, transaction):
+      if transaction.parent is None:
+        tracker.release()
+
+    return tracker
+
+  @staticmethod
+  def httpError(error: Exception,
+                tracker: RequestTracker) -> HTTPException | None:
+    """
+    Translate the failure of a request caused by its deadline, a cancel or
+    an exhausted pool into a clean error, whatever the route made of it.
+
+    Args:
+      error (Exception): The exception raised by the route.
+      tracker (RequestTracker): The tracker of the request.
+
+    Returns:
+      HTTPException | None: The 504 or 503 error, None for other failures.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+      seen.add(id(error))
+      sqlState = getattr(error, "pgcode", None) or getattr(
+          error, "sqlstate", None)
+      if isinstance(error, DeadlineExceeded) or (sqlState == QUERY_CANCELED and
+                                                 not tracker.disconnected):
+        return HTTPException(status_code=504,
+                             detail="The request deadline was exceeded")
+      if sqlState == QUERY_CANCELED:
+        return HTTPException(status_code=503,
+                             detail="The client disconnected")
+      if isinstance(error, PoolTimeoutError):
+        return HTTPException(status_code=503,
+                             detail="No database connection is available",
+                             headers={"Retry-After": "1"})
+      error = error.__cause__ or error.__context__
+    return None
+
+
+class DeadlineMiddleware:
+  """
+  ASGI middleware tracking each HTTP request, and cancelling its queries when
+  the client disconnects.
+
+  It is the only reader of the client messages: they are read as they come
+  and queued for the app, so a disconnect is seen even while a route runs
+  without reading them.
+
+  Attributes:
+    app (ASGIApp): The wrapped application.
+  """
+
+  def __init__(self, app):
+    """
+    Wrap an application.
+
+    Args:
+      app (ASGIApp): The wrapped application.
+    """
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+
+    tracker = RequestTracker()
+    scope.setdefault("state", {})[TRACKER_KEY] = tracker
+    messages = asyncio.Queue()
+
+    async def watch():
+      while True:
+        message = await receive()
+        messages.put_nowait(message)
+        if message["type"] == "http.disconnect":
+          tracker.disconnected = True
+          # Off the event loop, and off the thread limiter of the routes
+          await asyncio.get_running_loop().run_in_executor(
+              None, tracker.cancel)
+          return
+
+    async def receiveMessage():
+      if tracker.disconnected and messages.empty():
+        return {"type": "http.disconnect"}
+      return await messages.get()
+
+    async def sendMessage(message):
+      if message["type"] == "http.response.body" and not message.get(
+          "more_body", False):
+        tracker.finished = True
+      await send(message)
+
+    watcher = asyncio.create_task(watch())
+    try:
+      await self.app(scope, receiveMessage, sendMessage)
+    finally:
+      tracker.finished = True
+      watcher.cancel()
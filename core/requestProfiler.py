@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: requestProfiler.py
+Description: This script defines the RequestProfiler, an opt-in statistical
+ profiler for single requests. While a selected request runs, a sampler thread
+ records the stacks of the thread running its route, then writes them in the
+ folded stack format read by flamegraph.pl and speedscope, tagged with the
+ route and the request duration.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import functools
+import inspect
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from .database import config
+
+# Source files whose functions only wait; threads stopped in them are idle
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+# Sampler of the request being profiled, seen by its route in any thread, as
+# the context is copied into the worker threads
+currentSampler = ContextVar("currentSampler", default=None)
+
+
+class StackSampler:
+  """
+  Sample the stacks of the threads running a request at a fixed interval.
+
+  Attributes:
+    interval (float): The seconds between two samples.
+    stacks (Counter): The number of samples of each folded stack.
+    threads (set): The idents of the threads running the route of the
+      request, registered by the ProfiledRoute.
+  """
+
+  def __init__(self, interval: float):
+    """
+    Initialize a stopped sampler.
+
+    Args:
+      interval (float): The seconds between two samples.
+    """
+    self.interval = interval
+    self.stacks = Counter()
+    self.threads = set()
+    self._stopped = threading.Event()
+    self._thread = threading.Thread(target=self._run,
+                                    name="stackSampler",
+                                    daemon=True)
+
+  def start(self):
+    """
+    Start sampling in a background thread.
+    """
+    self._thread.start()
+
+  def stop(self):
+    """
+    Stop sampling and wait for the sampler thread.
+    """
+    self._stopped.set()
+    self._thread.join()
+
+  def _run(self):
+    """
+    Take samples until stopped.
+    """
+    while not self._stopped.wait(self.interval):
+      frames = sys._current_frames()
+      for threadId in tuple(self.threads):
+        frame = frames.get(threadId)
+        if frame is None:
+          continue
+        if os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+          continue
+        self.stacks[self._fold(frame)] += 1
+
+  @staticmethod
+  def _fold(frame) -> str:
+    """
+    Fold a stack into "outer;...;inner" form.
+
+    Args:
+      frame (FrameType): The innermost frame of the stack.
+
+    Returns:
+      str: The folded stack.
+    """
+    names = []
+    while frame is not None:
+      code = frame.f_code
+      fileName = os.path.basename(code.co_filename)
+      names.append(f"{code.co_name} ({fileName}:{code.co_firstlineno})")
+      frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestProfiler:
+  """
+  Opt-in per-request profiler with caps on concurrent captures and disk usage.
+
+  A request is profiled when the profiler is enabled and either carries the
+  X-Profile header with the configured token, or is picked by the sampling
+  rate.
+
+  Attributes:
+    enabled (bool): Whether requests may be profiled at all.
+    token (str, optional): The X-Profile header value that forces a capture.
+    sampleRate (float): The fraction of requests profiled without the header.
+    directory (str): The directory the profiles are written to.
+    maxBytes (int): The maximum disk usage of the profile directory.
+    interval (float): The seconds between two stack samples.
+  """
+
+  def __init__(self, enabled: bool, token: str | None, sampleRate: float,
+               directory: str, maxBytes: int, maxConcurrent: int,
+               interval: float):
+    """
+    Initialize the profiler.
+
+    Args:
+      enabled (bool): Whether requests may be profiled at all.
+      token (str, optional): The X-Profile header value that forces a capture.
+      sampleRate (float): The fraction of requests profiled without the header.
+      directory (str): The directory the profiles are written to.
+      maxBytes (int): The maximum disk usage of the profile directory.
+      maxConcurrent (int): The maximum number of simultaneous captures.
+      interval (float): The seconds between two stack samples.
+    """
+    self.enabled = enabled
+    self.token = token
+    self.sampleRate = sampleRate
+    self.directory = directory
+    self.maxBytes = maxBytes
+    self.interval = interval
+    self._slots = threading.BoundedSemaphore(maxConcurrent)
+    self._diskLock = threading.Lock()
+
+  def wants(self, request: Request) -> bool:
+    """
+    Tell whether a request should be profiled.
+
+    Args:
+      request (Request): The incoming request.
+
+    Returns:
+      bool: True if the request should be profiled.
+    """
+    if not self.enabled:
+      return False
+    header = request.headers.get("X-Profile")
+    if header and self.token and secrets.compare_digest(header, self.token):
+      return True
+    return self.sampleRate > 0 and random.random() < self.sampleRate
+
+  async def __call__(self, request: Request, callNext):
+    """
+    Run a request, profiling it when selected and a capture slot is free.
+
+    Args:
+      request (Request): The incoming request.
+      callNext (callable): The next step of the middleware chain.
+
+    Returns:
+      Response: The response, with an X-Profile-File header when profiled.
+    """
+    if not self.wants(request) or not self._slots.acquire(blocking=False):
+      return await callNext(request)
+
+    try:
+      sampler = StackSampler(self.interval)
+      start = time.perf_counter()
+      sampler.start()
+      token = currentSampler.set(sampler)
+      try:
+        response = await callNext(request)
+      finally:
+        currentSampler.reset(token)
+        sampler.stop()
+      durationMs = (time.perf_counter() - start) * 1000
+      # Keep the disk work off the event loop
+      fileName = await run_in_threadpool(self.write, request, sampler.stacks,
+                                         durationMs)
+    finally:
+      self._slots.release()
+
+    if fileName:
+      response.headers["X-Profile-File"] = fileName
+    return response
+
+  def write(self, request: Request, stacks: Counter,
+            durationMs: float) -> str | None:
+    """
+    Write a capture to the profile directory, evicting the oldest captures to
+    stay under the disk cap.
+
+    Args:
+      request (Request): The profiled request.
+      stacks (Counter): The samples of each folded stack.
+      durationMs (float): The request duration in milliseconds.
+
+    Returns:
+      str | None: The file name, or None if the capture could not fit.
+    """
+    route = request.scope.get("route")
+    routeName = getattr(route, "name", None) or request.url.path
+    routeName = re.sub(r"[^A-Za-z0-9_-]+", "_", routeName).strip("_")
+    fileName = (f"{time.strftime('%Y%m%dT%H%M%S')}_{request.method}_"
+                f"{routeName}_{durationMs:.0f}ms_{secrets.token_hex(3)}.folded")
+    content = "".join(f"{stack} {count}\n" for stack, count in stacks.items())
+    size = len(content.encode())
+    if size > self.maxBytes:
+      return None
+
+    with self._diskLock:
+      os.makedirs(self.directory, exist_ok=True)
+      files = sorted((entry for entry in os.scandir(self.directory)
+                      if entry.is_file()),
+                     key=lambda entry: entry.stat().st_mtime)
+      used = sum(entry.stat().st_size for entry in files)
+      while files and used + size > self.maxBytes:
+        oldest = files.pop(0)
+        used -= oldest.stat().st_size
+        os.remove(oldest.path)
+      with open(os.path.join(self.directory, fileName), "w") as file:
+        file.write(content)
+    return fileName
+
+
+@contextmanager
+def sampledThread():
+  """
+  Have the current thread sampled while it runs a route of the request being
+  profiled, if any.
+  """
+  sampler = currentSampler.get()
+  if sampler is None:
+    yield
+    return
+  threadId = threading.get_ident()
+  sampler.threads.add(threadId)
+  try:
+    yield
+  finally:
+    sampler.threads.discard(threadId)
+
+
+def profiledEndpoint(endpoint):
+  """
+  Wrap a route function so the thread running it is sampled when its request
+  is profiled. Generator functions are left as they are.
+
+  The event loop thread of an async route also runs the other requests while
+  the route awaits, so their stacks may show up in its profile.
+
+  Args:
+    endpoint (callable): The route function.
+
+  Returns:
+    callable: The wrapped function, with the same signature.
+  """
+  if inspect.iscoroutinefunction(endpoint):
+
+    @functools.wraps(endpoint)
+    async def runAsync(*args, **kwargs):
+      with sampledThread():
+        return await endpoint(*args, **kwargs)
+
+    return runAsync
+  if (inspect.isgeneratorfunction(endpoint) or
+      inspect.isasyncgenfunction(endpoint)):
+    return endpoint
+
+  @functools.wraps(endpoint)
+  def run(*args, **kwargs):
+    with sampledThread():
+      return endpoint(*args, **kwargs)
+
+  return run
+
+
+class ProfiledRoute(APIRoute):
+  """
+  API route whose function registers its thread with the profiler, so a
+  capture only holds the stacks of its own request. Used as the route_class
+  of the routers.
+  """
+
+  def __init__(self, path: str, endpoint, **kwargs):
+    super().__init__(path, profiledEndpoint(endpoint), **kwargs)
+
+
+### Global Variables ###
+requestProfiler = RequestProfiler(enabled=config.PROFILER_ENABLED,
+                                  token=config.PROFILER_TOKEN,
+                                  sampleRate=config.PROFILER_SAMPLE_RATE,
+                                  directory=config.PROFILER_DIR,
+                                  maxBytes=config.PROFILER_MAX_BYTES,
+                                  maxConcurrent=config.PROFILER_MAX_CONCURRENT,
+                                  interval=config.PROFILER_INTERVAL)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: server.py
+Description: This script is the production entry point of the car sharing API.
+ It runs the app with the worker count, event loop, HTTP parser, keep-alive,
+ backlog, graceful timeout and worker recycling taken from Config. Gunicorn is
+ used as the process manager when installed, since it can preload the app
+ before forking; otherwise Uvicorn supervises the workers itself:
+   python -m core.server
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import importlib.util
+import os
+from .config import Config
+from .database import config
+
+APP = "main:app"
+
+
+def isInstalled(module: str) -> bool:
+  """
+  Tell whether an optional module can be imported.
+
+  Args:
+    module (str): The module name.
+
+  Returns:
+    bool: True if the module is installed.
+  """
+  return importlib.util.find_spec(module) is not None
+
+
+def cpuCount() -> int:
+  """
+  Count the cores this process may run on, honoring CPU affinity.
+
+  Returns:
+    int: The number of usable cores.
+  """
+  if hasattr(os, "sched_getaffinity"):
+    return len(os.sched_getaffinity(0))
+  return os.cpu_count() or 1
+
+
+def workerCount(config: Config) -> int:
+  """
+  Pick the number of worker processes.
+
+  Each worker runs its own event loop, so one worker per core keeps every core
+  busy without processes competing for the same one.
+
+  Args:
+    config (Config): The configuration.
+
+  Returns:
+    int: The number of workers.
+  """
+  return config.SERVER_WORKERS or cpuCount()
+
+
+def uvicornOptions(config: Config) -> dict:
+  """
+  Build the Uvicorn options, using uvloop and httptools when installed.
+
+  Args:
+    config (Config): The configuration.
+
+  Returns:
+    dict: The keyword arguments of uvicorn.run.
+  """
+  return {
+      "host": config.SERVER_HOST,
+      "port": config.SERVER_PORT,
+      "workers": workerCount(config),
+      "loop": "uvloop" if isInstalled("uvloop") else "asyncio",
+      "http": "httptools" if isInstalled("httptools") else "h11",
+      "timeout_keep_alive": config.SERVER_KEEP_ALIVE,
+      "backlog": config.SERVER_BACKLOG,
+      "timeout_graceful_shutdown": config.SERVER_GRACEFUL_TIMEOUT,
+      "limit_max_requests": config.SERVER_MAX_REQUESTS or None,
+      "limit_max_requests_jitter": config.SERVER_MAX_REQUESTS_JITTER,
+      "proxy_headers": True,
+  }
+
+
+def gunicornOptions(config: Config) -> dict:
+  """
+  Build the Gunicorn settings, running the app in Uvicorn workers.
+
+  The Uvicorn worker picks uvloop and httptools by itself when installed.
+
+  Args:
+    config (Config): The configuration.
+
+  Returns:
+    dict: The Gunicorn settings.
+  """
+  if isInstalled("uvicorn_worker"):
+    workerClass = "uvicorn_worker.UvicornWorker"
+  else:
+    workerClass = "uvicorn.workers.UvicornWorker"
+  return {
+      "bind": f"{config.SERVER_HOST}:{config.SERVER_PORT}",
+      "workers": workerCount(config),
+      "worker_class": workerClass,
+      "keepalive": config.SERVER_KEEP_ALIVE,
+      "backlog": config.SERVER_BACKLOG,
+      "graceful_timeout": config.SERVER_GRACEFUL_TIMEOUT,
+      "preload_app": config.SERVER_PRELOAD,
+      "max_requests": config.SERVER_MAX_REQUESTS,
+      "max_requests_jitter": config.SERVER_MAX_REQUESTS_JITTER,
+  }
+
+
+def runGunicorn(config: Config):
+  """
+  Run the app under Gunicorn.
+
+  Args:
+    config (Config): The configuration.
+  """
+  from gunicorn.app.base import BaseApplication
+
+  class Application(BaseApplication):
+    """
+    Gunicorn application configured from a dictionary instead of the command
+    line.
+    """
+
+    def load_config(self):
+      for key, value in gunicornOptions(config).items():
+        self.cfg.set(key, value)
+
+    def load(self):
+      from main import app
+      return app
+
+  Application().run()
+
+
+def runUvicorn(config: Config):
+  """
+  Run the app under Uvicorn's own worker supervisor.
+
+  Args:
+    config (Config): The configuration.
+  """
+  import uvicorn
+
+  if config.SERVER_PRELOAD:
+    print("SERVER_PRELOAD needs gunicorn, workers will import the app")
+  uvicorn.run(APP, **uvicornOptions(config))
+
+
+def main():
+  if isInstalled("gunicorn"):
+    runGunicorn(config)
+  else:
+    runUvicorn(config)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: statementCache.py
+Description: This script defines the StatementCache, which counts how often
+ the statements run by the car sharing API are found in SQLAlchemy's compiled
+ statement cache, so a statement rebuilt in a way that defeats the cache shows
+ up as misses. The fixed queries of the API are built once with bound
+ parameters, and run as server-side prepared statements when the driver is
+ psycopg 3.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import threading
+from sqlalchemy import Engine, event
+from sqlalchemy.engine.interfaces import CacheStats
+from .database import carsDb, config
+
+
+class StatementCache:
+  """
+  Compiled statement cache statistics of an engine.
+
+  Attributes:
+    engine (Engine): The engine whose statements are counted.
+  """
+
+  def __init__(self, engine: Engine):
+    """
+    Start counting the statements run by the engine.
+
+    Args:
+      engine (Engine): The engine whose statements are counted.
+    """
+    self.engine = engine
+    self._counts = {"raw": 0, **{stat.name: 0 for stat in CacheStats}}
+    self._lock = threading.Lock()
+    event.listen(engine, "after_cursor_execute", self._record)
+
+  def _record(self, connection, cursor, statement, parameters, context,
+              executemany):
+    """
+    Count the cache outcome of an executed statement.
+    """
+    if context is None or context.compiled is None:
+      # SQL run straight through the driver is not compiled, so it has no
+      # cache outcome
+      name = "raw"
+    else:
+      name = CacheStats(context.cache_hit).name
+    with self._lock:
+      self._counts[name] += 1
+
+  def metrics(self) -> dict:
+    """
+    Get the cache outcomes and the cache settings.
+
+    Returns:
+      dict: The executions per outcome, the hit ratio of compiled statements,
+        the compiled cache size and capacity, and the prepared statement
+        threshold of the driver.
+    """
+    with self._lock:
+      counts = dict(self._counts)
+    compiled = counts["CACHE_HIT"] + counts["CACHE_MISS"]
+    cache = getattr(self.engine, "_compiled_cache", None)
+    return {
+        "hits": counts["CACHE_HIT"],
+        "misses": counts["CACHE_MISS"],
+        "uncached": counts["CACHING_DISABLED"] + counts["NO_CACHE_KEY"] +
+                    counts["NO_DIALECT_SUPPORT"],
+        "raw": counts["raw"],
+        "hitRatio": counts["CACHE_HIT"] / compiled if compiled else 0.0,
+        "size": len(cache) if cache is not None else 0,
+        "capacity": cache.capacity if cache is not None else 0,
+        "driver": self.engine.dialect.driver,
+        "prepareThreshold": config.DB_PREPARE_THRESHOLD
+                            if self.engine.dialect.driver == "psycopg" else None
+    }
+
+
+### Global Variables ###
+statementCache = StatementCache(engine=carsDb.engine)
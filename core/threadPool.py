@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: threadPool.py
+Description: This script defines the ThreadPool, which sizes the AnyIO thread
+ limiter running the sync routes and dependencies of the car sharing API, and
+ measures its saturation. The limiter defaults to the connections the database
+ pool may open plus some headroom, instead of AnyIO's fixed 40 tokens, and a
+ periodic probe times how long a call waits for a worker thread, so requests
+ no longer queue invisibly.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import asyncio
+import time
+from anyio import to_thread
+from sqlalchemy import Engine
+from .database import carsDb, config
+
+# AnyIO's own default, used when the pool size is unknown
+DEFAULT_SIZE = 40
+
+
+class ThreadPool:
+  """
+  Worker thread capacity of the sync routes, with saturation metrics.
+
+  Attributes:
+    engine (Engine): The engine whose pool the capacity follows.
+    size (int, optional): The number of worker threads, None to follow the
+      pool.
+    headroom (int): The threads added to the pool connections, for the routes
+      that do not use the database.
+    probeInterval (float): The seconds between two wait time probes, 0 to
+      disable them.
+  """
+
+  def __init__(self, engine: Engine, size: int | None, headroom: int,
+               probeInterval: float):
+    """
+    Initialize the thread pool; start applies its size.
+
+    Args:
+      engine (Engine): The engine whose pool the capacity follows.
+      size (int, optional): The number of worker threads, None to follow the
+        pool.
+      headroom (int): The threads added to the pool connections.
+      probeInterval (float): The seconds between two wait time probes, 0 to
+        disable them.
+    """
+    self.engine = engine
+    self.size = size
+    self.headroom = headroom
+    self.probeInterval = probeInterval
+    self._limiter = None
+    self._task = None
+    self._stats = {
+        "probes": 0,
+        "lastWaitMs": 0.0,
+        "maxWaitMs": 0.0,
+        "totalWaitMs": 0.0,
+        "maxWaiting": 0,
+        "maxBusy": 0
+    }
+
+  def capacity(self) -> int:
+    """
+    Pick the number of worker threads.
+
+    With one thread per pool connection, plus headroom, threads never pile up
+    waiting for a connection, and the pool is never idle for lack of threads.
+
+    Returns:
+      int: The number of worker threads.
+    """
+    if self.size:
+      return self.size
+    pool = self.engine.pool
+    if not hasattr(pool, "checkedout"):
+      # Pools without a limit, like SQLite's, do not bound the threads
+      return DEFAULT_SIZE
+    return pool.size() + max(getattr(pool, "_max_overflow", 0),
+                             0) + self.headroom
+
+  async def start(self):
+    """
+    Resize the thread limiter of the running event loop, and start probing
+    it. Called from the lifespan, since each event loop has its own limiter.
+    """
+    self._limiter = to_thread.current_default_thread_limiter()
+    self._limiter.total_tokens = self.capacity()
+    if self.probeInterval > 0 and self._task is None:
+      self._task = asyncio.create_task(self._probeLoop())
+
+  async def stop(self):
+    """
+    Stop probing the thread limiter.
+    """
+    if self._task is None:
+      return
+    self._task.cancel()
+    try:
+      await self._task
+    except asyncio.CancelledError:
+      pass
+    self._task = None
+
+  async def probe(self) -> float:
+    """
+    Time how long a call waits for a worker thread right now, as a sync route
+    would, and sample the queue depth and busy threads.
+
+    Returns:
+      float: The wait, in milliseconds.
+    """
+    statistics = self._limiter.statistics()
+    start = time.perf_counter()
+    # The function runs once a thread is free, and returns when it started
+    startedAt = await to_thread.run_sync(time.perf_counter)
+    waitMs = (startedAt - start) * 1000
+
+    stats = self._stats
+    stats["probes"] += 1
+    stats["lastWaitMs"] = waitMs
+    stats["maxWaitMs"] = max(stats["maxWaitMs"], waitMs)
+    stats["totalWaitMs"] += waitMs
+    stats["maxWaiting"] = max(stats["maxWaiting"], statistics.tasks_waiting)
+    stats["maxBusy"] = max(stats["maxBusy"], statistics.borrowed_tokens)
+    return waitMs
+
+  async def _probeLoop(self):
+    """
+    Probe the thread limiter until cancelled.
+    """
+    while True:
+      await self.probe()
+      await asyncio.sleep(self.probeInterval)
+
+  def metrics(self) -> dict:
+    """
+    Get the thread pool usage. Must be called from the event loop, so the
+    metrics route is async and never waits for a thread itself.
+
+    Returns:
+      dict: The size, busy threads, calls waiting for one, and the probed
+        wait times.
+    """
+    stats = dict(self._stats)
+    totalWaitMs = stats.pop("totalWaitMs")
+    probes = stats["probes"]
+    if self._limiter is None:
+      size, busy, waiting = self.capacity(), 0, 0
+    else:
+      statistics = self._limiter.statistics()
+      size = int(statistics.total_tokens)
+      busy = statistics.borrowed_tokens
+      waiting = statistics.tasks_waiting
+    return {
+        "size": size,
+        "busy": busy,
+        "waiting": waiting,
+        **stats,
+        "avgWaitMs": totalWaitMs / probes if probes else 0.0
+    }
+
+
+### Global Variables ###
+threadPool = ThreadPool(engine=carsDb.engine,
+                        size=config.THREADPOOL_SIZE,
+                        headroom=config.THREADPOOL_HEADROOM,
+                        probeInterval=config.THREADPOOL_PROBE_INTERVAL)
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: tripArchive.py
+Description: This script defines the TripArchive, which moves cold trips out
+ of the trip table into gzip-compressed NDJSON segment files, so the hot table
+ stays small as history piles up. The trips of each car are one gzip member of
+ a segment, located by a small per-car offset index, so the archived trips of
+ a car are read without decompressing the rest. Run the archival job with:
+   python -m core.tripArchive --keep 100
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from itertools import groupby
+from sqlmodel import Session, select, delete, func, or_
+from models import Car, Trip
+from .database import carsDb, config
+
+INDEX_FILE = "index.json"
+# Trip columns stored in the segments
+TRIP_COLUMNS = ("id", "start", "end", "description", "carId")
+
+
+class TripArchive:
+  """
+  Archive of cold trips in gzip NDJSON segments with a per-car offset index.
+
+  The index maps each car ID to the [segment, offset, length, count] entries
+  of its gzip members. It is reloaded whenever the file changes, so workers
+  see the segments written by the archival job.
+
+  Attributes:
+    directory (str): The directory of the segments and the index.
+  """
+
+  def __init__(self, directory: str):
+    """
+    Initialize the archive; the index is read on first use.
+
+    Args:
+      directory (str): The directory of the segments and the index.
+    """
+    self.directory = directory
+    self._index = {}
+    self._indexVersion = None
+    self._lock = threading.Lock()
+
+  def _path(self, name: str) -> str:
+    """
+    Build the path of a file of the archive.
+    """
+    return os.path.join(self.directory, name)
+
+  def index(self) -> dict:
+    """
+    Get the offset index, reloading it if the file changed.
+
+    Returns:
+      dict: The [segment, offset, length, count] entries by car ID.
+    """
+    try:
+      stat = os.stat(self._path(INDEX_FILE))
+      # The index is replaced, never rewritten, so its inode changes too
+      version = (stat.st_ino, stat.st_mtime_ns)
+    except FileNotFoundError:
+      return {}
+    with self._lock:
+      if version != self._indexVersion:
+        with open(self._path(INDEX_FILE)) as file:
+          self._index = {
+              int(carId): entries
+              for carId, entries in json.load(file).items()
+          }
+        self._indexVersion = version
+      return self._index
+
+  def _writeIndex(self, index: dict):
+    """
+    Replace the offset index atomically, so readers never see a partial one.
+
+    Args:
+      index (dict): The entries by car ID.
+    """
+    temporaryPath = self._path(INDEX_FILE + ".tmp")
+    with open(temporaryPath, "w") as file:
+      json.dump(index, file, separators=(",", ":"))
+      file.flush()
+      os.fsync(file.fileno())
+    os.replace(temporaryPath, self._path(INDEX_FILE))
+
+  def count(self, carId: int) -> int:
+    """
+    Count the archived trips of a car from the index.
+
+    Args:
+      carId (int): The ID of the car.
+
+    Returns:
+      int: The number of archived trips.
+    """
+    return sum(entry[3] for entry in self.index().get(carId, []))
+
+  def read(self, carId: int) -> list[dict]:
+    """
+    Read the archived trips of a car.
+
+    Args:
+      carId (int): The ID of the car.
+
+    Returns:
+      list[dict]: The trips, in ID order.
+    """
+    tripsById = {}
+    for segment, offset, length, _ in self.index().get(carId, []):
+      with open(self._path(segment), "rb") as file:
+        file.seek(offset)
+        member = gzip.decompress(file.read(length))
+      for line in member.splitlines():
+        trip = json.loads(line)
+        tripsById[trip["id"]] = trip
+    return [tripsById[id] for id in sorted(tripsById)]
+
+  def writeSegment(self, name: str, trips: list[dict]) -> dict:
+    """
+    Write trips to a new segment, one gzip member per car.
+
+    Args:
+      name (str): The file name of the segment.
+      trips (list[dict]): The trips, grouped by car.
+
+    Returns:
+      dict: The [segment, offset, length, count] entry of each car.
+    """
+    os.makedirs(self.directory, exist_ok=True)
+    entries = {}
+    temporaryPath = self._path(name + ".tmp")
+    with open(temporaryPath, "wb") as file:
+      for carId, carTrips in groupby(trips, key=lambda trip: trip["carId"]):
+        lines = [json.dumps(trip, separators=(",", ":")) for trip in carTrips]
+        member = gzip.compress("\n".join(lines).encode())
+        entries[carId] = [name, file.tell(), len(member), len(lines)]
+        file.write(member)
+      file.flush()
+      os.fsync(file.fileno())
+    os.replace(temporaryPath, self._path(name))
+    return entries
+
+  def merge(self, tripsByCar: dict, carIds: list[int], fields: list[str],
+            tripLimit: int | None, newest: bool) -> dict:
+    """
+    Merge the archived trips of cars into their trips read from the table.
+
+    Archived trips are older than the trips left in the table, so when the
+    newest trips are asked for and the table already filled the limit, only
+    the index is read to count them.
+
+    Args:
+      tripsByCar (dict): The trips, with their IDs, and trip count of each car
+        by car ID, as read from the table.
+      carIds (list[int]): The IDs of the cars.
+      fields (list[str]): The trip columns to return, including the ID.
+      tripLimit (int, optional): The maximum number of trips per car.
+      newest (bool): Whether the newest trips come first.
+
+    Returns:
+      dict: The merged trips and trip count of each car by car ID.
+    """
+    index = self.index()
+    for carId in carIds:
+      if carId not in index:
+        continue
+      trips, count = tripsByCar.get(carId, ([], 0))
+      if newest and tripLimit and len(trips) >= tripLimit:
+        tripsByCar[carId] = (trips, count + self.count(carId))
+        continue
+      # A trip can be in both if the job stopped between archiving and
+      # deleting it
+      hotIds = {trip["id"] for trip in trips}
+      archivedTrips = [{field: trip.get(field)
+                        for field in fields}
+                       for trip in self.read(carId)
+                       if trip["id"] not in hotIds]
+      mergedTrips = sorted(trips + archivedTrips,
+                           key=lambda trip: trip["id"],
+                           reverse=newest)
+      tripsByCar[carId] = (mergedTrips[:tripLimit or None],
+                           count + len(archivedTrips))
+    return tripsByCar
+
+  def archive(self,
+              session: Session,
+              keepNewest: int | None = None,
+              beforeId: int | None = None,
+              batchSize: int = 10000) -> int:
+    """
+    Move the cold trips from the table to new segments: those beyond the
+    newest keepNewest of each car, and those with an ID below beforeId.
+
+    Each batch is written to a segment and indexed before its trips are
+    deleted, so a failure never loses trips; at worst a trip is in both
+    places, and readers skip the archived copy.
+
+    Args:
+      session (Session): The database session.
+      keepNewest (int, optional): The trips kept in the table per car, 0 or
+        None to keep every trip.
+      beforeId (int, optional): The trip ID watermark; older trips are moved.
+      batchSize (int): The maximum number of trips per segment.
+
+    Returns:
+      int: The number of trips archived.
+    """
+    conditions = []
+    if keepNewest:
+      rankedTrips = select(
+          Trip.id,
+          func.row_number().over(partition_by=Trip.carId,
+                                 order_by=Trip.id.desc()).label("tripRank"),
+      ).subquery("rankedTrips")
+      conditions.append(
+          Trip.id.in_(
+              select(rankedTrips.c.id).where(
+                  rankedTrips.c.tripRank > keepNewest)))
+    if beforeId is not None:
+      conditions.append(Trip.id < beforeId)
+    if not conditions:
+      return 0
+
+    columns = [getattr(Trip, column) for column in TRIP_COLUMNS]
+    query = select(*columns).where(or_(*conditions)).order_by(
+        Trip.carId, Trip.id).limit(batchSize)
+    archived = 0
+    while True:
+      trips = [row._asdict() for row in session.exec(query).all()]
+      if not trips:
+        break
+      self._append(session, f"trips-{time.time_ns()}.ndjson.gz", trips)
+      archived += len(trips)
+
+    self._prune(session)
+    return archived
+
+  def _append(self, session: Session, name: str, trips: list[dict]):
+    """
+    Write a batch of trips to a segment, index it, then delete the trips.
+
+    Args:
+      session (Session): The database session.
+      name (str): The file name of the segment.
+      trips (list[dict]): The trips, grouped by car.
+    """
+    entries = self.writeSegment(name, trips)
+    index = {
+        carId: list(carEntries)
+        for carId, carEntries in self.index().items()
+    }
+    for carId, entry in entries.items():
+      index.setdefault(carId, []).append(entry)
+    self._writeIndex(index)
+    try:
+      session.exec(
+          delete(Trip).where(Trip.id.in_([trip["id"] for trip in trips])))
+      session.commit()
+    except Exception:
+      session.rollback()
+      raise
+
+  def _prune(self, session: Session):
+    """
+    Drop the index entries of deleted cars. Car IDs are never reused, so they
+    would never be read again.
+
+    Args:
+      session (Session): The database session.
+    """
+    index = self.index()
+    if not index:
+      return
+    existingIds = set(
+        session.exec(select(Car.id).where(Car.id.in_(list(index)))).all())
+    if len(existingIds) < len(index):
+      self._writeIndex({
+          carId: entries
+          for carId, entries in index.items()
+          if carId in existingIds
+      })
+
+
+### Global Variables ###
+tripArchive = TripArchive(directory=config.TRIP_ARCHIVE_DIR)
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Archive cold trips")
+  parser.add_argument("--keep",
+                      type=int,
+                      default=config.TRIP_ARCHIVE_KEEP,
+                      help="Trips kept in the table per car (0 to keep every "
+                      "trip)")
+  parser.add_argument("--before-id",
+                      type=int,
+                      default=config.TRIP_ARCHIVE_BEFORE_ID,
+                      help="Archive the trips with a lower ID")
+  parser.add_argument("--batch-size",
+                      type=int,
+                      default=config.TRIP_ARCHIVE_BATCH_SIZE)
+  args = parser.parse_args()
+  if args.keep < 0:
+    parser.error("--keep must be 0 or more")
+
+  with Session(carsDb.engine) as session:
+    archived = tripArchive.archive(session, args.keep, args.before_id,
+                                   args.batch_size)
+  print(f"Archived {archived} trips to {tripArchive.directory}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: tripQueue.py
+Description: This script defines the TripQueue, a write-behind queue for trip
+ ingestion. Trips are accepted into a bounded in-process queue and a background
+ thread inserts them in batches, flushed by size or by time, so high-volume
+ producers do not hold a database connection per trip.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import logging
+import time
+from queue import Queue, Empty, Full
+from threading import Event, Lock, Thread
+from sqlalchemy import exc
+from sqlmodel import Session, insert
+from models import Trip
+from .database import Database, carsDb, config
+from .changeFeed import changeFeed
+
+logger = logging.getLogger(__name__)
+
+# Errors of the database rather than of the trips: the batch is retried
+TRANSIENT_ERRORS = (exc.OperationalError, exc.InterfaceError, exc.TimeoutError)
+MAX_RETRY_DELAY = 5.0
+
+
+class TripQueue:
+  """
+  Bounded write-behind queue of trips with a batching background flusher.
+
+  Attributes:
+    database (Database): The database the trips are written to.
+    maxSize (int): The maximum number of trips waiting in the queue.
+    batchSize (int): The maximum number of trips inserted per statement.
+    flushInterval (float): The maximum seconds a trip waits for its batch.
+    retryDelay (float): The first seconds to wait before retrying a batch after
+      a transient database error, doubled on each new failure.
+  """
+
+  def __init__(self,
+               database: Database,
+               maxSize: int,
+               batchSize: int,
+               flushInterval: float,
+               retryDelay: float = 0.1):
+    """
+    Initialize a stopped queue.
+
+    Args:
+      database (Database): The database the trips are written to.
+      maxSize (int): The maximum number of trips waiting in the queue.
+      batchSize (int): The maximum number of trips inserted per statement.
+      flushInterval (float): The maximum seconds a trip waits for its batch.
+      retryDelay (float, optional): The first seconds to wait before retrying a
+        batch after a transient database error.
+    """
+    self.database = database
+    self.maxSize = maxSize
+    self.batchSize = batchSize
+    self.flushInterval = flushInterval
+    self.retryDelay = retryDelay
+    self._queue = Queue(maxsize=maxSize)
+    self._stopping = Event()
+    self._putLock = Lock()
+    self._thread = None
+    self._statsLock = Lock()
+    self._stats = {
+        "enqueued": 0,
+        "rejected": 0,
+        "flushed": 0,
+        "failed": 0,
+        "retries": 0,
+        "batches": 0,
+        "totalFlushMs": 0.0,
+        "lastFlushMs": 0.0,
+        "maxFlushMs": 0.0
+    }
+
+  @property
+  def running(self) -> bool:
+    """
+    bool: Whether the background flusher is accepting trips.
+    """
+    return self._thread is not None and not self._stopping.is_set()
+
+  def start(self):
+    """
+    Start the background flusher thread.
+    """
+    if self._thread is not None:
+      return
+    self._stopping.clear()
+    self._thread = Thread(target=self._run, name="tripQueue", daemon=True)
+    self._thread.start()
+
+  def stop(self, timeout: float | None = None):
+    """
+    Stop accepting trips and wait until the queued ones are written.
+
+    Args:
+      timeout (float, optional): The maximum seconds to wait for the drain.
+    """
+    if self._thread is None:
+      return
+    with self._putLock:
+      # No put() is in flight past this point, so the drain sees every trip
+      self._stopping.set()
+    self._thread.join(timeout)
+    if self._thread.is_alive():
+      logger.warning("Trip queue stopped with %d trips not written",
+                     self._queue.qsize())
+    self._thread = None
+
+  def put(self, trip: dict) -> bool:
+    """
+    Queue a validated trip without waiting.
+
+    Args:
+      trip (dict): The trip columns, including its carId.
+
+    Returns:
+      bool: False if the queue is stopped or full, True otherwise.
+    """
+    with self._putLock:
+      if not self.running:
+        return False
+      try:
+        self._queue.put_nowait(trip)
+      except Full:
+        with self._statsLock:
+          self._stats["rejected"] += 1
+        return False
+    with self._statsLock:
+      self._stats["enqueued"] += 1
+    return True
+
+  def metrics(self) -> dict:
+    """
+    Get the queue depth and flush statistics.
+
+    Returns:
+      dict: The queue metrics.
+    """
+    with self._statsLock:
+      stats = dict(self._stats)
+    totalFlushMs = stats.pop("totalFlushMs")
+    batches = stats["batches"]
+    return {
+        "running": self.running,
+        "depth": self._queue.qsize(),
+        "capacity": self.maxSize,
+        **stats,
+        "avgFlushMs": totalFlushMs / batches if batches else 0.0
+    }
+
+  def _run(self):
+    """
+    Flush batches until the queue is stopped and drained.
+    """
+    while not (self._stopping.is_set() and self._queue.empty()):
+      batch = self._collect()
+      if batch:
+        self._flush(batch)
+
+  def _collect(self) -> list[dict]:
+    """
+    Wait for a full batch, or for the flush interval to elapse.
+
+    Returns:
+      list[dict]: The trips of the batch, possibly empty.
+    """
+    batch = []
+    deadline = time.monotonic() + self.flushInterval
+    while len(batch) < self.batchSize:
+      timeout = deadline - time.monotonic()
+      if timeout <= 0:
+        break
+      try:
+        # Wait in short slices, so a stop request is noticed promptly
+        batch.append(self._queue.get(timeout=min(timeout, 0.1)))
+      except Empty:
+        if self._stopping.is_set():
+          break
+    return batch
+
+  def _insert(self, trips: list[dict]) -> list[dict]:
+    """
+    Insert trips with one multi-row INSERT ... RETURNING statement.
+
+    Args:
+      trips (list[dict]): The trips to insert.
+
+    Returns:
+      list[dict]: The inserted trips, including their IDs.
+    """
+    query = insert(Trip).returning(Trip.id, Trip.start, Trip.end,
+                                   Trip.description, Trip.carId)
+    with Session(self.database.engine) as session:
+      inserted = [row._asdict() for row in session.exec(query, params=trips)]
+      session.commit()
+    return inserted
+
+  def _flush(self, batch: list[dict]):
+    """
+    Write a batch, isolating the failing trips when the batch is rejected.
+
+    A transient database error (lost connection, pool timeout) is retried with
+    an exponential backoff until it succeeds; only the trips the database
+    rejects are dropped.
+
+    Args:
+      batch (list[dict]): The trips to write.
+    """
+    start = time.perf_counter()
+    pending = list(batch)
+    inserted = []
+    isolate = False
+    delay = self.retryDelay
+    while pending:
+      try:
+        if not isolate:
+          inserted.extend(self._insert(pending))
+          pending = []
+          continue
+        try:
+          inserted.extend(self._insert(pending[:1]))
+        except TRANSIENT_ERRORS:
+          raise
+        except Exception as e:
+          logger.error("Dropping queued trip %s: %s", pending[0], e)
+        pending.pop(0)
+      except TRANSIENT_ERRORS as e:
+        logger.warning("Writing %d queued trips failed, retrying in %.1fs: %s",
+                       len(pending), delay, e)
+        with self._statsLock:
+          self._stats["retries"] += 1
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_RETRY_DELAY)
+      except Exception:
+        # One bad trip (e.g. an unknown carId) fails the whole statement, so
+        # retry one by one to keep the good ones
+        isolate = True
+    elapsedMs = (time.perf_counter() - start) * 1000
+
+    with self._statsLock:
+      self._stats["flushed"] += len(inserted)
+      self._stats["failed"] += len(batch) - len(inserted)
+      self._stats["batches"] += 1
+      self._stats["totalFlushMs"] += elapsedMs
+      self._stats["lastFlushMs"] = elapsedMs
+      self._stats["maxFlushMs"] = max(self._stats["maxFlushMs"], elapsedMs)
+
+    for trip in inserted:
+      changeFeed.publish("trip", "created", trip["id"], trip)
+
+
+### Global Variables ###
+tripQueue = TripQueue(carsDb,
+                      maxSize=config.TRIP_QUEUE_SIZE,
+                      batchSize=config.TRIP_QUEUE_BATCH_SIZE,
+                      flushInterval=config.TRIP_QUEUE_FLUSH_INTERVAL)
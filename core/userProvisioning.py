@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: userProvisioning.py
+Description: This script provisions users in bulk. Passwords are hashed over a
+ pool of processes, users are inserted in batches, and usernames that already
+ exist are reported as duplicates instead of aborting the batch. It can also be
+ run from the command line on a CSV file with "username" and "password"
+ columns:
+   python -m core.userProvisioning users.csv --batch-size 1000
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import argparse
+import csv
+import json
+import time
+from typing import Iterable, Iterator
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+from schemas import UserSchema
+from models import User
+from utils import hashPasswords, shutdownHashingPool
+from .database import carsDb, config
+
+
+def batched(users: Iterable[UserSchema],
+            batchSize: int) -> Iterator[list[UserSchema]]:
+  """
+  Split users into lists of at most `batchSize` users.
+
+  Args:
+    users (Iterable[UserSchema]): The users to split.
+    batchSize (int): The maximum number of users per batch.
+
+  Yields:
+    list[UserSchema]: The next batch.
+  """
+  batch = []
+  for user in users:
+    batch.append(user)
+    if len(batch) == batchSize:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
+
+
+def provisionBatch(session: Session,
+                   users: list[UserSchema],
+                   workers: int | None = None) -> tuple[int, list[str]]:
+  """
+  Create a batch of users in one INSERT statement and commit it.
+
+  Usernames repeated in the batch or already stored are skipped before their
+  passwords are hashed. Usernames created concurrently by another request are
+  skipped by ON CONFLICT DO NOTHING.
+
+  Args:
+    session (Session): The database session.
+    users (list[UserSchema]): The users to create.
+    workers (int, optional): The number of hashing processes.
+
+  Returns:
+    tuple[int, list[str]]: The number of created users and the duplicate
+      usernames.
+  """
+  duplicates = []
+  uniqueUsers = {}
+  for user in users:
+    if user.username in uniqueUsers:
+      duplicates.append(user.username)
+    else:
+      uniqueUsers[user.username] = user
+
+  existing = set(
+      session.exec(
+          select(User.username).where(User.username.in_(
+              list(uniqueUsers)))).all())
+  duplicates.extend(username for username in uniqueUsers
+                    if username in existing)
+  newUsers = [
+      user for username, user in uniqueUsers.items()
+      if username not in existing
+  ]
+  if not newUsers:
+    return 0, duplicates
+
+  hashes = hashPasswords([user.password for user in newUsers], workers)
+  rows = [{
+      "username": user.username,
+      "passwordHash": passwordHash
+  } for user, passwordHash in zip(newUsers, hashes)]
+  query = insert(User).values(rows).on_conflict_do_nothing(
+      index_elements=["username"]).returning(User.username)
+  created = set(session.exec(query).scalars().all())
+  session.commit()
+
+  duplicates.extend(user.username for user in newUsers
+                    if user.username not in created)
+  return len(created), duplicates
+
+
+def provisionUsers(session: Session,
+                   users: Iterable[UserSchema],
+                   batchSize: int,
+                   workers: int | None = None) -> dict:
+  """
+  Create users batch by batch, committing each batch on its own.
+
+  Args:
+    session (Session): The database session.
+    users (Iterable[UserSchema]): The users to create.
+    batchSize (int): The maximum number of users per INSERT.
+    workers (int, optional): The number of hashing processes.
+
+  Returns:
+    dict: The number of created users and the duplicate usernames.
+  """
+  created = 0
+  duplicates = []
+  for batch in batched(users, batchSize):
+    batchCreated, batchDuplicates = provisionBatch(session, batch, workers)
+    created += batchCreated
+    duplicates.extend(batchDuplicates)
+  return {"created": created, "duplicates": duplicates}
+
+
+def readUsers(path: str) -> Iterator[UserSchema]:
+  """
+  Read users from a CSV file with "username" and "password" columns.
+
+  Args:
+    path (str): The CSV file path.
+
+  Yields:
+    UserSchema: The next user.
+  """
+  with open(path, newline="") as file:
+    for row in csv.DictReader(file):
+      yield UserSchema(username=row["username"], password=row["password"])
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="Provision users in bulk from a CSV file")
+  parser.add_argument("path", help="CSV file with username,password columns")
+  parser.add_argument("--batch-size",
+                      type=int,
+                      default=config.USER_PROVISIONING_BATCH_SIZE)
+  parser.add_argument("--workers",
+                      type=int,
+                      default=config.PASSWORD_HASH_WORKERS,
+                      help="Hashing processes (defaults to one per core)")
+  args = parser.parse_args()
+
+  start = time.perf_counter()
+  try:
+    with Session(carsDb.engine) as session:
+      result = provisionUsers(session, readUsers(args.path), args.batch_size,
+                              args.workers)
+  finally:
+    shutdownHashingPool()
+  result["seconds"] = round(time.perf_counter() - start, 3)
+  print(json.dumps(result))
+
+
+if __name__ == "__main__":
+  main()
@@ -12,13 +12,24 @@ Contact Information: mathteixeira55
 """
 
 ### Imports ###
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from core.database import carsDb
+from sqlmodel import Session
+from core.database import carsDb, config
 from schemas import ResponseSchema
-from routers import cars, trips, web, users, auth
+from core.carIndex import carIndex
+from core.tripQueue import tripQueue
+from core.requestProfiler import requestProfiler
+from core.memoryDiagnostics import memoryDiagnostics
+from core.loopMonitor import loopMonitor, LoopMonitorMiddleware
+from core.invalidationBus import invalidationBus
+from core.threadPool import threadPool
+from core.requestDeadline import DeadlineMiddleware
+from utils import shutdownHashingPool
+from routers import cars, trips, web, users, auth, changes, health
 
 
 ### Lifespan Events ###
@@ -26,8 +37,30 @@ from routers import cars, trips, web, users, auth
 async def lifespan(app: FastAPI):
   print("Starting up...")
   carsDb.init()
+  # Size the threads of the sync routes after the database pool
+  await threadPool.start()
+  # Measure the event-loop lag, and catch the calls blocking the loop
+  await loopMonitor.start()
+  # Keep the caches of this worker coherent with the writes of the others.
+  # The listener loads the car index once connected, so no write can slip
+  # between the load and the first invalidation.
+  invalidationBus.subscribe("car", cars.evictCar)
+  invalidationBus.start()
+  if carIndex.enabled and not invalidationBus.enabled:
+    # Warm up the in-memory car index; until then listings are served by SQL
+    with Session(carsDb.engine) as session:
+      carIndex.load(session)
+  tripQueue.start()
   yield
   print("Shutting down...")
+  await threadPool.stop()
+  await loopMonitor.stop()
+  memoryDiagnostics.stop()
+  invalidationBus.stop()
+  # Write the queued trips before the process exits, in a thread and for a
+  # bounded time, as the database may be unreachable
+  await asyncio.to_thread(tripQueue.stop, config.TRIP_QUEUE_DRAIN_TIMEOUT)
+  shutdownHashingPool()
 
 
 ### Initialize FastAPI App ###
@@ -41,10 +74,17 @@ app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 app.include_router(cars.router, prefix="/api/cars", tags=["Cars"])
 app.include_router(trips.router, prefix="/api/trips", tags=["Trips"])
+app.include_router(changes.router, prefix="/api/changes", tags=["Changes"])
+app.include_router(health.router, prefix="/health", tags=["Health Check"])
 app.include_router(web.router, tags=["Web"])
 
 
 ### set Middlewares ###
+# Added first, so it is the innermost middleware and runs in the task of the
+# routes, whose blocking calls it attributes to their request
+app.add_middleware(LoopMonitorMiddleware, monitor=loopMonitor)
+
+
 @app.middleware("http")
 async def visitsCounterCockieMiddleware(request: Request, callNext):
   visitCount = 0
@@ -59,6 +99,18 @@ async def visitsCounterCockieMiddleware(request: Request, callNext):
   return response
 
 
+@app.middleware("http")
+async def profilerMiddleware(request: Request, callNext):
+  # Only profiles when enabled in Config and the request is selected
+  return await requestProfiler(request, callNext)
+
+
+@app.middleware("http")
+async def memoryDiagnosticsMiddleware(request: Request, callNext):
+  # Only measures while tracing was started on the diagnostics endpoints
+  return await memoryDiagnostics(request, callNext)
+
+
 origins = [
     "http://localhost:8080",
     "http://localhost:8000",
@@ -70,6 +122,10 @@ app.add_middleware(CORSMiddleware,
                    allow_methods=["*"],
                    allow_headers=["*"])
 
+# Added last, so it is the outermost middleware and the only reader of the
+# client messages, which lets it see disconnects while the routes run
+app.add_middleware(DeadlineMiddleware)
+
 
 ### API Endpoints ###
 # Health Check Endpoint
@@ -88,6 +144,7 @@ def welcome() -> ResponseSchema:
 
 
 ### Main ###
+# For production, run `python -m core.server`, configured from Config.
 # if __name__ == "__main__":
 #   import uvicorn
 
@@ -11,5 +11,6 @@ Contact Information: mathteixeira55
 """
 
 from .carModel import Car
+from .carCodeModel import CarCode, CarCodeType
 from .tripModel import Trip
 from .userModel import User
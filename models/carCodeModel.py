@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: carCodeModel.py
+Description: This script defines the compact storage of the enumerated car
+ columns: the CarCodeType column type, storing each value as a small integer,
+ and the CarCode lookup table, naming the codes for SQL readers.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from sqlalchemy import SmallInteger, event
+from sqlalchemy.types import TypeDecorator
+from sqlmodel import SQLModel, Field, insert
+from schemas.carSchema import CAR_VALUES, normalizeCarValue
+
+# Code of the values that are not in CAR_VALUES. It is never stored, so
+# filters on such values match no car, and writes of them break the CHECK
+# constraint of the column.
+UNKNOWN_CODE = 0
+
+
+def encodeCarValue(column: str, value: str | None) -> int | None:
+  """
+  Get the code of an enumerated car column value.
+
+  Args:
+    column (str): The column, a key of CAR_VALUES.
+    value (str, optional): The value, in any spelling accepted by CarSchema.
+
+  Returns:
+    int | None: The position of the value in CAR_VALUES, starting at 1,
+      UNKNOWN_CODE for unknown values, None for None.
+  """
+  value = normalizeCarValue(column, value)
+  if value is None:
+    return None
+  values = CAR_VALUES[column]
+  return values.index(value) + 1 if value in values else UNKNOWN_CODE
+
+
+def decodeCarValue(column: str, code: int | None) -> str | None:
+  """
+  Get the value of an enumerated car column code.
+
+  Args:
+    column (str): The column, a key of CAR_VALUES.
+    code (int, optional): The stored code.
+
+  Returns:
+    str | None: The value, None for None or an unknown code.
+  """
+  values = CAR_VALUES[column]
+  return values[code - 1] if code and code <= len(values) else None
+
+
+class CarCodeType(TypeDecorator):
+  """
+  Column type storing the string values of an enumerated car column as their
+  SMALLINT code, so the ORM, the filters and the API keep using the strings.
+  Rows sort in the order of CAR_VALUES.
+
+  Attributes:
+    column (str): The column, a key of CAR_VALUES.
+  """
+  impl = SmallInteger
+  cache_ok = True
+
+  def __init__(self, column: str):
+    """
+    Initialize the type of a column.
+
+    Args:
+      column (str): The column, a key of CAR_VALUES.
+    """
+    super().__init__()
+    self.column = column
+
+  def process_bind_param(self, value, dialect):
+    return encodeCarValue(self.column, value)
+
+  def process_literal_param(self, value, dialect):
+    return str(encodeCarValue(self.column, value))
+
+  def process_result_value(self, value, dialect):
+    return decodeCarValue(self.column, value)
+
+  @property
+  def python_type(self):
+    return str
+
+
+class CarCode(SQLModel, table=True):
+  """
+  Lookup table of the codes of the enumerated car columns, filled when it is
+  created. The application decodes the columns itself; the table lets SQL
+  readers join the codes to their values.
+
+  Attributes:
+    column (str): The car column.
+    code (int): The stored code.
+    value (str): The value of the code.
+  """
+  __tablename__ = "carcode"
+
+  column: str = Field(primary_key=True)
+  code: int = Field(primary_key=True)
+  value: str
+
+
+def carCodeRows() -> list[dict]:
+  """
+  Build the rows of the lookup table.
+
+  Returns:
+    list[dict]: The column, code and value of every enumerated value.
+  """
+  return [{
+      "column": column,
+      "code": code,
+      "value": value
+  }
+          for column, values in CAR_VALUES.items()
+          for code, value in enumerate(values, start=1)]
+
+
+def fillCarCodes(table, connection, **kwargs):
+  """
+  Insert the codes of every enumerated car column into the new lookup table.
+  """
+  connection.execute(insert(table), carCodeRows())
+
+
+event.listen(CarCode.__table__, "after_create", fillCarCodes)
@@ -11,8 +11,10 @@ Contact Information: mathteixeira55
 """
 
 ### Imports ###
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Index, CheckConstraint
 from schemas import CarSchema
+from schemas.carSchema import CAR_VALUES
+from .carCodeModel import CarCodeType
 
 
 class Car(SQLModel, table=True):
@@ -21,23 +23,38 @@ class Car(SQLModel, table=True):
 
   Attributes:
     id (int): The unique identifier for the car.
-    size (str, optional): The size of the car (e.g., s, m, l).
-    fuel (str, optional): The type of fuel the car uses (e.g., gasoline, diesel, electric).
+    size (str, optional): The size of the car (s, m, l).
+    fuel (str, optional): The type of fuel the car uses (gasoline, diesel, electric, hybrid).
     doors (int, optional): The number of doors the car has.
-    transmission (str, optional): The type of transmission (e.g., manual, automatic).
+    transmission (str, optional): The type of transmission (manual, automatic).
     trips (list[Trip]): A list of trips associated with the car.
   """
+  # One index per sortable column, ending with the ID that breaks ties, so
+  # every page of a sorted listing is an index range scan
+  __table_args__ = tuple(
+      Index(f"ix_car_{column}_id", column, "id")
+      for column in ("size", "fuel", "doors", "transmission")) + tuple(
+          # The enumerated columns only hold the codes of their values
+          CheckConstraint(f"{column} BETWEEN 1 AND {len(values)}",
+                          name=f"ck_car_{column}_code")
+          for column, values in CAR_VALUES.items())
+
   # None will allow the database to generate the ID
   id: int | None = Field(None, primary_key=True)
+  # The enumerated columns are stored as SMALLINT codes, see CarCodeType
   size: str | None = Field(None,
-                           description="The size of the car (e.g., s, m, l)")
+                           sa_type=CarCodeType("size"),
+                           description="The size of the car (s, m, l)")
   fuel: str | None = Field(
       None,
+      sa_type=CarCodeType("fuel"),
       description=
-      "The type of fuel the car uses (e.g., gasoline, diesel, electric)")
+      "The type of fuel the car uses (gasoline, diesel, electric, hybrid)")
   doors: int | None = Field(None, description="The number of doors the car has")
   transmission: str | None = Field(
-      None, description="The type of transmission (e.g., manual, automatic)")
+      None,
+      sa_type=CarCodeType("transmission"),
+      description="The type of transmission (manual, automatic)")
   trips: list["Trip"] = Relationship(back_populates="car")
 
   def update(self, car: CarSchema) -> "Car":
@@ -11,7 +11,7 @@ Contact Information: mathteixeira55
 """
 
 ### Imports ###
-from sqlmodel import Field, Relationship, SQLModel
+from sqlmodel import Field, Relationship, SQLModel, Index
 
 
 class Trip(SQLModel, table=True):
@@ -26,6 +26,10 @@ class Trip(SQLModel, table=True):
     carId (int): The unique identifier for the car.
     car (Car): The car associated with the trip.
   """
+  # The trips of a car, in ID order, are an index range scan, so the newest
+  # trips of each car are read without sorting them
+  __table_args__ = (Index("ix_trip_carId_id", "carId", "id"),)
+
   id: int | None = Field(
       None,
       primary_key=True,
@@ -35,6 +39,7 @@ class Trip(SQLModel, table=True):
   end: int = Field(..., description="The ending Km of the trip")
   description: str = Field(..., description="A description of the trip")
   carId: int = Field(foreign_key="car.id",
+                     ondelete="CASCADE",
                      description="The unique identifier for the car")
   car: "Car" = Relationship(back_populates="trips")
 
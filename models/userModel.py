@@ -13,7 +13,7 @@ Contact Information: mathteixeira55
 ### imports ###
 from pydantic import ConfigDict
 from sqlmodel import Field, SQLModel, Column, VARCHAR
-from passlib.context import CryptContext
+from utils.passwordHashing import hashPassword, verifyPassword
 
 
 class User(SQLModel, table=True):
@@ -43,8 +43,7 @@ class User(SQLModel, table=True):
     Args:
       password (str): The password to hash and store for the user.
     """
-    passContext = CryptContext(schemes=["bcrypt"])
-    self.passwordHash = passContext.hash(password)
+    self.passwordHash = hashPassword(password)
 
   def verifyPassword(self, password: str) -> bool:
     """
@@ -56,5 +55,4 @@ class User(SQLModel, table=True):
     Returns:
       bool: True if the password matches the stored hash, False otherwise.
     """
-    passContext = CryptContext(schemes=["bcrypt"])
-    return passContext.verify(password, self.passwordHash)
+    return verifyPassword(password, self.passwordHash)
@@ -11,18 +11,21 @@ Contact Information: mathteixeira55
 """
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import Session
 from starlette import status
 
 from core.database import carsDb
-from models import User
+from core.requestProfiler import ProfiledRoute
+from security import USER_BY_USERNAME
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
+# Sync, so the user query and the bcrypt check run in a worker thread instead
+# of blocking the event loop
 @router.post("/token")
-async def login(formData: OAuth2PasswordRequestForm = Depends(),
-                session: Session = Depends(carsDb.getSession)) -> dict:
+def login(formData: OAuth2PasswordRequestForm = Depends(),
+          session: Session = Depends(carsDb.getSession)) -> dict:
   """
   Get the authentication token for the user.
 
@@ -33,8 +36,10 @@ async def login(formData: OAuth2PasswordRequestForm = Depends(),
   Returns:
     dict: The user's authentication token.
   """
-  query = select(User).where(User.username == formData.username)
-  user = session.exec(query).first()
+  user = session.exec(USER_BY_USERNAME,
+                      params={
+                          "username": formData.username
+                      }).first()
 
   if not user or not user.verifyPassword(formData.password):
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
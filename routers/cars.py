@@ -11,19 +11,626 @@ Contact Information: mathteixeira55
 """
 
 ### Imports ###
-from typing import Union
-from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session, select
-from core.database import carsDb
-from schemas import CarSchema, DetailedCarSchema, ResponseSchema, DetailedResponseSchema
-from models import Car, User
-from utils import sizeQuery, doorsQuery, tripQuery, idPath
+import base64
+import json
+from functools import cache, partial
+from typing import Literal, Union
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import bindparam
+from sqlmodel import (Session, select, func, update, delete, and_, or_,
+                      tuple_)
+from sqlmodel.sql.expression import SelectOfScalar
+from core.database import carsDb, config
+from schemas import (CarSchema, DetailedCarSchema, ResponseSchema,
+                     DetailedResponseSchema, FacetSchema, FacetCountSchema,
+                     FacetResponseSchema, BulkResultSchema, BulkResponseSchema,
+                     CarBatchSchema, CarBatchResponseSchema, CarSize, CarFuel,
+                     CarTransmission)
+from models import Car, Trip, User
+from core.carIndex import carIndex
+from core.changeFeed import changeFeed
+from core.carCountCache import carCountCache
+from core.invalidationBus import invalidationBus
+from core.tripArchive import tripArchive
+from core.requestProfiler import ProfiledRoute
+from utils import (sizeQuery, doorsQuery, fuelQuery, transmissionQuery,
+                   tripQuery, idsQuery, dryRunQuery, fieldsQuery, sortQuery,
+                   limitQuery, cursorQuery, totalQuery, tripLimitQuery,
+                   tripOrderQuery, archivedQuery, fieldsArchivedQuery,
+                   batchIdsQuery, idPath)
 from security import AuthHandler
 
 autoHandler = AuthHandler()
 
 ### Router Initialization ###
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# Columns that can be filtered on and counted by the facets endpoint
+FACET_COLUMNS = ("size", "fuel", "doors", "transmission")
+# Columns returned by the car mutations
+CAR_COLUMNS = (Car.id, Car.size, Car.fuel, Car.doors, Car.transmission)
+# Columns that can be picked by sparse fieldsets
+CAR_FIELDS = tuple(column.key for column in CAR_COLUMNS)
+TRIP_FIELDS = ("id", "start", "end", "description", "carId")
+# Columns the listing can be sorted by, each backed by a (column, id) index
+SORT_FIELDS = ("id", *FACET_COLUMNS)
+
+
+### Helper Functions ###
+def applyCarFilters(query,
+                    size: str | None = None,
+                    doors: int | None = None,
+                    fuel: str | None = None,
+                    transmission: str | None = None,
+                    ids: list[int] | None = None):
+  """
+  Restrict a car query with the filters shared by the car routes. Works for
+  SELECT, UPDATE and DELETE statements alike.
+
+  Args:
+    query (Select | Update | Delete): The statement to restrict.
+    size (str, optional): The size to filter cars by (s, m, l).
+    doors (int, optional): The number of doors to filter cars by.
+    fuel (str, optional): The fuel type to filter cars by.
+    transmission (str, optional): The transmission to filter cars by.
+    ids (list[int], optional): The IDs to filter cars by.
+
+  Returns:
+    Select | Update | Delete: The restricted statement.
+  """
+  if size:
+    query = query.where(Car.size == size)
+  if doors:
+    query = query.where(Car.doors == doors)
+  if fuel:
+    query = query.where(Car.fuel == fuel)
+  if transmission:
+    query = query.where(Car.transmission == transmission)
+  if ids:
+    query = query.where(Car.id.in_(ids))
+  return query
+
+
+@cache
+def carListStatement(columns: tuple[str, ...]) -> SelectOfScalar:
+  """
+  Build the car listing filtered on the given columns, once per combination
+  of filters. The filter values are bound when it runs, so requests neither
+  rebuild the statement nor compute its compiled cache key again.
+
+  Args:
+    columns (tuple[str, ...]): The filtered columns, each bound to a parameter
+      of the same name.
+
+  Returns:
+    SelectOfScalar: The query, returning Car rows.
+  """
+  query = select(Car)
+  for column in columns:
+    query = query.where(getattr(Car, column) == bindparam(column))
+  return query
+
+
+def bulkFilters(size, doors, fuel, transmission, ids) -> dict:
+  """
+  Collect the filters of a bulk operation, refusing to run without any.
+
+  Returns:
+    dict: The filters, ready to be passed to applyCarFilters.
+
+  Raises:
+    HTTPException: If no filter is given, to avoid touching every car by
+      mistake.
+  """
+  filters = {
+      "size": size,
+      "doors": doors,
+      "fuel": fuel,
+      "transmission": transmission,
+      "ids": ids
+  }
+  if not any(filters.values()):
+    raise HTTPException(status_code=400,
+                        detail="Bulk operations need at least one filter")
+  return filters
+
+
+def countCars(session: Session, filters: dict) -> int:
+  """
+  Count the cars matching the filters.
+
+  Args:
+    session (Session): The database session.
+    filters (dict): The filters, as accepted by applyCarFilters.
+
+  Returns:
+    int: The number of matching cars.
+  """
+  query = applyCarFilters(select(func.count()).select_from(Car), **filters)
+  return session.exec(query).one()
+
+
+def estimateCars(session: Session, filters: dict) -> int | None:
+  """
+  Estimate the number of cars matching the filters from the PostgreSQL
+  planner statistics, without reading the table.
+
+  Args:
+    session (Session): The database session.
+    filters (dict): The filters, as accepted by applyCarFilters.
+
+  Returns:
+    int | None: The estimated count, or None if the database does not give
+      estimates.
+  """
+  bind = session.get_bind()
+  if bind.dialect.name != "postgresql":
+    return None
+  # The values are rendered through the column types, so the enumerated
+  # columns are compared with their codes
+  compiled = applyCarFilters(select(Car.id), **filters).compile(
+      bind, compile_kwargs={"literal_binds": True})
+  plan = session.connection().exec_driver_sql(
+      f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+  if isinstance(plan, str):
+    plan = json.loads(plan)
+  return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def totalHeaders(session: Session, mode: str, paginated: bool, filters: dict,
+                 cars: list) -> dict:
+  """
+  Build the X-Total-Count header of a car listing.
+
+  A listing that is not paginated holds every matching car, so its length is
+  the exact total. Paginated listings are counted the requested way: exact
+  COUNT(*), planner estimate (cached count on databases without estimates),
+  or cached count, computed once per filter combination and kept up to date
+  on creates and deletes.
+
+  Args:
+    session (Session): The database session.
+    mode (str): "exact", "estimate", "cached" or "none".
+    paginated (bool): Whether the cars are a page of the listing.
+    filters (dict): The filters, as accepted by applyCarFilters.
+    cars (list): The cars of the response.
+
+  Returns:
+    dict: The X-Total-Count and X-Total-Count-Mode headers, empty for none.
+
+  Raises:
+    HTTPException: If there is an error counting the cars.
+  """
+  if mode == "none":
+    return {}
+  if not paginated:
+    count, mode = len(cars), "exact"
+  else:
+    try:
+      count = estimateCars(session, filters) if mode == "estimate" else None
+      if count is None and mode != "exact":
+        mode = "cached"
+        count = carCountCache.get(filters)
+        if count is None:
+          generation = carCountCache.generation
+          count = countCars(session, filters)
+          carCountCache.set(filters, count, generation)
+      elif count is None:
+        count = countCars(session, filters)
+    except Exception as e:
+      raise HTTPException(status_code=500,
+                          detail=f"Failed to count cars: {e}")
+  return {"X-Total-Count": str(count), "X-Total-Count-Mode": mode}
+
+
+def parseFields(fields: str) -> tuple[list[str], list[str] | None]:
+  """
+  Parse a sparse fieldset into the car and trip columns to select.
+
+  Car columns are named as they are, trip columns as "trips.<column>", and
+  "trips" alone picks every trip column.
+
+  Args:
+    fields (str): The comma-separated fieldset.
+
+  Returns:
+    tuple[list[str], list[str] | None]: The car columns, and the trip columns
+      or None if no trip was asked for.
+
+  Raises:
+    HTTPException: If a column does not exist or no column is picked.
+  """
+  carFields = []
+  tripFields = None
+  for field in filter(None, (field.strip() for field in fields.split(","))):
+    if field == "trips":
+      tripFields = list(TRIP_FIELDS)
+    elif field.startswith("trips."):
+      tripField = field.removeprefix("trips.")
+      if tripField not in TRIP_FIELDS:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown trip field: {tripField}")
+      tripFields = tripFields or []
+      if tripField not in tripFields:
+        tripFields.append(tripField)
+    elif field in CAR_FIELDS:
+      if field not in carFields:
+        carFields.append(field)
+    else:
+      raise HTTPException(status_code=400, detail=f"Unknown car field: {field}")
+
+  if not carFields and tripFields is None:
+    raise HTTPException(status_code=400, detail="No fields selected")
+  return carFields, tripFields
+
+
+def selectTrips(session: Session,
+                tripFields: list[str] | tuple,
+                carIds,
+                tripLimit: int | None,
+                tripOrder: str,
+                archivedCarIds: list[int] | None = None) -> dict:
+  """
+  Select the given columns of the trips of several cars, at most tripLimit per
+  car, with the number of trips of each car, in one query.
+
+  Window functions rank and count the trips of each car inside the database,
+  so the trips past the limit are never sent to the application. Archived
+  trips are merged in when asked for.
+
+  Args:
+    session (Session): The database session.
+    tripFields (list[str] | tuple): The trip columns to return.
+    carIds (list[int] | Select): The IDs of the cars, or a query selecting
+      them.
+    tripLimit (int, optional): The maximum number of trips per car, None for
+      every trip.
+    tripOrder (str): "newest" or "oldest", the trips returned first and kept
+      by the limit.
+    archivedCarIds (list[int], optional): The IDs of the cars whose archived
+      trips are merged in, None to leave the archive out.
+
+  Returns:
+    dict: The trips and trip count of each car by car ID, for the cars with
+      trips.
+  """
+  selectedFields = list(tripFields)
+  if archivedCarIds is not None and "id" not in selectedFields:
+    # The ID tells the trips of the table and of the archive apart
+    selectedFields.append("id")
+  partition = {"partition_by": Trip.carId}
+  order = Trip.id.desc() if tripOrder == "newest" else Trip.id
+  rankedTrips = select(
+      Trip.carId.label("tripCarId"),
+      *(getattr(Trip, field) for field in selectedFields),
+      func.count().over(**partition).label("tripCount"),
+      func.row_number().over(**partition, order_by=order).label("tripRank"),
+  ).where(Trip.carId.in_(carIds)).subquery("rankedTrips")
+  columns = [column for column in rankedTrips.c if column.key != "tripRank"]
+  query = select(*columns).order_by(rankedTrips.c.tripCarId,
+                                    rankedTrips.c.tripRank)
+  if tripLimit:
+    query = query.where(rankedTrips.c.tripRank <= tripLimit)
+
+  tripsByCar = {}
+  for row in session.exec(query).all():
+    trips, _ = tripsByCar.setdefault(row[0], ([], row[-1]))
+    trips.append(dict(zip(selectedFields, row[1:-1])))
+
+  if archivedCarIds is not None:
+    tripArchive.merge(tripsByCar, archivedCarIds, selectedFields, tripLimit,
+                      tripOrder == "newest")
+    if "id" not in tripFields:
+      for trips, _ in tripsByCar.values():
+        for trip in trips:
+          del trip["id"]
+  return tripsByCar
+
+
+def selectCarFields(session: Session,
+                    carFields: list[str],
+                    tripFields: list[str] | None,
+                    restrict,
+                    tripLimit: int | None = None,
+                    tripOrder: str = "newest",
+                    archived: bool = False) -> list[dict]:
+  """
+  Select only the given columns of the matching cars, and of their trips,
+  straight into dictionaries, without building ORM objects.
+
+  The trips of all the cars, and their counts, are read by one extra query,
+  restricted the same way as the cars.
+
+  Args:
+    session (Session): The database session.
+    carFields (list[str]): The car columns to return, including the ID when
+      trips are asked for.
+    tripFields (list[str], optional): The trip columns to return, None to
+      leave the trips out.
+    restrict (Callable[[Select], Select]): Restricts a car query to the cars
+      to return, with their filters, order and limit.
+    tripLimit (int, optional): The maximum number of trips per car.
+    tripOrder (str): "newest" or "oldest", the trips returned first.
+    archived (bool): Whether the archived trips are merged in.
+
+  Returns:
+    list[dict]: The cars, with their trips under "trips" and the number of
+      trips under "tripCount" when asked for.
+  """
+  query = restrict(select(*(getattr(Car, field) for field in carFields)))
+  rows = session.exec(query).all()
+  if len(carFields) == 1:
+    # A single column is returned as plain values instead of rows
+    rows = [(value,) for value in rows]
+  cars = [dict(zip(carFields, row)) for row in rows]
+  if tripFields is None:
+    return cars
+
+  archivedCarIds = [car["id"] for car in cars] if archived else None
+  tripsByCar = selectTrips(session, tripFields, restrict(select(Car.id)),
+                           tripLimit, tripOrder, archivedCarIds)
+  for car in cars:
+    car["trips"], car["tripCount"] = tripsByCar.get(car["id"], ([], 0))
+  return cars
+
+
+def stripFields(cars: list[dict], carFields: list[str]) -> list[dict]:
+  """
+  Remove the columns that were only selected to attach trips or page cars.
+
+  Args:
+    cars (list[dict]): The selected cars.
+    carFields (list[str]): The car columns asked for.
+
+  Returns:
+    list[dict]: The cars with the asked columns, and their trips and trip
+      counts.
+  """
+  return [{
+      field: value
+      for field, value in car.items()
+      if field in carFields or field in ("trips", "tripCount")
+  }
+          for car in cars]
+
+
+def parseSort(sort: str | None) -> tuple[str, bool]:
+  """
+  Parse a sort parameter such as "size" or "-doors".
+
+  Args:
+    sort (str, optional): The column to sort by, prefixed with - for
+      descending order.
+
+  Returns:
+    tuple[str, bool]: The column, and whether the order is descending. Cars
+      are sorted by ID when no column is given.
+
+  Raises:
+    HTTPException: If the column cannot be sorted by.
+  """
+  if not sort:
+    return "id", False
+  field = sort.removeprefix("-")
+  if field not in SORT_FIELDS:
+    raise HTTPException(status_code=400, detail=f"Unknown sort field: {field}")
+  return field, sort.startswith("-")
+
+
+def encodeCursor(field: str, descending: bool, value, id: int) -> str:
+  """
+  Encode the position after a car into an opaque pagination cursor.
+
+  Args:
+    field (str): The sort column.
+    descending (bool): Whether the order is descending.
+    value (str | int, optional): The sort column value of the car.
+    id (int): The ID of the car.
+
+  Returns:
+    str: The URL-safe cursor.
+  """
+  payload = json.dumps([field, descending, value, id], separators=(",", ":"))
+  return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decodeCursor(cursor: str, field: str, descending: bool) -> tuple:
+  """
+  Decode a pagination cursor of the given sort order.
+
+  Args:
+    cursor (str): The cursor, as returned in X-Next-Cursor.
+    field (str): The sort column of the request.
+    descending (bool): Whether the order of the request is descending.
+
+  Returns:
+    tuple: The sort column value and the ID of the last car of the previous
+      page.
+
+  Raises:
+    HTTPException: If the cursor is malformed or from another sort order.
+  """
+  try:
+    payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    cursorField, cursorDescending, value, id = json.loads(payload)
+  except (ValueError, TypeError):
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+  if (cursorField, cursorDescending) != (field, descending):
+    raise HTTPException(status_code=400,
+                        detail="The cursor belongs to another sort order")
+  return value, id
+
+
+def applyCarPage(query,
+                 field: str,
+                 descending: bool,
+                 after: tuple | None = None,
+                 limit: int | None = None):
+  """
+  Sort a car query and restrict it to the page after a cursor.
+
+  Ties are broken by ID so the order is stable. The page starts with a keyset
+  condition instead of an OFFSET, so deep pages cost as much as the first one:
+  with the (column, id) index, each page is an index range scan. NULLs come
+  last in ascending order and first in descending order, which is how the
+  index stores them. A condition spanning NULL and non-NULL values could not
+  be an index range, so a page after a cursor stays on its side of the NULLs,
+  and the cursor that follows the last page of one side starts the other.
+
+  Args:
+    query (Select): The car query to sort.
+    field (str): The sort column.
+    descending (bool): Whether the order is descending.
+    after (tuple, optional): The sort column value and ID of the last car of
+      the previous page, or (None, None) to start after the NULL side.
+    limit (int, optional): The maximum number of cars.
+
+  Returns:
+    Select: The sorted and limited query.
+  """
+  column = getattr(Car, field)
+  if after is not None:
+    value, lastId = after
+    if field == "id":
+      condition = Car.id < lastId if descending else Car.id > lastId
+    elif value is not None:
+      condition = (tuple_(column, Car.id) < (value, lastId) if descending else
+                   tuple_(column, Car.id) > (value, lastId))
+    elif lastId is not None:
+      condition = and_(column.is_(None),
+                       Car.id < lastId if descending else Car.id > lastId)
+    else:
+      # Start the side that follows the one of the previous pages
+      condition = column.is_not(None) if descending else column.is_(None)
+    query = query.where(condition)
+
+  if field == "id":
+    query = query.order_by(Car.id.desc() if descending else Car.id)
+  elif descending:
+    query = query.order_by(column.desc().nulls_first(), Car.id.desc())
+  else:
+    query = query.order_by(column.asc().nulls_last(), Car.id)
+  if limit:
+    query = query.limit(limit)
+  return query
+
+
+def nextCursorHeaders(cars: list, field: str, descending: bool,
+                      limit: int | None, after: tuple | None) -> dict:
+  """
+  Build the X-Next-Cursor header of a page, when more cars may follow.
+
+  Args:
+    cars (list[Car] | list[dict]): The cars of the page.
+    field (str): The sort column.
+    descending (bool): Whether the order is descending.
+    limit (int, optional): The page size.
+    after (tuple, optional): The cursor position the page started after.
+
+  Returns:
+    dict: The headers to send.
+  """
+  if limit and len(cars) == limit:
+    lastCar = cars[-1]
+    if isinstance(lastCar, dict):
+      value, lastId = lastCar[field], lastCar["id"]
+    else:
+      value, lastId = getattr(lastCar, field), lastCar.id
+    return {"X-Next-Cursor": encodeCursor(field, descending, value, lastId)}
+
+  # A page that stayed on the first side of the NULLs is followed by the
+  # other side
+  if field != "id" and after is not None and after[1] is not None:
+    firstSide = after[0] is None if descending else after[0] is not None
+    if firstSide:
+      return {"X-Next-Cursor": encodeCursor(field, descending, None, None)}
+  return {}
+
+
+def notifyCarSaved(car: dict, action: str):
+  """
+  Propagate a committed car insert or update to the in-memory car index and
+  the change feed. The other workers are told by the invalidation published
+  in the transaction of the write.
+
+  Args:
+    car (dict): The saved car, including its ID.
+    action (str): "created" or "updated".
+  """
+  carIndex.upsert(car)
+  if action == "created":
+    carCountCache.adjust(car, 1)
+  else:
+    # The previous values are unknown, so the counts it left cannot be fixed
+    carCountCache.invalidate()
+  changeFeed.publish("car", action, car["id"], car)
+
+
+def notifyCarDeleted(car: dict):
+  """
+  Propagate a committed car delete to the in-memory car index, the car count
+  cache and the change feed. The other workers are told by the invalidation
+  published in the transaction of the delete.
+
+  Args:
+    car (dict): The deleted car, as returned by the database.
+  """
+  carIndex.remove(car["id"])
+  carCountCache.adjust(car, -1)
+  changeFeed.publish("car", "deleted", car["id"])
+
+
+def evictCar(id: int | None):
+  """
+  Bring the car caches of this worker up to date after another worker changed
+  a car, or after invalidations may have been lost.
+
+  Args:
+    id (int, optional): The ID of the changed car, None for every car.
+  """
+  carCountCache.invalidate()
+  if carIndex.enabled:
+    with Session(carsDb.engine) as session:
+      carIndex.refresh(session, id)
+
+
+def updateCarColumns(session: Session, id: int, values: dict) -> dict:
+  """
+  Update the given columns of a car with a single UPDATE ... RETURNING
+  statement and commit it.
+
+  Args:
+    session (Session): The database session.
+    id (int): The ID of the car to update.
+    values (dict): The new values of the columns to update.
+
+  Returns:
+    dict: The updated car, as returned by the database.
+
+  Raises:
+    HTTPException: If the car with the given ID is not found or there is an
+      error updating the car in the database.
+  """
+  query = update(Car).where(Car.id == id).values(**values).returning(
+      *CAR_COLUMNS).execution_options(synchronize_session=False)
+  try:
+    updatedRow = session.exec(query).one_or_none()
+    if updatedRow is not None:
+      invalidationBus.publish(session, "car", id)
+      # Save the updated car to the database
+      session.commit()
+  except Exception as e:
+    session.rollback()
+    raise HTTPException(status_code=500, detail=f"Failed to update car: {e}")
+
+  # No row returned means no row matched the ID
+  if updatedRow is None:
+    raise HTTPException(status_code=404, detail=f"Car with id {id} not found")
+
+  updatedCar = updatedRow._asdict()
+  notifyCarSaved(updatedCar, "updated")
+  return updatedCar
 
 
 # CRUD Operations for Cars
@@ -55,17 +662,20 @@ def addCar(
   try:
     # Add the car to the session
     session.add(carToAdd)
+    # The ID generated by the database is read back by the INSERT ...
+    # RETURNING of the flush, and sessions do not expire objects on commit, so
+    # no refresh SELECT is needed afterwards.
+    session.flush()
+    invalidationBus.publish(session, "car", carToAdd.id)
     # Save to the database
     session.commit()
-    # Refresh the carToAdd object to get the ID generated by the database
-    # This is necessary to get the updated state of the object, including any
-    # changes made by the database
-    session.refresh(carToAdd)
   except Exception as e:
     session.rollback()
     raise HTTPException(status_code=500,
                         detail=f"Failed to add car to the database: {e}")
 
+  notifyCarSaved(carToAdd.model_dump(), "created")
+
   return ResponseSchema(message=carToAdd, code=200)
 
 
@@ -76,46 +686,533 @@ def addCar(
     response_model=Union[ResponseSchema, DetailedResponseSchema],
 )
 def getCars(
-    size: str | None = sizeQuery,
+    response: Response,
+    size: CarSize | None = sizeQuery,
     doors: int | None = doorsQuery,
     includeTrips: bool | None = tripQuery,
-    session: Session = Depends(carsDb.getSession)
+    session: Session = Depends(carsDb.getSession),
+    fuel: CarFuel | None = fuelQuery,
+    transmission: CarTransmission | None = transmissionQuery,
+    fields: str | None = fieldsQuery,
+    sort: str | None = sortQuery,
+    limit: int | None = limitQuery,
+    cursor: str | None = cursorQuery,
+    total: Literal["exact", "estimate", "cached", "none"] | None = totalQuery,
+    tripLimit: int | None = tripLimitQuery,
+    tripOrder: Literal["newest", "oldest"] | None = tripOrderQuery,
+    archived: bool = archivedQuery
 ) -> ResponseSchema | DetailedResponseSchema:
   """
   Retrieve cars filtered by size and number of doors.
 
   Args:
+    response (Response): The response, given the X-Next-Cursor header when
+      the page is full, and the X-Total-Count header.
     size (str, optional): The size to filter cars by (s, m, l).
     doors (int, optional): The number of doors to filter cars by.
+    includeTrips (bool, optional): Whether to include the trips of each car.
+    fuel (str, optional): The fuel type to filter cars by.
+    transmission (str, optional): The transmission to filter cars by.
+    fields (str, optional): The car and trip columns to return.
+    sort (str, optional): The column to sort by, prefixed with - for
+      descending order.
+    limit (int, optional): The maximum number of cars to return.
+    cursor (str, optional): Return the cars after this cursor.
+    total (str, optional): How the X-Total-Count header is computed.
+    tripLimit (int, optional): The maximum number of trips per car.
+    tripOrder (str, optional): Whether the newest or oldest trips come first.
+    archived (bool, optional): Whether to include the archived trips.
 
   Returns:
     ResponseSchema: A dictionary containing the list of cars filtered by size and number of doors.
 
   Raises:
-    HTTPException: If there is an error retrieving cars from the database.
+    HTTPException: If a field, the sort column or the cursor is invalid, or
+      there is an error retrieving cars from the database.
+  """
+  return listCars(session,
+                  size=size,
+                  doors=doors,
+                  includeTrips=includeTrips,
+                  fuel=fuel,
+                  transmission=transmission,
+                  fields=fields,
+                  sort=sort,
+                  limit=limit,
+                  cursor=cursor,
+                  total=total,
+                  tripLimit=tripLimit,
+                  tripOrder=tripOrder,
+                  archived=archived,
+                  response=response)
+
+
+def listCars(
+    session: Session,
+    size: str | None = None,
+    doors: int | None = None,
+    includeTrips: bool | None = False,
+    fuel: str | None = None,
+    transmission: str | None = None,
+    fields: str | None = None,
+    sort: str | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+    total: str | None = None,
+    tripLimit: int | None = None,
+    tripOrder: str | None = None,
+    archived: bool = False,
+    response: Response | None = None
+) -> ResponseSchema | DetailedResponseSchema | JSONResponse:
+  """
+  List the cars matching the filters, for getCars and the pages rendering
+  car listings.
+
+  Args:
+    session (Session): The database session.
+    size (str, optional): The size to filter cars by (s, m, l).
+    doors (int, optional): The number of doors to filter cars by.
+    includeTrips (bool, optional): Whether to include the trips of each car.
+    fuel (str, optional): The fuel type to filter cars by.
+    transmission (str, optional): The transmission to filter cars by.
+    fields (str, optional): The car and trip columns to return.
+    sort (str, optional): The column to sort by, prefixed with - for
+      descending order.
+    limit (int, optional): The maximum number of cars to return.
+    cursor (str, optional): Return the cars after this cursor.
+    total (str, optional): How the X-Total-Count header is computed.
+    tripLimit (int, optional): The maximum number of trips per car.
+    tripOrder (str, optional): Whether the newest or oldest trips come first.
+    archived (bool, optional): Whether to include the archived trips.
+    response (Response, optional): The response, given the X-Next-Cursor
+      header when the page is full, and the X-Total-Count header; None for
+      no headers.
+
+  Returns:
+    ResponseSchema | DetailedResponseSchema | JSONResponse: The cars, with
+      their trips if included, or only the selected fields.
+
+  Raises:
+    HTTPException: If a field, the sort column or the cursor is invalid, or
+      there is an error retrieving cars from the database.
   """
+  paginated = bool(sort or limit or cursor)
+  totalMode = total or config.CAR_COUNT_MODE
+  tripLimit = tripLimit or config.CAR_TRIP_LIMIT or None
+  tripOrder = tripOrder or "newest"
+  filters = {
+      "size": size,
+      "doors": doors,
+      "fuel": fuel,
+      "transmission": transmission
+  }
+  sortField, descending = parseSort(sort)
+  after = decodeCursor(cursor, sortField, descending) if cursor else None
+
+  def restrict(query):
+    # Applies the filters, and the order and limit of the page, to car queries
+    query = applyCarFilters(query, **filters)
+    if paginated:
+      query = applyCarPage(query, sortField, descending, after, limit)
+    return query
+
+  if fields:
+    return getCarFields(session, fields, includeTrips, restrict, paginated,
+                        sortField, descending, limit, after, totalMode,
+                        filters, tripLimit, tripOrder, archived)
+
+  if not includeTrips and not paginated:
+    # Serve plain listings from the in-memory car index when it is warm
+    indexedCars = carIndex.query(size, doors, fuel, transmission)
+    if indexedCars is not None:
+      if response is not None:
+        response.headers.update(
+            totalHeaders(session, totalMode, False, filters, indexedCars))
+      return ResponseSchema(message=indexedCars, code=200)
+
   try:
-    query = select(Car)
-    if size:
-      query = query.where(Car.size == size)
-    if doors:
-      query = query.where(Car.doors == doors)
     # Execute the query and return the results
     # The .all() method converts the result into a list of all the results.
     # If .all() is not used, an iterator is returned which is not directly usable.
     # Using .all() ensures we get a list that can be easily returned and manipulated.
-    filteredCars = session.exec(query).all()
+    if paginated:
+      filteredCars = session.exec(restrict(select(Car))).all()
+    else:
+      values = {name: value for name, value in filters.items() if value}
+      filteredCars = session.exec(carListStatement(tuple(values)),
+                                  params=values).all()
+    if includeTrips:
+      archivedCarIds = [car.id for car in filteredCars] if archived else None
+      tripsByCar = selectTrips(session, TRIP_FIELDS,
+                               restrict(select(Car.id)), tripLimit, tripOrder,
+                               archivedCarIds)
   except Exception as e:
     raise HTTPException(status_code=500, detail=f"Failed to retrieve cars: {e}")
 
+  if response is not None:
+    response.headers.update(
+        totalHeaders(session, totalMode, paginated, filters, filteredCars))
+    if paginated:
+      response.headers.update(
+          nextCursorHeaders(filteredCars, sortField, descending, limit,
+                            after))
+
   if includeTrips:
-    detailedCars = [
-        DetailedCarSchema.model_validate(car) for car in filteredCars
-    ]
+    # The trips are attached here rather than through the relationship, which
+    # would lazy load every trip with one query per car
+    detailedCars = []
+    for car in filteredCars:
+      trips, tripCount = tripsByCar.get(car.id, ([], 0))
+      detailedCars.append(
+          DetailedCarSchema(**car.model_dump(),
+                            trips=trips,
+                            tripCount=tripCount))
     return DetailedResponseSchema(message=detailedCars, code=200)
   return ResponseSchema(message=filteredCars, code=200)
 
 
+def getCarFields(session: Session, fields: str, includeTrips: bool | None,
+                 restrict, paginated: bool, sortField: str, descending: bool,
+                 limit: int | None, after: tuple | None, totalMode: str,
+                 filters: dict, tripLimit: int | None, tripOrder: str,
+                 archived: bool) -> JSONResponse:
+  """
+  Retrieve only the requested columns of the filtered cars, encoded straight
+  into the response without validating them into schemas.
+
+  Args:
+    session (Session): The database session.
+    fields (str): The car and trip columns to return.
+    includeTrips (bool, optional): Whether to include every trip column when
+      the fieldset names none.
+    restrict (Callable[[Select], Select]): Restricts a car query to the cars
+      to return.
+    paginated (bool): Whether the cars are sorted and paged.
+    sortField (str): The sort column.
+    descending (bool): Whether the order is descending.
+    limit (int, optional): The maximum number of cars to return.
+    after (tuple, optional): The cursor position the page starts after.
+    totalMode (str): How the X-Total-Count header is computed.
+    filters (dict): The filters, as accepted by applyCarFilters.
+    tripLimit (int, optional): The maximum number of trips per car.
+    tripOrder (str): "newest" or "oldest", the trips returned first.
+    archived (bool): Whether the archived trips are merged in.
+
+  Returns:
+    JSONResponse: A dictionary containing the list of partial cars.
+
+  Raises:
+    HTTPException: If a field does not exist or there is an error retrieving
+      cars from the database.
+  """
+  carFields, tripFields = parseFields(fields)
+  if includeTrips and tripFields is None:
+    tripFields = list(TRIP_FIELDS)
+
+  if tripFields is None and not paginated:
+    indexedCars = carIndex.query(**filters)
+    if indexedCars is not None:
+      cars = [{field: getattr(car, field)
+               for field in carFields}
+              for car in indexedCars]
+      headers = totalHeaders(session, totalMode, False, filters, cars)
+      return JSONResponse({"message": cars, "code": 200}, headers=headers)
+
+  # The ID attaches the trips, and the sort column and ID make the cursor,
+  # even when they are not returned
+  keyFields = []
+  if tripFields is not None:
+    keyFields.append("id")
+  if paginated:
+    keyFields += ["id", sortField]
+  selectedFields = list(dict.fromkeys([*carFields, *keyFields]))
+  try:
+    cars = selectCarFields(session, selectedFields, tripFields, restrict,
+                           tripLimit, tripOrder, archived)
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f"Failed to retrieve cars: {e}")
+
+  headers = totalHeaders(session, totalMode, paginated, filters, cars)
+  headers.update(nextCursorHeaders(cars, sortField, descending, limit, after))
+  return JSONResponse({
+      "message": stripFields(cars, carFields),
+      "code": 200
+  },
+                      headers=headers)
+
+
+# Bulk update
+@router.patch("/",
+              summary="Update the cars matching the filters",
+              response_model=BulkResponseSchema)
+def bulkUpdateCars(
+    newCarInfo: CarSchema,
+    size: CarSize | None = sizeQuery,
+    doors: int | None = doorsQuery,
+    fuel: CarFuel | None = fuelQuery,
+    transmission: CarTransmission | None = transmissionQuery,
+    ids: list[int] | None = idsQuery,
+    dryRun: bool = dryRunQuery,
+    session: Session = Depends(carsDb.getSession),
+    user: User = Depends(autoHandler.getCurrentUser)
+) -> BulkResponseSchema:
+  """
+  Update the fields sent in the request body of every car matching the filters,
+  with one UPDATE statement in a single transaction.
+
+  Args:
+    newCarInfo (CarSchema): The car fields to update.
+    size (str, optional): The size to filter cars by (s, m, l).
+    doors (int, optional): The number of doors to filter cars by.
+    fuel (str, optional): The fuel type to filter cars by.
+    transmission (str, optional): The transmission to filter cars by.
+    ids (list[int], optional): The IDs to filter cars by.
+    dryRun (bool, optional): Whether to only count the matching cars.
+
+  Returns:
+    BulkResponseSchema: A dictionary containing the matched and updated counts.
+
+  Raises:
+    HTTPException: If no filter or field is given, or there is an error
+      updating the cars in the database.
+  """
+  filters = bulkFilters(size, doors, fuel, transmission, ids)
+  changedColumns = newCarInfo.model_dump(exclude_unset=True)
+  if not changedColumns:
+    raise HTTPException(status_code=400, detail="No car fields to update")
+
+  try:
+    if dryRun:
+      matched = countCars(session, filters)
+      return BulkResponseSchema(message=BulkResultSchema(matched=matched,
+                                                         affected=0,
+                                                         dryRun=True),
+                                code=200)
+
+    query = applyCarFilters(update(Car), **filters).values(
+        **changedColumns).returning(*CAR_COLUMNS).execution_options(
+            synchronize_session=False)
+    updatedCars = [row._asdict() for row in session.exec(query).all()]
+    if updatedCars:
+      # One invalidation for the whole operation
+      invalidationBus.publish(session, "car", None)
+    session.commit()
+  except Exception as e:
+    session.rollback()
+    raise HTTPException(status_code=500, detail=f"Failed to update cars: {e}")
+
+  for updatedCar in updatedCars:
+    notifyCarSaved(updatedCar, "updated")
+
+  return BulkResponseSchema(message=BulkResultSchema(
+      matched=len(updatedCars), affected=len(updatedCars)),
+                            code=200)
+
+
+# Bulk delete
+@router.delete("/",
+               summary="Delete the cars matching the filters",
+               response_model=BulkResponseSchema)
+def bulkDeleteCars(
+    size: CarSize | None = sizeQuery,
+    doors: int | None = doorsQuery,
+    fuel: CarFuel | None = fuelQuery,
+    transmission: CarTransmission | None = transmissionQuery,
+    ids: list[int] | None = idsQuery,
+    dryRun: bool = dryRunQuery,
+    session: Session = Depends(carsDb.getSession),
+    user: User = Depends(autoHandler.getCurrentUser)
+) -> BulkResponseSchema:
+  """
+  Delete every car matching the filters, and their trips, with one DELETE
+  statement in a single transaction.
+
+  Args:
+    size (str, optional): The size to filter cars by (s, m, l).
+    doors (int, optional): The number of doors to filter cars by.
+    fuel (str, optional): The fuel type to filter cars by.
+    transmission (str, optional): The transmission to filter cars by.
+    ids (list[int], optional): The IDs to filter cars by.
+    dryRun (bool, optional): Whether to only count the matching cars.
+
+  Returns:
+    BulkResponseSchema: A dictionary containing the matched and deleted counts.
+
+  Raises:
+    HTTPException: If no filter is given or there is an error deleting the
+      cars from the database.
+  """
+  filters = bulkFilters(size, doors, fuel, transmission, ids)
+
+  try:
+    if dryRun:
+      matched = countCars(session, filters)
+      return BulkResponseSchema(message=BulkResultSchema(matched=matched,
+                                                         affected=0,
+                                                         dryRun=True),
+                                code=200)
+
+    # The trips of the matching cars are deleted by a CTE of the same statement
+    matchingIds = applyCarFilters(select(Car.id), **filters)
+    deletedTrips = delete(Trip).where(
+        Trip.carId.in_(matchingIds)).cte("deletedTrips")
+    query = applyCarFilters(delete(Car), **filters).add_cte(
+        deletedTrips).returning(*CAR_COLUMNS).execution_options(
+            synchronize_session=False)
+    deletedCars = [row._asdict() for row in session.exec(query).all()]
+    if deletedCars:
+      # One invalidation for the whole operation
+      invalidationBus.publish(session, "car", None)
+    session.commit()
+  except Exception as e:
+    session.rollback()
+    raise HTTPException(status_code=500, detail=f"Failed to delete cars: {e}")
+
+  for deletedCar in deletedCars:
+    notifyCarDeleted(deletedCar)
+
+  return BulkResponseSchema(message=BulkResultSchema(
+      matched=len(deletedCars), affected=len(deletedCars)),
+                            code=200)
+
+
+# Read facet counts
+# Declared before "/{id}" so that "facets" is not parsed as a car ID.
+@router.get(
+    "/facets",
+    summary="Count cars per size, fuel, doors and transmission",
+    response_model=FacetResponseSchema,
+)
+def getCarFacets(
+    size: CarSize | None = sizeQuery,
+    doors: int | None = doorsQuery,
+    fuel: CarFuel | None = fuelQuery,
+    transmission: CarTransmission | None = transmissionQuery,
+    session: Session = Depends(carsDb.getSession)
+) -> FacetResponseSchema:
+  """
+  Count the cars holding each value of every facet, restricted by the filters.
+
+  Each facet is counted with every filter applied except its own, so the
+  counts tell how many cars a search would return when that value is picked.
+  The counts come from the in-memory car index when it is warm, otherwise from
+  one GROUP BY query per facet, so no car row is sent to the application.
+
+  Args:
+    size (str, optional): The size to filter cars by (s, m, l).
+    doors (int, optional): The number of doors to filter cars by.
+    fuel (str, optional): The fuel type to filter cars by.
+    transmission (str, optional): The transmission to filter cars by.
+
+  Returns:
+    FacetResponseSchema: A dictionary containing the counts of each facet.
+
+  Raises:
+    HTTPException: If there is an error counting the cars in the database.
+  """
+  filters = {
+      "size": size,
+      "doors": doors,
+      "fuel": fuel,
+      "transmission": transmission
+  }
+  indexedFacets = carIndex.facets(filters)
+  if indexedFacets is not None:
+    facets = {
+        name: [
+            FacetCountSchema(value=value, count=count)
+            for value, count in pairs
+        ] for name, pairs in indexedFacets.items()
+    }
+    return FacetResponseSchema(message=FacetSchema(**facets), code=200)
+
+  facets = {}
+  try:
+    for name in FACET_COLUMNS:
+      column = getattr(Car, name)
+      # Leave the facet's own filter out, so its other values are counted too
+      otherFilters = {**filters, name: None}
+      query = applyCarFilters(select(column, func.count()), **otherFilters)
+      query = query.group_by(column).order_by(column)
+      facets[name] = [
+          FacetCountSchema(value=value, count=count)
+          for value, count in session.exec(query).all()
+      ]
+  except Exception as e:
+    raise HTTPException(status_code=500,
+                        detail=f"Failed to count car facets: {e}")
+
+  return FacetResponseSchema(message=FacetSchema(**facets), code=200)
+
+
+# Read several by ID
+# Declared before "/{id}" so that "batch" is not parsed as a car ID.
+@router.get(
+    "/batch",
+    summary="Get several cars by ID",
+    response_model=CarBatchResponseSchema,
+)
+def getCarsByIds(
+    ids: list[int] = batchIdsQuery,
+    includeTrips: bool | None = tripQuery,
+    archived: bool = archivedQuery,
+    session: Session = Depends(carsDb.getSession)
+) -> CarBatchResponseSchema:
+  """
+  Retrieve several cars by their IDs with one IN query, and their trips with
+  one more query, instead of one request per car.
+
+  Args:
+    ids (list[int]): The IDs of the cars to retrieve.
+    includeTrips (bool, optional): Whether to include the trips of each car.
+    archived (bool, optional): Whether to include the archived trips.
+
+  Returns:
+    CarBatchResponseSchema: A dictionary containing the cars found, in the
+      order of the requested IDs, and the IDs no car has.
+
+  Raises:
+    HTTPException: If more IDs than allowed are requested or there is an error
+      retrieving the cars from the database.
+  """
+  # Duplicated IDs are answered once, at their first position
+  ids = list(dict.fromkeys(ids))
+  if len(ids) > config.CAR_BATCH_MAX_IDS:
+    raise HTTPException(
+        status_code=400,
+        detail=f"At most {config.CAR_BATCH_MAX_IDS} car IDs can be requested")
+
+  try:
+    foundCars = {
+        car.id: car
+        for car in session.exec(select(Car).where(Car.id.in_(ids))).all()
+    }
+    if includeTrips and foundCars:
+      carIds = list(foundCars)
+      tripsByCar = selectTrips(session, TRIP_FIELDS, carIds, None, "oldest",
+                               carIds if archived else None)
+  except Exception as e:
+    raise HTTPException(status_code=500,
+                        detail=f"Failed to retrieve cars by ID: {e}")
+
+  cars = [foundCars[id] for id in ids if id in foundCars]
+  if includeTrips:
+    # The trips are attached here rather than through the relationship, which
+    # would lazy load them with one query per car
+    detailedCars = []
+    for car in cars:
+      trips, tripCount = tripsByCar.get(car.id, ([], 0))
+      detailedCars.append(
+          DetailedCarSchema(**car.model_dump(),
+                            trips=trips,
+                            tripCount=tripCount))
+    cars = detailedCars
+  missing = [id for id in ids if id not in foundCars]
+  return CarBatchResponseSchema(message=CarBatchSchema(cars=cars,
+                                                       missing=missing),
+                                code=200)
+
+
 # Read one by ID
 @router.get(
     "/{id}",
@@ -124,13 +1221,19 @@ def getCars(
 )
 def getCarById(
     id: int = idPath,
-    session: Session = Depends(carsDb.getSession)
+    session: Session = Depends(carsDb.getSession),
+    fields: str | None = fieldsQuery,
+    archived: bool = fieldsArchivedQuery
 ) -> ResponseSchema:
   """
   Retrieve a car by its ID.
 
   Args:
     id (int): The ID of the car to retrieve.
+    fields (str, optional): The car and trip columns to return.
+    archived (bool, optional): Whether to include the archived trips; only
+      used with fields, since the car is returned without its trips
+      otherwise.
 
   Returns:
     ResponseSchema: A dictionary containing the car details if found, otherwise a message indicating it was not found.
@@ -138,6 +1241,28 @@ def getCarById(
   Raises:
     HTTPException: If the car with the given ID is not found or there is an error retrieving the car.
   """
+  if fields:
+    carFields, tripFields = parseFields(fields)
+    selectedFields = carFields
+    if tripFields is not None and "id" not in carFields:
+      selectedFields = ["id", *carFields]
+    try:
+      cars = selectCarFields(session,
+                             selectedFields,
+                             tripFields,
+                             partial(applyCarFilters, ids=[id]),
+                             archived=archived)
+    except Exception as e:
+      raise HTTPException(status_code=500,
+                          detail=f"Failed to retrieve car by ID: {e}")
+    if not cars:
+      raise HTTPException(status_code=404,
+                          detail=f"Car with id {id} not found")
+    return JSONResponse({
+        "message": stripFields(cars, carFields)[0],
+        "code": 200
+    })
+
   try:
     # get() looks for the object by its primary key and returns None if not found
     car = session.get(Car, id)
@@ -171,25 +1296,39 @@ def updateCar(
   Raises:
     HTTPException: If the car with the given ID is not found or there is an error updating the car in the database.
   """
-  try:
-    # get() looks for the object by its primary key and returns None if not found
-    carToUpdate = session.get(Car, id)
-  except Exception as e:
-    raise HTTPException(status_code=500,
-                        detail=f"Failed to retrieve car by ID: {e}")
+  updatedCar = updateCarColumns(session, id, newCarInfo.model_dump())
+  return ResponseSchema(message=updatedCar, code=200)
 
-  if not carToUpdate:
-    raise HTTPException(status_code=404, detail=f"Car with id {id} not found")
 
-  try:
-    # Update the car attributes with the new values
-    updatedCar = carToUpdate.update(newCarInfo).model_dump()
-    # Save the updated car to the database
-    session.commit()
-  except Exception as e:
-    session.rollback()
-    raise HTTPException(status_code=500, detail=f"Failed to update car: {e}")
+# Partial update
+@router.patch("/{id}",
+              summary="Update some fields of a car by ID",
+              response_model=ResponseSchema)
+def patchCar(
+    newCarInfo: CarSchema,
+    id: int = idPath,
+    session: Session = Depends(carsDb.getSession)
+) -> ResponseSchema:
+  """
+  Update only the fields sent in the request body of a car by its ID.
+
+  Args:
+    id (int): The ID of the car to update.
+    newCarInfo (CarSchema): The car fields to update.
+
+  Returns:
+    ResponseSchema: A dictionary containing the updated car details.
 
+  Raises:
+    HTTPException: If no field is sent, the car with the given ID is not found
+      or there is an error updating the car in the database.
+  """
+  # exclude_unset keeps the fields that were sent, even when they are null
+  changedColumns = newCarInfo.model_dump(exclude_unset=True)
+  if not changedColumns:
+    raise HTTPException(status_code=400, detail="No car fields to update")
+
+  updatedCar = updateCarColumns(session, id, changedColumns)
   return ResponseSchema(message=updatedCar, code=200)
 
 
@@ -202,7 +1341,7 @@ def deleteCar(
     session: Session = Depends(carsDb.getSession)
 ) -> ResponseSchema:
   """
-  Delete a car from the database by its ID.
+  Delete a car and its trips from the database by its ID.
 
   Args:
     id (int): The ID of the car to delete.
@@ -213,23 +1352,26 @@ def deleteCar(
   Raises:
     HTTPException: If the car with the given ID is not found or there is an error deleting the car from the database.
   """
+  # The trips are deleted by a CTE of the same DELETE ... RETURNING statement,
+  # so the car and its trips go away in a single round trip.
+  deletedTrips = delete(Trip).where(Trip.carId == id).cte("deletedTrips")
+  query = delete(Car).where(Car.id == id).add_cte(deletedTrips).returning(
+      *CAR_COLUMNS).execution_options(synchronize_session=False)
   try:
-    # get() looks for the object by its primary key and returns None if not found
-    car = session.get(Car, id)
+    deletedRow = session.exec(query).one_or_none()
+    if deletedRow is not None:
+      invalidationBus.publish(session, "car", id)
+      # Save the changes to the database
+      session.commit()
   except Exception as e:
-    raise HTTPException(status_code=500,
-                        detail=f"Failed to retrieve car by ID: {e}")
+    session.rollback()
+    raise HTTPException(status_code=500, detail=f"Failed to delete car: {e}")
 
-  if not car:
+  # No row returned means no row matched the ID
+  if deletedRow is None:
     raise HTTPException(status_code=404, detail=f"Car with id {id} not found")
 
-  try:
-    session.delete(car)
-    # Save the changes to the database
-    session.commit()
-  except Exception as e:
-    session.rollback()
-    raise HTTPException(status_code=500, detail=f"Failed to delete car: {e}")
+  notifyCarDeleted(deletedRow._asdict())
 
   return ResponseSchema(message=f"Car with ID {id} deleted successfully.",
                         code=200)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: changes.py
+Description: This script defines the routers that stream the car and trip
+ mutations of the car sharing service, as Server-Sent Events or over a
+ WebSocket.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import json
+from fastapi import APIRouter, Header, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from core.database import config
+from core.changeFeed import changeFeed
+from core.requestProfiler import ProfiledRoute
+
+### Router Initialization ###
+router = APIRouter(route_class=ProfiledRoute)
+
+lastSeqQuery: int | None = Query(
+    None,
+    description="Resume after this sequence number (defaults to the "
+    "Last-Event-ID header, or to the events published from now on)")
+
+
+### Router Endpoints ###
+@router.get("/stream", summary="Stream car and trip changes (SSE)")
+async def streamChanges(lastSeq: int | None = lastSeqQuery,
+                        lastEventId: int | None = Header(None)):
+  """
+  Stream the car and trip mutations as Server-Sent Events.
+
+  Each event carries its sequence number as the SSE id, so browsers resume
+  from the last event they received when they reconnect. A "reset" event means
+  the client fell behind the feed, or resumes from an id this worker did not
+  issue (after a restart), and should reload its data.
+
+  Args:
+    lastSeq (int, optional): Resume after this sequence number.
+    lastEventId (int, optional): The Last-Event-ID header sent by EventSource.
+
+  Returns:
+    StreamingResponse: The text/event-stream response.
+  """
+  if lastSeq is None:
+    lastSeq = lastEventId
+
+  async def eventStream():
+    async for event in changeFeed.subscribe(lastSeq,
+                                            config.CHANGE_FEED_HEARTBEAT):
+      if event is None:
+        # Comment line, keeps proxies from closing an idle connection
+        yield ": keep-alive\n\n"
+        continue
+      name = event["action"]
+      if event["entity"]:
+        name = f"{event['entity']}.{name}"
+      yield f"id: {event['seq']}\nevent: {name}\ndata: {json.dumps(event)}\n\n"
+
+  return StreamingResponse(eventStream(),
+                           media_type="text/event-stream",
+                           headers={
+                               "Cache-Control": "no-cache",
+                               "X-Accel-Buffering": "no"
+                           })
+
+
+@router.websocket("/ws")
+async def websocketChanges(websocket: WebSocket,
+                           lastSeq: int | None = lastSeqQuery):
+  """
+  Stream the car and trip mutations as JSON messages over a WebSocket.
+
+  Args:
+    websocket (WebSocket): The client connection.
+    lastSeq (int, optional): Resume after this sequence number.
+  """
+  await websocket.accept()
+  try:
+    async for event in changeFeed.subscribe(lastSeq,
+                                            config.CHANGE_FEED_HEARTBEAT):
+      if event is None:
+        event = {"action": "heartbeat", "seq": changeFeed.lastSeq}
+      await websocket.send_json(event)
+  except WebSocketDisconnect:
+    pass
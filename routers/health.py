@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: health.py
+Description: This script defines the liveness and readiness routers of the car
+ sharing service, probed by the orchestrator.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from fastapi import APIRouter, Depends, Query, Response
+from schemas import ResponseSchema, ReadinessSchema
+from core.healthCheck import healthCheck
+from core.threadPool import threadPool
+from core.statementCache import statementCache
+from core.memoryDiagnostics import memoryDiagnostics
+from core.loopMonitor import loopMonitor
+from core.requestProfiler import ProfiledRoute
+
+### Router Initialization ###
+router = APIRouter(route_class=ProfiledRoute)
+
+
+### Router Endpoints ###
+@router.get("/live", summary="Liveness probe", response_model=ResponseSchema)
+def live() -> ResponseSchema:
+  """
+  Tell that the process is up and serving requests. It does not touch the
+  database, so a database outage does not get the pod restarted.
+
+  Returns:
+    ResponseSchema: A fixed message.
+  """
+  return ResponseSchema(message="alive", code=200)
+
+
+@router.get("/ready",
+            summary="Readiness probe",
+            response_model=ReadinessSchema,
+            responses={503: {
+                "model": ReadinessSchema
+            }})
+def ready(response: Response) -> ReadinessSchema:
+  """
+  Tell whether the API can serve traffic, from a cached database probe and the
+  connection pool utilization.
+
+  Args:
+    response (Response): The response, set to 503 when not ready.
+
+  Returns:
+    ReadinessSchema: The readiness, its reasons, the probe and the pool status.
+  """
+  readiness = ReadinessSchema(**healthCheck.readiness())
+  if not readiness.ready:
+    response.status_code = 503
+  return readiness
+
+
+# Runtime metrics, only with the diagnostics token
+@router.get("/threads",
+            summary="Thread pool and connection pool saturation",
+            dependencies=[Depends(memoryDiagnostics.authorizeToken)])
+async def threads() -> dict:
+  """
+  Get the usage of the worker threads running the sync routes, next to the
+  connection pool status. Threads waiting while connections are free mean the
+  API is thread-bound; a saturated pool means it is database-bound.
+
+  Async, so it answers even when every worker thread is busy.
+
+  Returns:
+    dict: The thread pool metrics, and the connection pool status under pool.
+  """
+  return {**threadPool.metrics(), "pool": healthCheck.poolStatus()}
+
+
+@router.get("/statements",
+            summary="Compiled statement cache hits",
+            dependencies=[Depends(memoryDiagnostics.authorizeToken)])
+def statements() -> dict:
+  """
+  Get how often the executed statements were found in the compiled statement
+  cache. Misses that keep growing mean a statement is rebuilt in a way the
+  cache cannot recognize.
+
+  Returns:
+    dict: The statement cache metrics.
+  """
+  return statementCache.metrics()
+
+
+@router.get("/loop",
+            summary="Event-loop lag and blocking calls",
+            dependencies=[Depends(memoryDiagnostics.authorizeToken)])
+async def loop() -> dict:
+  """
+  Get how late the event loop wakes up, and the latest calls that blocked
+  it, with their route and stack. Every request waits while the loop is
+  blocked, so blocking calls belong in sync routes or in threads.
+
+  Async, so its own answer is delayed by the lag it reports.
+
+  Returns:
+    dict: The loop monitor metrics.
+  """
+  return loopMonitor.metrics()
+
+
+# Memory diagnostics, only when enabled in Config and with the token
+@router.get("/memory",
+            summary="Traced memory and peak allocation per route",
+            dependencies=[Depends(memoryDiagnostics.authorize)])
+def memory() -> dict:
+  """
+  Get whether allocations are traced, the traced and resident memory, and the
+  peak allocation of the sampled requests of each route.
+
+  Returns:
+    dict: The memory diagnostics metrics.
+  """
+  return memoryDiagnostics.metrics()
+
+
+@router.post("/memory/trace",
+             summary="Trace allocations for a while",
+             dependencies=[Depends(memoryDiagnostics.authorize)])
+def traceMemory(seconds: float = Query(
+    60, gt=0, description="Seconds to trace, capped by Config")) -> dict:
+  """
+  Start tracing allocations, which slows the worker down, for a bounded time.
+
+  Args:
+    seconds (float): The tracing period.
+
+  Returns:
+    dict: The tracing period actually granted.
+  """
+  return {"tracing": True, "seconds": memoryDiagnostics.start(seconds)}
+
+
+@router.delete("/memory/trace",
+               summary="Stop tracing allocations",
+               dependencies=[Depends(memoryDiagnostics.authorize)])
+def stopTracingMemory() -> dict:
+  """
+  Stop tracing allocations before the end of the period.
+
+  Returns:
+    dict: The tracing state.
+  """
+  memoryDiagnostics.stop()
+  return {"tracing": False}
+
+
+@router.post("/memory/snapshot",
+             summary="Diff the heap against the previous snapshot",
+             dependencies=[Depends(memoryDiagnostics.authorize)])
+def snapshotMemory() -> dict:
+  """
+  Take a heap snapshot and write its difference with the previous one to the
+  diagnostics directory of the worker.
+
+  Returns:
+    dict: The file name and a summary of the difference.
+  """
+  return memoryDiagnostics.snapshot()
+
+
+@router.get("/memory/objects",
+            summary="Live ORM instances and Pydantic models",
+            dependencies=[Depends(memoryDiagnostics.authorize)])
+def memoryObjects() -> dict:
+  """
+  Count the live Car and Trip instances, sessions and Pydantic models. Walks
+  the whole heap, so it is meant to be called now and then.
+
+  Returns:
+    dict: The counts.
+  """
+  return memoryDiagnostics.objects()
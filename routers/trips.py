@@ -16,9 +16,16 @@ from sqlmodel import Session
 from core.database import carsDb
 from schemas import TripSchema, ResponseSchema
 from models import Trip, Car
+from core.changeFeed import changeFeed
+from core.tripQueue import tripQueue
+from core.requestProfiler import ProfiledRoute
+from core.memoryDiagnostics import memoryDiagnostics
 
 ### Router Initialization ###
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# Trip fields the database requires, but TripSchema leaves optional
+REQUIRED_TRIP_FIELDS = ("start", "end", "description")
 
 
 # CRUD Operations for Trips
@@ -66,4 +73,57 @@ def addTrip(
     raise HTTPException(status_code=500,
                         detail=f"Failed to add trip to car: {e}")
 
+  changeFeed.publish("trip", "created", tripModel.id, tripModel.model_dump())
+
   return ResponseSchema(message=carToUpdate, code=200)
+
+
+# Create, write-behind
+@router.post("/{carId}/queue",
+             summary="Queue a trip for a car ID",
+             status_code=202,
+             response_model=ResponseSchema)
+def queueTrip(trip: TripSchema, carId: int) -> ResponseSchema:
+  """
+  Accept a trip for a car and write it later, batched with other trips.
+
+  The trip is validated and queued without touching the database. An unknown
+  car ID is only detected when the batch is written, and that trip is dropped.
+
+  Args:
+    trip (TripSchema): The trip data to add.
+    carId (int): The ID of the car to add a trip to.
+
+  Returns:
+    ResponseSchema: A dictionary containing an acceptance message.
+
+  Raises:
+    HTTPException: If a trip field is missing, or the queue is full or stopped.
+  """
+  missingFields = [
+      name for name in REQUIRED_TRIP_FIELDS if getattr(trip, name) is None
+  ]
+  if missingFields:
+    raise HTTPException(status_code=400,
+                        detail=f"Missing trip fields: {missingFields}")
+
+  if not tripQueue.put({**trip.model_dump(), "carId": carId}):
+    raise HTTPException(status_code=503,
+                        detail="Trip queue is full or stopped",
+                        headers={"Retry-After": "1"})
+
+  return ResponseSchema(message=f"Trip for car {carId} queued.", code=202)
+
+
+# Queue metrics, only with the diagnostics token
+@router.get("/queue/metrics",
+            summary="Trip queue depth and flush latency",
+            dependencies=[Depends(memoryDiagnostics.authorizeToken)])
+def getTripQueueMetrics() -> dict:
+  """
+  Get the depth of the trip queue and the statistics of its flushes.
+
+  Returns:
+    dict: The trip queue metrics.
+  """
+  return tripQueue.metrics()
@@ -11,13 +11,22 @@ Contact Information: mathteixeira55
 """
 
 ### Imports ###
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session
 from models import User
-from schemas import UserSchema, UserProtectedSchema, ResponseSchema
-from core.database import carsDb
+from schemas import (UserSchema, UserProtectedSchema, ResponseSchema,
+                     UserBulkResultSchema, UserBulkResponseSchema)
+from core.database import carsDb, config
+from core.userProvisioning import provisionUsers
+from core.requestProfiler import ProfiledRoute
+from security import AuthHandler
 
-router = APIRouter()
+authHandler = AuthHandler()
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# Maximum number of users per bulk request; larger imports use the CLI
+MAX_BULK_USERS = 10000
 
 
 ### CRUD Operations for Users ###
@@ -38,10 +47,47 @@ def signup(
   userToAdd.setPasswrod(user.password)
   session.add(userToAdd)
   session.commit()
-  session.refresh(userToAdd)
-  print("-" * 50)
-  print("userToAdd:", userToAdd)
-  print("type userToAdd:", type(userToAdd))
   AddedUser = UserProtectedSchema.model_validate(userToAdd)
 
   return ResponseSchema(message=AddedUser, code=201)
+
+
+# Create in bulk
+@router.post("/bulk",
+             summary="Register many users",
+             response_model=UserBulkResponseSchema)
+def bulkSignup(
+    users: list[UserSchema],
+    session: Session = Depends(carsDb.getSession),
+    user: UserProtectedSchema = Depends(authHandler.getCurrentUser)
+) -> UserBulkResponseSchema:
+  """
+  Register many users, hashing their passwords over a pool of processes and
+  inserting them in batches. Existing usernames are reported, not fatal.
+
+  Args:
+    users (list[UserSchema]): The users to register.
+
+  Returns:
+    UserBulkResponseSchema: The number of created users and the duplicates.
+
+  Raises:
+    HTTPException: If too many users are sent or there is an error adding the
+      users to the database.
+  """
+  if len(users) > MAX_BULK_USERS:
+    raise HTTPException(
+        status_code=413,
+        detail=f"At most {MAX_BULK_USERS} users per request, use the CLI")
+
+  try:
+    result = provisionUsers(session, users,
+                            config.USER_PROVISIONING_BATCH_SIZE,
+                            config.PASSWORD_HASH_WORKERS)
+  except Exception as e:
+    session.rollback()
+    raise HTTPException(status_code=500,
+                        detail=f"Failed to provision users: {e}")
+
+  return UserBulkResponseSchema(message=UserBulkResultSchema(**result),
+                                code=201)
@@ -15,12 +15,14 @@ from fastapi import APIRouter, Cookie, Depends, Query, Request
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session
 from core.database import carsDb
+from core.requestProfiler import ProfiledRoute
+from schemas import CarSize
 from starlette.responses import HTMLResponse
 
-from routers.cars import getCars
+from routers.cars import listCars
 
 ### Router Initialization ###
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 templates = Jinja2Templates(directory="templates")
 
@@ -40,13 +42,11 @@ def index(request: Request, visitCountCookie: int = Cookie(0)):
 # parameters and will not be used positionally, allowing us to call the function
 # passing parameters without default values in any order.
 def search(*,
-           size: str | None = Query(None),
+           size: CarSize | None = Query(None),
            doors: int | None = Query(None),
            request: Request,
            session: Session = Depends(carsDb.getSession)):
-  res = getCars(size, doors, False, session)
+  res = listCars(session, size=size, doors=doors)
   cars = res.message
-  return templates.TemplateResponse("searchResults.html", {
-      "request": request,
-      "cars": cars
-  })
+  return templates.TemplateResponse(request, "searchResults.html",
+                                    {"cars": cars})
@@ -10,10 +10,18 @@ License: MIT License
 Contact Information: mathteixeira55
 """
 
-from .carSchema import CarSchema
+from .carSchema import CarSchema, CarSize, CarFuel, CarTransmission
 from .detailedCarSchema import DetailedCarSchema
 from .tripSchema import TripSchema
 from .responseSchema import ResponseSchema
 from .detailedResponseSchema import DetailedResponseSchema
 from .userSchema import UserSchema
 from .userProtectedSchema import UserProtectedSchema
+from .facetSchema import FacetCountSchema, FacetSchema
+from .facetResponseSchema import FacetResponseSchema
+from .bulkResultSchema import BulkResultSchema
+from .bulkResponseSchema import BulkResponseSchema
+from .userBulkResultSchema import UserBulkResultSchema
+from .userBulkResponseSchema import UserBulkResponseSchema
+from .readinessSchema import PoolStatusSchema, ReadinessSchema
+from .carBatchSchema import CarBatchSchema, CarBatchResponseSchema
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: bulkResponseSchema.py
+Description: This script defines the BulkResponseSchema for data validation
+ and serialization. The BulkResponseSchema is used to structure the bulk car
+ operations API responses.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from pydantic import BaseModel
+from .bulkResultSchema import BulkResultSchema
+
+
+### Bulk Response Schema ###
+class BulkResponseSchema(BaseModel):
+  """
+  BulkResponseSchema for structuring bulk car operations API responses.
+
+  Attributes:
+    message (BulkResultSchema): The counts of matched and affected cars.
+    code (int): The status code of the response.
+  """
+  message: BulkResultSchema
+  code: int
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: bulkResultSchema.py
+Description: This script defines the BulkResultSchema for data validation and
+ serialization of the outcome of bulk car updates and deletes.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from pydantic import BaseModel, Field
+
+
+class BulkResultSchema(BaseModel):
+  """
+  BulkResultSchema model for data validation and serialization.
+
+  Attributes:
+    matched (int): The number of cars matching the filters.
+    affected (int): The number of cars updated or deleted.
+    dryRun (bool): Whether the operation only counted the matching cars.
+  """
+  matched: int = Field(...,
+                       description="The number of cars matching the filters",
+                       json_schema_extra={"example": 12})
+  affected: int = Field(...,
+                        description="The number of cars updated or deleted",
+                        json_schema_extra={"example": 12})
+  dryRun: bool = Field(
+      False,
+      description="Whether the operation only counted the matching cars",
+      json_schema_extra={"example": False})
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: carBatchSchema.py
+Description: This script defines the CarBatchSchema and CarBatchResponseSchema
+ for data validation and serialization of the cars read by ID in batches.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from pydantic import BaseModel, Field
+from models import Car
+from .detailedCarSchema import DetailedCarSchema
+
+
+class CarBatchSchema(BaseModel):
+  """
+  CarBatchSchema model for data validation and serialization.
+
+  Attributes:
+    cars (list[DetailedCarSchema] | list[Car]): The cars found, in the order
+      of the requested IDs, with their trips when requested.
+    missing (list[int]): The requested IDs no car has, in request order.
+  """
+  cars: list[DetailedCarSchema] | list[Car] = Field(
+      ..., description="The cars found, in the order of the requested IDs")
+  missing: list[int] = Field(
+      [],
+      description="The requested IDs no car has",
+      json_schema_extra={"example": [42]})
+
+
+### Car Batch Response Schema ###
+class CarBatchResponseSchema(BaseModel):
+  """
+  CarBatchResponseSchema for structuring batch car read API responses.
+
+  Attributes:
+    message (CarBatchSchema): The cars found and the missing IDs.
+    code (int): The status code of the response.
+  """
+  message: CarBatchSchema
+  code: int
@@ -2,7 +2,8 @@
 """
 File Name: carSchema.py
 Description: This script defines the CarSchema for data validation and\
- serialization using Pydantic.
+ serialization using Pydantic, and the values accepted by the enumerated car
+ columns.
 Author: MathTeixeira
 Date: July 6, 2024
 Version: 4.0.0
@@ -11,7 +12,71 @@ Contact Information: mathteixeira55
 """
 
 ### Imports ###
-from pydantic import BaseModel, Field
+from functools import partial
+from typing import Annotated, Literal
+from pydantic import BaseModel, BeforeValidator, Field
+
+# Values of the enumerated car columns. The database stores each value as its
+# position, starting at 1, so values may only be appended to these tuples.
+CAR_VALUES = {
+    "size": ("s", "m", "l"),
+    "fuel": ("gasoline", "diesel", "electric", "hybrid"),
+    "transmission": ("manual", "automatic")
+}
+# Other spellings of the values, accepted and stored as the value they mean
+CAR_ALIASES = {
+    "size": {
+        "small": "s",
+        "medium": "m",
+        "large": "l"
+    },
+    "fuel": {
+        "petrol": "gasoline",
+        "gas": "gasoline"
+    },
+    "transmission": {
+        "auto": "automatic"
+    }
+}
+
+
+def normalizeCarValue(column: str, value):
+  """
+  Normalize the spelling of an enumerated car column value.
+
+  Args:
+    column (str): The column, a key of CAR_VALUES.
+    value (str, optional): The value, in any case, possibly an alias.
+
+  Returns:
+    str | None: The lowercased value, or the value the alias stands for. An
+      empty value is None. Other types are returned as is, for validation to
+      reject them.
+  """
+  if not isinstance(value, str):
+    return value
+  value = value.strip().lower()
+  return CAR_ALIASES[column].get(value, value) or None
+
+
+def carValueType(column: str):
+  """
+  Build the validated type of an enumerated car column.
+
+  Args:
+    column (str): The column, a key of CAR_VALUES.
+
+  Returns:
+    type: A Literal of the column values, or None, normalized before
+      validation.
+  """
+  return Annotated[Literal[CAR_VALUES[column]] | None,
+                   BeforeValidator(partial(normalizeCarValue, column))]
+
+
+CarSize = carValueType("size")
+CarFuel = carValueType("fuel")
+CarTransmission = carValueType("transmission")
 
 
 class CarSchema(BaseModel):
@@ -19,23 +84,23 @@ class CarSchema(BaseModel):
   CarSchema model for data validation and serialization.
 
   Attributes:
-    size (str, optional): The size of the car (e.g., s, m, l).
-    fuel (str, optional): The type of fuel the car uses (e.g., gasoline, diesel, electric).
+    size (str, optional): The size of the car (s, m, l).
+    fuel (str, optional): The type of fuel the car uses (gasoline, diesel, electric, hybrid).
     doors (int, optional): The number of doors the car has.
-    transmission (str, optional): The type of transmission (e.g., manual, automatic).
+    transmission (str, optional): The type of transmission (manual, automatic).
   """
-  size: str | None = Field(None,
-                           description="The size of the car (e.g., s, m, l)",
-                           json_schema_extra={"example": "s"})
-  fuel: str | None = Field(
+  size: CarSize | None = Field(None,
+                               description="The size of the car (s, m, l)",
+                               json_schema_extra={"example": "s"})
+  fuel: CarFuel | None = Field(
       None,
       description=
-      "The type of fuel the car uses (e.g., gasoline, diesel, electric)",
+      "The type of fuel the car uses (gasoline, diesel, electric, hybrid)",
       json_schema_extra={"example": "gasoline"})
   doors: int | None = Field(None,
                             description="The number of doors the car has",
                             json_schema_extra={"example": 5})
-  transmission: str | None = Field(
+  transmission: CarTransmission | None = Field(
       None,
-      description="The type of transmission (e.g., manual, automatic)",
+      description="The type of transmission (manual, automatic)",
       json_schema_extra={"example": "automatic"})
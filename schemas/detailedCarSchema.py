@@ -24,6 +24,9 @@ class DetailedCarSchema(BaseModel):
     fuel (str, optional): The type of fuel the car uses (e.g., gasoline, diesel, electric).
     doors (int, optional): The number of doors the car has.
     transmission (str, optional): The type of transmission (e.g., manual, automatic).
+    trips (list[TripSchema]): The trips of the car, possibly limited.
+    tripCount (int, optional): The number of trips of the car, including those
+      left out of trips.
   """
   id: int | None = Field(None,
                          description="The unique identifier for the car",
@@ -53,5 +56,9 @@ class DetailedCarSchema(BaseModel):
               "description": "From store to home"
           }]
       })
+  tripCount: int | None = Field(
+      None,
+      description="The number of trips of the car, including those left out",
+      json_schema_extra={"example": 1})
 
   model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: facetResponseSchema.py
+Description: This script defines the FacetResponseSchema for data validation
+ and serialization. The FacetResponseSchema is used to structure the facet
+ counts API responses.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from pydantic import BaseModel
+from .facetSchema import FacetSchema
+
+
+### Facet Response Schema ###
+class FacetResponseSchema(BaseModel):
+  """
+  FacetResponseSchema for structuring facet counts API responses.
+
+  Attributes:
+    message (FacetSchema): The car counts per value of each facet.
+    code (int): The status code of the response.
+  """
+  message: FacetSchema
+  code: int
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: facetSchema.py
+Description: This script defines the FacetSchema for data validation and
+ serialization of the per-value car counts used by search filters.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from pydantic import BaseModel, Field
+
+
+class FacetCountSchema(BaseModel):
+  """
+  FacetCountSchema model for a single facet value and its number of cars.
+
+  Attributes:
+    value (str | int, optional): The facet value (None for cars without one).
+    count (int): The number of cars holding that value.
+  """
+  value: str | int | None = Field(None,
+                                  description="The facet value",
+                                  json_schema_extra={"example": "s"})
+  count: int = Field(...,
+                     description="The number of cars holding the value",
+                     json_schema_extra={"example": 12})
+
+
+class FacetSchema(BaseModel):
+  """
+  FacetSchema model for data validation and serialization.
+
+  Attributes:
+    size (list[FacetCountSchema]): Car counts per size.
+    fuel (list[FacetCountSchema]): Car counts per fuel type.
+    doors (list[FacetCountSchema]): Car counts per number of doors.
+    transmission (list[FacetCountSchema]): Car counts per transmission.
+  """
+  size: list[FacetCountSchema] = Field([],
+                                       description="Car counts per size")
+  fuel: list[FacetCountSchema] = Field([],
+                                       description="Car counts per fuel type")
+  doors: list[FacetCountSchema] = Field(
+      [], description="Car counts per number of doors")
+  transmission: list[FacetCountSchema] = Field(
+      [], description="Car counts per transmission")
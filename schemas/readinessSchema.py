@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: readinessSchema.py
+Description: This script defines the PoolStatusSchema and ReadinessSchema for
+ data validation and serialization of the readiness of the car sharing API.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from pydantic import BaseModel, Field
+
+
+class PoolStatusSchema(BaseModel):
+  """
+  PoolStatusSchema model for the database connection pool counters.
+
+  Attributes:
+    size (int): The number of persistent connections of the pool.
+    checkedOut (int): The number of connections in use.
+    overflow (int): The number of connections opened beyond the pool size.
+    utilization (float): The share of the connections the pool may open that
+      are in use, from 0 to 1.
+  """
+  size: int = Field(...,
+                    description="The number of persistent connections",
+                    json_schema_extra={"example": 5})
+  checkedOut: int = Field(...,
+                          description="The number of connections in use",
+                          json_schema_extra={"example": 2})
+  overflow: int = Field(
+      ...,
+      description="The number of connections beyond the pool size",
+      json_schema_extra={"example": 0})
+  utilization: float = Field(
+      ...,
+      description="The share of the available connections in use",
+      json_schema_extra={"example": 0.13})
+
+
+class ReadinessSchema(BaseModel):
+  """
+  ReadinessSchema model for data validation and serialization.
+
+  Attributes:
+    ready (bool): Whether the API can serve traffic.
+    reasons (list[str]): Why the API is not ready, empty when it is.
+    database (bool): Whether the last database probe succeeded.
+    latencyMs (float, optional): The duration of the last database probe.
+    error (str, optional): The error of the last database probe.
+    pool (PoolStatusSchema): The connection pool counters.
+  """
+  ready: bool = Field(...,
+                      description="Whether the API can serve traffic",
+                      json_schema_extra={"example": True})
+  reasons: list[str] = Field([],
+                             description="Why the API is not ready",
+                             json_schema_extra={"example": []})
+  database: bool = Field(
+      ...,
+      description="Whether the last database probe succeeded",
+      json_schema_extra={"example": True})
+  latencyMs: float | None = Field(
+      None,
+      description="The duration of the last database probe",
+      json_schema_extra={"example": 1.2})
+  error: str | None = Field(None,
+                            description="The error of the last database probe")
+  pool: PoolStatusSchema
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: userBulkResponseSchema.py
+Description: This script defines the UserBulkResponseSchema for data validation
+ and serialization. The UserBulkResponseSchema is used to structure the bulk
+ user provisioning API responses.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from pydantic import BaseModel
+from .userBulkResultSchema import UserBulkResultSchema
+
+
+### User Bulk Response Schema ###
+class UserBulkResponseSchema(BaseModel):
+  """
+  UserBulkResponseSchema for structuring bulk user provisioning API responses.
+
+  Attributes:
+    message (UserBulkResultSchema): The created count and duplicate usernames.
+    code (int): The status code of the response.
+  """
+  message: UserBulkResultSchema
+  code: int
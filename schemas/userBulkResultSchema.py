@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: userBulkResultSchema.py
+Description: This script defines the UserBulkResultSchema for data validation
+ and serialization of the outcome of bulk user provisioning.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+from pydantic import BaseModel, Field
+
+
+class UserBulkResultSchema(BaseModel):
+  """
+  UserBulkResultSchema model for data validation and serialization.
+
+  Attributes:
+    created (int): The number of users created.
+    duplicates (list[str]): The usernames that were not created because they
+      already existed or were repeated in the request.
+  """
+  created: int = Field(...,
+                       description="The number of users created",
+                       json_schema_extra={"example": 998})
+  duplicates: list[str] = Field(
+      [],
+      description="The usernames skipped because they already exist",
+      json_schema_extra={"example": ["johndoe"]})
@@ -10,4 +10,4 @@ License: MIT License
 Contact Information: mathteixeira55
 """
 
-from .authHandler import AuthHandler
+from .authHandler import AuthHandler, USER_BY_USERNAME
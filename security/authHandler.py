@@ -13,6 +13,7 @@ Contact Information: mathteixeira55
 ### Imports ###
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import bindparam
 from sqlmodel import Session, select
 from starlette import status
 
@@ -23,6 +24,9 @@ from models import User
 # User will send password and username to that url to get the token, that will
 # be returned to oauth2Scheme.
 oauth2Scheme = OAuth2PasswordBearer(tokenUrl=f"/auth/token")
+# Built once and run with the username bound, so requests neither rebuild the
+# statement nor compute its compiled cache key again
+USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
 
 
 class AuthHandler:
@@ -48,8 +52,7 @@ class AuthHandler:
     ########## NOTE: FOR SIMPLICITY, IN THIS SMALL PROJECT, TOKEN CONTAINS THE
     # USERNAME ONLY; BEFORE SENDING TO PRODUCTION THIS SHOULD BE ENHANCED.
     # ##########
-    query = select(User).where(User.username == token)
-    user = session.exec(query).first()
+    user = session.exec(USER_BY_USERNAME, params={"username": token}).first()
 
     if not user:
       raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
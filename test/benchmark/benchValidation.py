@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: benchValidation.py
+Description: This script benchmarks the Pydantic/SQLModel conversions on the
+ hot paths of the car sharing API, at several batch sizes, with timings and
+ allocation counts. Results are printed as JSON, and can be saved as a baseline
+ and compared against it to evaluate schema changes:
+   python -m test.benchmark.benchValidation --save baseline.json
+   python -m test.benchmark.benchValidation --baseline baseline.json
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from schemas import CarSchema, TripSchema, DetailedCarSchema, ResponseSchema
+from models import Car, Trip
+
+BATCH_SIZES = (1, 100, 1000, 10000)
+TRIPS_PER_CAR = 5
+
+
+def makeCarSchemas(count: int) -> list[CarSchema]:
+  """
+  Build request bodies as received by addCar.
+  """
+  return [
+      CarSchema(size="m", fuel="gasoline", doors=5, transmission="automatic")
+      for _ in range(count)
+  ]
+
+
+def makeTripSchemas(count: int) -> list[TripSchema]:
+  """
+  Build request bodies as received by addTrip.
+  """
+  return [
+      TripSchema(start=i, end=i + 10, description="From store to home")
+      for i in range(count)
+  ]
+
+
+def makeCars(count: int, withTrips: bool) -> list[Car]:
+  """
+  Build Car rows, optionally with their trips, as loaded by getCars.
+  """
+  cars = []
+  for carId in range(count):
+    car = Car(id=carId,
+              size="m",
+              fuel="gasoline",
+              doors=5,
+              transmission="automatic")
+    if withTrips:
+      for tripId in range(TRIPS_PER_CAR):
+        car.trips.append(
+            Trip(id=tripId,
+                 start=tripId,
+                 end=tripId + 10,
+                 description="From store to home",
+                 carId=carId))
+    cars.append(car)
+  return cars
+
+
+# Each case builds its input once, then converts the whole batch per run
+CASES = {
+    "addCar.Car.model_validate": (
+        lambda count: makeCarSchemas(count),
+        lambda cars: [Car.model_validate(car) for car in cars],
+    ),
+    "addTrip.Trip.model_validate": (
+        lambda count: makeTripSchemas(count),
+        lambda trips:
+        [Trip.model_validate(trip, update={"carId": 1}) for trip in trips],
+    ),
+    "getCars.DetailedCarSchema.model_validate": (
+        lambda count: makeCars(count, withTrips=True),
+        lambda cars: [DetailedCarSchema.model_validate(car) for car in cars],
+    ),
+    "getCars.ResponseSchema.serialize": (
+        lambda count: makeCars(count, withTrips=False),
+        lambda cars: ResponseSchema(message=cars, code=200).model_dump_json(),
+    ),
+}
+
+
+def measure(function, data, repeat: int) -> dict:
+  """
+  Time a conversion and count the memory it allocates.
+
+  Args:
+    function (callable): The conversion to measure.
+    data (list): The batch to convert.
+    repeat (int): The number of timed runs.
+
+  Returns:
+    dict: The best time, and the allocated blocks and peak bytes of one run.
+  """
+  best = float("inf")
+  for _ in range(repeat):
+    gc.collect()
+    start = time.perf_counter()
+    function(data)
+    best = min(best, time.perf_counter() - start)
+
+  # Allocations are measured on a separate run, tracing slows the code down
+  gc.collect()
+  gc.disable()
+  tracemalloc.start()
+  before = tracemalloc.take_snapshot()
+  result = function(data)
+  after = tracemalloc.take_snapshot()
+  _, peakBytes = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  gc.enable()
+  del result
+
+  allocatedBlocks = sum(
+      max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+  return {
+      "seconds": best,
+      "allocatedBlocks": allocatedBlocks,
+      "peakBytes": peakBytes
+  }
+
+
+def runBenchmarks(batchSizes, repeat: int) -> dict:
+  """
+  Measure every case at every batch size.
+
+  Returns:
+    dict: The results keyed by "case[batchSize]".
+  """
+  results = {}
+  for name, (makeData, function) in CASES.items():
+    for batchSize in batchSizes:
+      data = makeData(batchSize)
+      result = measure(function, data, repeat)
+      result["usPerItem"] = result["seconds"] * 1e6 / batchSize
+      result["blocksPerItem"] = result["allocatedBlocks"] / batchSize
+      results[f"{name}[{batchSize}]"] = result
+  return results
+
+
+def compare(results: dict, baseline: dict, maxRegression: float) -> list[str]:
+  """
+  List the cases slower or allocating more than the baseline allows.
+
+  Args:
+    results (dict): The current results.
+    baseline (dict): The stored results.
+    maxRegression (float): The tolerated relative increase (0.1 is 10%).
+
+  Returns:
+    list[str]: The regressions, empty if there are none.
+  """
+  regressions = []
+  for key, result in results.items():
+    if key not in baseline:
+      continue
+    for metric in ("usPerItem", "blocksPerItem"):
+      old, new = baseline[key][metric], result[metric]
+      if old and (new - old) / old > maxRegression:
+        regressions.append(f"{key} {metric}: {old:.2f} -> {new:.2f}")
+  return regressions
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="Benchmark model and schema conversions")
+  parser.add_argument("--sizes",
+                      type=int,
+                      nargs="+",
+                      default=list(BATCH_SIZES),
+                      help="Batch sizes")
+  parser.add_argument("--repeat", type=int, default=5)
+  parser.add_argument("--save", help="Write the results to this baseline file")
+  parser.add_argument("--baseline", help="Compare against this baseline file")
+  parser.add_argument("--max-regression", type=float, default=0.2)
+  args = parser.parse_args()
+
+  results = runBenchmarks(args.sizes, args.repeat)
+  report = {"python": sys.version.split()[0], "results": results}
+
+  regressions = []
+  if args.baseline:
+    with open(args.baseline) as file:
+      baseline = json.load(file)["results"]
+    regressions = compare(results, baseline, args.max_regression)
+    report["regressions"] = regressions
+  if args.save:
+    with open(args.save, "w") as file:
+      json.dump(report, file, indent=2)
+
+  print(json.dumps(report, indent=2))
+  sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+  main()
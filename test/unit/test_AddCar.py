@@ -34,7 +34,8 @@ def testDatabaseOperation():
 
   mockSession.add.assert_called_once()
   mockSession.commit.assert_called_once()
-  mockSession.refresh.assert_called_once()
+  # The generated ID comes back with the INSERT, no refresh SELECT is needed
+  mockSession.refresh.assert_not_called()
   assert result.code == 200
   assert isinstance(result.message, Car)
   assert result.message.size == "s"
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_BulkCars.py
+Description: This script tests the bulkUpdateCars and bulkDeleteCars functions
+ of the car sharing API. It checks the dry-run mode and the guard against
+ unfiltered bulk operations.
+"""
+
+### Imports ###
+import pytest
+from unittest.mock import Mock
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from routers import cars
+from routers.cars import bulkUpdateCars, bulkDeleteCars
+from schemas import CarSchema
+
+
+def testBulkNeedsAFilter():
+  """
+  Test that a bulk delete without filters is refused before reaching the
+  database.
+  """
+  mockSession = Mock()
+  with pytest.raises(HTTPException) as error:
+    bulkDeleteCars(None, None, None, None, None, False, mockSession)
+
+  assert error.value.status_code == 400
+  mockSession.exec.assert_not_called()
+
+
+def testBulkUpdateDryRun():
+  """
+  Test that a dry run only counts the matching cars and commits nothing.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.one.return_value = 3
+
+  result = bulkUpdateCars(CarSchema(fuel="electric"), None, None, "diesel",
+                          None, None, True, mockSession)
+
+  assert result.message.matched == 3
+  assert result.message.affected == 0
+  assert result.message.dryRun
+  assert str(mockSession.exec.call_args.args[0]).startswith("SELECT count(*)")
+  mockSession.commit.assert_not_called()
+
+
+def testBulkNeedsAuthentication():
+  """
+  Test that bulk updates and deletes are refused without a token.
+  """
+  app = FastAPI()
+  app.include_router(cars.router, prefix="/api/cars")
+  client = TestClient(app)
+
+  assert client.delete("/api/cars/?size=s").status_code == 401
+  assert client.patch("/api/cars/?size=s", json={
+      "fuel": "electric"
+  }).status_code == 401
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_CarBatch.py
+Description: This script tests the batch read of cars by ID of the car sharing
+ API. It checks that the cars are read with one query, in request order, and
+ that missing IDs are reported.
+"""
+
+### Imports ###
+import pytest
+from unittest.mock import Mock, patch
+from fastapi import HTTPException
+from models import Car
+from routers.cars import getCarsByIds
+
+
+def testBatchKeepsRequestOrder():
+  """
+  Test that getCarsByIds returns the cars in the order of the requested IDs,
+  once each, and lists the IDs that were not found.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.all.return_value = [
+      Car(id=1, size="s"), Car(id=3, size="l")
+  ]
+
+  response = getCarsByIds(ids=[3, 2, 1, 3],
+                          includeTrips=False,
+                          archived=False,
+                          session=mockSession)
+
+  assert mockSession.exec.call_count == 1
+  assert "IN" in str(mockSession.exec.call_args.args[0])
+  assert [car.id for car in response.message.cars] == [3, 1]
+  assert response.message.missing == [2]
+
+
+def testBatchLoadsTripsWithOneQuery():
+  """
+  Test that the trips of every found car are read with a single query.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.all.side_effect = [
+      [Car(id=1), Car(id=2)],
+      [(2, 1, 0, 5, "a", 2, 2), (2, 2, 5, 9, "b", 2, 2)],
+  ]
+
+  response = getCarsByIds(ids=[2, 1],
+                          includeTrips=True,
+                          archived=False,
+                          session=mockSession)
+
+  assert mockSession.exec.call_count == 2
+  cars = response.message.cars
+  assert [len(car.trips) for car in cars] == [2, 0]
+  assert [car.tripCount for car in cars] == [2, 0]
+  assert cars[0].trips[1].end == 9
+
+
+def testBatchRefusesTooManyIds():
+  """
+  Test that requesting more IDs than configured is refused.
+  """
+  mockSession = Mock()
+  with patch("routers.cars.config.CAR_BATCH_MAX_IDS", 2):
+    with pytest.raises(HTTPException) as error:
+      getCarsByIds(ids=[1, 2, 3],
+                   includeTrips=False,
+                   archived=False,
+                   session=mockSession)
+  assert error.value.status_code == 400
+  mockSession.exec.assert_not_called()
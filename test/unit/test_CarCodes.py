@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_CarCodes.py
+Description: This script tests the validation of the enumerated car columns,
+ and their storage as small integer codes.
+"""
+
+### Imports ###
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine, select
+from schemas import CarSchema
+from models import Car
+from utils.migrateCarCodes import codeCase
+
+
+def testCarSchemaNormalizesSpellings():
+  """
+  Test that CarSchema accepts the known spellings of a value and rejects the
+  unknown values.
+  """
+  car = CarSchema(size=" M", fuel="Petrol", transmission="auto")
+
+  assert (car.size, car.fuel, car.transmission) == ("m", "gasoline",
+                                                    "automatic")
+  assert CarSchema(size="").size is None
+  with pytest.raises(ValidationError):
+    CarSchema(fuel="hydrogen")
+
+
+def testValuesAreStoredAsCodes():
+  """
+  Test that the enumerated columns hold codes in the database, while the
+  models, the filters and the ordering use the values.
+  """
+  engine = create_engine("sqlite://", poolclass=StaticPool)
+  SQLModel.metadata.create_all(engine)
+
+  with Session(engine) as session:
+    session.add_all([
+        Car(id=1, size="l", fuel="diesel", transmission="manual"),
+        Car(id=2, size="s", fuel="hybrid", transmission="automatic")
+    ])
+    session.commit()
+
+    assert session.exec(text("SELECT size, fuel, transmission FROM car "
+                             "ORDER BY id")).all() == [(3, 2, 1), (1, 4, 2)]
+    assert session.exec(text("SELECT value FROM carcode WHERE "
+                             "\"column\" = 'fuel' AND code = 4")).one() == (
+                                 "hybrid",)
+    cars = session.exec(select(Car).order_by(Car.size)).all()
+    assert [car.size for car in cars] == ["s", "l"]
+    assert session.exec(select(Car.id).where(
+        Car.transmission == "Auto")).all() == [2]
+    assert session.exec(select(Car.id).where(Car.fuel == "hydrogen")).all() == []
+
+    session.add(Car(id=3, fuel="hydrogen"))
+    with pytest.raises(IntegrityError):
+      session.commit()
+
+
+def testMigrationMapsSpellingsToCodes():
+  """
+  Test that the migration converts every known spelling of a value to its
+  code.
+  """
+  case = codeCase("transmission")
+
+  assert case.startswith("CASE lower(btrim(transmission))")
+  assert "WHEN 'automatic' THEN 2" in case
+  assert "WHEN 'auto' THEN 2" in case
+  assert "WHEN 'manual' THEN 1" in case
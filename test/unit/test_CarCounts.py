@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_CarCounts.py
+Description: This script tests the total counts of the car listing of the car
+ sharing API, and the car count cache behind them.
+"""
+
+### Imports ###
+from unittest.mock import Mock
+import pytest
+from core.config import Config
+from core.carCountCache import CarCountCache
+from routers.cars import totalHeaders
+
+
+def testCountCacheFollowsCreatesAndDeletes():
+  """
+  Test that cached counts follow the cars created and deleted, and that counts
+  computed before an invalidation or an adjustment are not stored.
+  """
+  cache = CarCountCache(maxEntries=2)
+  cache.set({"size": "s"}, 4, cache.generation)
+  cache.set({}, 10, cache.generation)
+
+  cache.adjust({"size": "s", "doors": 3}, 1)
+  cache.adjust({"size": "m", "doors": 5}, -1)
+  assert cache.get({"size": "s", "doors": None}) == 5
+  assert cache.get({}) == 10
+
+  generation = cache.generation
+  cache.invalidate()
+  cache.set({"fuel": "diesel"}, 3, generation)
+  assert cache.get({"fuel": "diesel"}) is None
+
+  generation = cache.generation
+  cache.adjust({"size": "s"}, 1)
+  cache.set({"size": "l"}, 2, generation)
+  assert cache.get({"size": "l"}) is None
+
+
+def testTotalHeadersModes():
+  """
+  Test that full listings are counted by their length, and that paginated
+  ones fall back from estimate to the cached count outside PostgreSQL.
+  """
+  mockSession = Mock()
+  mockSession.get_bind.return_value.dialect.name = "sqlite"
+  mockSession.exec.return_value.one.return_value = 42
+
+  assert totalHeaders(mockSession, "estimate", False, {}, [1, 2]) == {
+      "X-Total-Count": "2",
+      "X-Total-Count-Mode": "exact"
+  }
+  assert totalHeaders(mockSession, "none", True, {}, []) == {}
+
+  filters = {"size": "xl"}
+  for mode in ("estimate", "cached"):
+    headers = totalHeaders(mockSession, mode, True, filters, [])
+    assert headers == {"X-Total-Count": "42", "X-Total-Count-Mode": "cached"}
+  # The second paginated request is served by the cache
+  mockSession.exec.assert_called_once()
+
+
+def testCountModeIsValidated(monkeypatch):
+  """
+  Test that an unknown CAR_COUNT_MODE fails at startup.
+  """
+  monkeypatch.setenv("CAR_COUNT_MODE", "Cached")
+  assert Config().CAR_COUNT_MODE == "cached"
+
+  monkeypatch.setenv("CAR_COUNT_MODE", "exactly")
+  with pytest.raises(ValueError, match="CAR_COUNT_MODE"):
+    Config()
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_CarFacets.py
+Description: This script tests the getCarFacets function of the car sharing API.
+ It checks that each facet is counted without its own filter.
+"""
+
+### Imports ###
+from unittest.mock import Mock
+from routers.cars import getCarFacets, FACET_COLUMNS
+from schemas import FacetResponseSchema
+
+
+def testFacetsLeaveOwnFilterOut():
+  """
+  Test that getCarFacets runs one grouped query per facet and skips the
+  facet's own filter in it.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.all.return_value = [("s", 2), ("m", 3)]
+
+  result = getCarFacets(size="s",
+                        doors=None,
+                        fuel=None,
+                        transmission=None,
+                        session=mockSession)
+
+  assert isinstance(result, FacetResponseSchema)
+  assert mockSession.exec.call_count == len(FACET_COLUMNS)
+  queries = [str(call.args[0]) for call in mockSession.exec.call_args_list]
+  # The size facet is counted over every size, the others only over size "s"
+  assert "car.size = " not in queries[0]
+  assert all("car.size = " in query for query in queries[1:])
+  assert all("GROUP BY" in query for query in queries)
+  assert [facet.count for facet in result.message.size] == [2, 3]
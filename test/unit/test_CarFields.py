@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_CarFields.py
+Description: This script tests the sparse fieldsets of the car listing of the
+ car sharing API. It checks that only the requested columns are selected.
+"""
+
+### Imports ###
+import json
+import pytest
+from unittest.mock import Mock
+from fastapi import HTTPException
+from sqlmodel import select
+from models import Car
+from routers.cars import listCars, parseFields, selectTrips
+
+
+def testParseFields():
+  """
+  Test that car and trip columns are split and that unknown ones are refused.
+  """
+  assert parseFields("id, size,id") == (["id", "size"], None)
+  assert parseFields("size,trips.end") == (["size"], ["end"])
+  _, tripFields = parseFields("trips")
+  assert tripFields == ["id", "start", "end", "description", "carId"]
+  with pytest.raises(HTTPException) as error:
+    parseFields("id,passwordHash")
+  assert error.value.status_code == 400
+
+
+def testSparseListingSelectsColumns():
+  """
+  Test that listCars selects only the requested columns, and reads the trips of
+  the cars, and their counts, with one more query.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.all.side_effect = [
+      [("s", 1), ("s", 2)],
+      [(1, 0, 10, 3)],
+  ]
+
+  response = listCars(mockSession,
+                      size="s",
+                      fields="size,trips.start,trips.end")
+
+  queries = [str(call.args[0]) for call in mockSession.exec.call_args_list]
+  assert queries[0].startswith("SELECT car.size, car.id \nFROM car")
+  assert "trip.start AS start, trip.\"end\" AS \"end\"" in queries[1]
+  assert "trip.description" not in queries[1]
+  assert json.loads(response.body)["message"] == [{
+      "size": "s",
+      "trips": [{
+          "start": 0,
+          "end": 10
+      }],
+      "tripCount": 3
+  }, {
+      "size": "s",
+      "trips": [],
+      "tripCount": 0
+  }]
+
+
+def testTripLimitRanksTripsInDatabase():
+  """
+  Test that the trips kept per car are ranked and counted by window functions,
+  and grouped by car with their counts.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.all.return_value = [(1, 9, 3), (1, 8, 3),
+                                                     (2, 4, 1)]
+
+  tripsByCar = selectTrips(mockSession, ["id"], select(Car.id), 2, "newest")
+
+  query = str(mockSession.exec.call_args.args[0])
+  assert ("row_number() OVER (PARTITION BY trip.\"carId\" "
+          "ORDER BY trip.id DESC)") in query
+  assert "count(*) OVER (PARTITION BY trip.\"carId\")" in query
+  assert "\"tripRank\" <= " in query
+  assert tripsByCar == {1: ([{"id": 9}, {"id": 8}], 3), 2: ([{"id": 4}], 1)}
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_CarIndex.py
+Description: This script tests the in-memory columnar car index. It checks
+ that filtered reads match the stored cars and follow inserts, updates and
+ deletes, without touching the database.
+"""
+
+### Imports ###
+import pytest
+from unittest.mock import Mock
+from core.carIndex import CarIndex
+
+pytest.importorskip("numpy")
+
+CARS = [
+    (1, "s", "gasoline", 5, "manual"),
+    (2, "m", "diesel", 5, "automatic"),
+    (3, "m", None, 3, "automatic"),
+]
+
+
+def loadedIndex() -> CarIndex:
+  """
+  Build a warm index from a mocked session holding CARS.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.all.return_value = CARS
+  index = CarIndex(enabled=True)
+  index.load(mockSession)
+  return index
+
+
+def testColdIndexFallsBack():
+  """
+  Test that a cold index answers None, so callers fall back to SQL.
+  """
+  index = CarIndex(enabled=True)
+  assert index.query(size="s") is None
+  assert index.facets({}) is None
+
+
+def testQueryFollowsWrites():
+  """
+  Test that filtered reads follow inserts, updates and deletes.
+  """
+  index = loadedIndex()
+  assert [car.id for car in index.query(size="m")] == [2, 3]
+  assert [car.id for car in index.query(size="m", doors=5)] == [2]
+  assert index.query(fuel="hydrogen") == []
+
+  index.upsert({"id": 4, "size": "m", "fuel": "electric", "doors": 5})
+  index.upsert({"id": 2, "size": "l", "fuel": "diesel", "doors": 5})
+  index.remove(3)
+
+  assert [car.id for car in index.query(size="m")] == [4]
+  assert index.query(size="l")[0].fuel == "diesel"
+  assert [car.id for car in index.query()] == [1, 2, 4]
+
+
+def testFacetsLeaveOwnFilterOut():
+  """
+  Test that facet counts skip the facet's own filter and keep missing values.
+  """
+  index = loadedIndex()
+  facets = index.facets({
+      "size": "m",
+      "doors": None,
+      "fuel": None,
+      "transmission": None
+  })
+  # In the order of CAR_VALUES, like the codes SQL sorts on
+  assert facets["size"] == [("s", 1), ("m", 2)]
+  assert facets["fuel"] == [("diesel", 1), (None, 1)]
+  assert facets["doors"] == [(3, 1), (5, 1)]
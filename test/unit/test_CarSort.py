@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_CarSort.py
+Description: This script tests the sorted, cursor-paginated car listing of the
+ car sharing API. It checks that pages start with keyset conditions.
+"""
+
+### Imports ###
+import pytest
+from fastapi import HTTPException
+from sqlmodel import select
+from models import Car
+from routers.cars import (parseSort, encodeCursor, decodeCursor, applyCarPage,
+                          nextCursorHeaders)
+
+
+def testCursorRoundTrip():
+  """
+  Test that cursors decode to their position and only for their sort order.
+  """
+  field, descending = parseSort("-doors")
+  cursor = encodeCursor(field, descending, 5, 42)
+
+  assert (field, descending) == ("doors", True)
+  assert decodeCursor(cursor, field, descending) == (5, 42)
+  for badCursor, sortField in ((cursor, "size"), ("not a cursor", "doors")):
+    with pytest.raises(HTTPException) as error:
+      decodeCursor(badCursor, sortField, True)
+    assert error.value.status_code == 400
+
+
+def testPagesUseKeysetConditions():
+  """
+  Test that a page after a cursor is a row comparison on the sort column and
+  the ID, in the order of the (column, id) index, without OFFSET.
+  """
+  query = str(applyCarPage(select(Car), "size", False, ("m", 7), 20))
+
+  assert "(car.size, car.id) >" in query
+  assert " OR " not in query and "OFFSET" not in query
+  assert "ORDER BY car.size ASC NULLS LAST, car.id" in query
+
+  query = str(applyCarPage(select(Car), "size", True, (None, 7), 20))
+  assert "car.size IS NULL AND car.id <" in query
+
+
+def testCursorCrossesNulls():
+  """
+  Test that full pages continue after their last car, and that the last page
+  before the NULL sizes points to them.
+  """
+  cars = [{"id": 3, "size": "m"}, {"id": 9, "size": "s"}]
+
+  fullPage = nextCursorHeaders(cars, "size", False, 2, None)
+  assert decodeCursor(fullPage["X-Next-Cursor"], "size", False) == ("s", 9)
+
+  lastPage = nextCursorHeaders(cars, "size", False, 5, ("l", 1))
+  assert decodeCursor(lastPage["X-Next-Cursor"], "size",
+                      False) == (None, None)
+  assert nextCursorHeaders(cars, "size", False, 5, (None, None)) == {}
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_ChangeFeed.py
+Description: This script tests the ChangeFeed of the car sharing API. It checks
+ that events are sequenced, that subscribers resume from a sequence number and
+ that a subscriber falling behind the ring buffer, or ahead of it, is told to
+ reset.
+"""
+
+### Imports ###
+import asyncio
+from core.changeFeed import ChangeFeed
+
+
+async def readEvents(feed: ChangeFeed, lastSeq: int, count: int) -> list:
+  """
+  Read `count` events from the feed, after `lastSeq`.
+  """
+  events = []
+  async for event in feed.subscribe(lastSeq, heartbeat=0.01):
+    if event is not None:
+      events.append(event)
+    if len(events) == count:
+      break
+  return events
+
+
+def testResumeFromSequence():
+  """
+  Test that a subscriber only receives the events after its sequence number.
+  """
+  feed = ChangeFeed(capacity=10)
+  for carId in range(1, 4):
+    feed.publish("car", "created", carId)
+
+  events = asyncio.run(readEvents(feed, 1, 2))
+
+  assert [event["seq"] for event in events] == [2, 3]
+  assert [event["id"] for event in events] == [2, 3]
+
+
+def testSlowSubscriberIsReset():
+  """
+  Test that a subscriber behind the ring buffer gets a reset event first.
+  """
+  feed = ChangeFeed(capacity=2)
+  for carId in range(1, 6):
+    feed.publish("car", "deleted", carId)
+
+  events = asyncio.run(readEvents(feed, 0, 3))
+
+  assert events[0]["action"] == "reset"
+  assert [event["seq"] for event in events[1:]] == [4, 5]
+
+
+def testResumeAheadOfFeedIsReset():
+  """
+  Test that a sequence number from another process (ahead of the feed) gets a
+  reset event, followed by the kept and the new events.
+  """
+  feed = ChangeFeed(capacity=10)
+  feed.publish("car", "created", 1)
+
+  events = asyncio.run(readEvents(feed, 42, 2))
+  assert events[0]["action"] == "reset"
+  assert events[0]["seq"] == 0
+  assert [event["seq"] for event in events[1:]] == [1]
+
+  emptyFeed = ChangeFeed(capacity=10)
+  events, missed = emptyFeed.since(42)
+  assert events == [] and missed
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_HealthCheck.py
+Description: This script tests the readiness check of the car sharing API.
+"""
+
+### Imports ###
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine, event
+from core.healthCheck import HealthCheck
+
+
+def makeEngine(checkedOut: int = 0) -> MagicMock:
+  """
+  Build an engine with a pool of 5 connections plus 5 of overflow.
+  """
+  engine = MagicMock()
+  engine.pool.size.return_value = 5
+  engine.pool.checkedout.return_value = checkedOut
+  engine.pool.overflow.return_value = max(checkedOut - 5, 0)
+  engine.pool._max_overflow = 5
+  return engine
+
+
+def testProbeIsCached():
+  """
+  Test that readiness calls within the cache interval share one probe.
+  """
+  engine = makeEngine()
+  healthCheck = HealthCheck(engine, 60, 0.9, 1)
+
+  for _ in range(3):
+    readiness = healthCheck.readiness()
+
+  assert readiness["ready"] is True
+  assert readiness["pool"]["utilization"] == 0.0
+  engine.connect.assert_called_once()
+
+
+def testNotReadyOnDatabaseErrors():
+  """
+  Test that failed probes make the API not ready once they reach the
+  threshold, and that a successful probe makes it ready again.
+  """
+  engine = makeEngine()
+  engine.connect.side_effect = ConnectionError("refused")
+  healthCheck = HealthCheck(engine, 0, 0.9, 2)
+
+  assert healthCheck.readiness()["ready"] is True
+  readiness = healthCheck.readiness()
+  assert readiness["ready"] is False
+  assert readiness["error"] == "ConnectionError"
+
+  engine.connect.side_effect = None
+  assert healthCheck.readiness()["ready"] is True
+
+
+def testNotReadyWhenPoolSaturated():
+  """
+  Test that a saturated pool makes the API not ready without probing.
+  """
+  engine = makeEngine(checkedOut=10)
+  healthCheck = HealthCheck(engine, 0, 0.9, 1)
+
+  readiness = healthCheck.readiness()
+
+  assert readiness["ready"] is False
+  assert readiness["pool"]["utilization"] == 1.0
+  engine.connect.assert_not_called()
+
+
+def testBusyProbeIsNotAwaited():
+  """
+  Test that a caller arriving during a probe gets the last result instead of
+  waiting for the database.
+  """
+  engine = makeEngine()
+  healthCheck = HealthCheck(engine, 0, 0.9, 1)
+  lastProbe = healthCheck.probe()
+
+  with healthCheck._lock:
+    assert healthCheck.probe() is lastProbe
+
+  engine.connect.assert_called_once()
+
+
+def testPostgresProbeTimesOut():
+  """
+  Test that the PostgreSQL probe opens its own connection, bounded in connect
+  and statement time.
+  """
+  engine = create_engine("postgresql+psycopg2://user:secret@db/cars")
+  healthCheck = HealthCheck(engine, 0, 0.9, 1, timeout=1.5)
+  connectArgs = {}
+
+  @event.listens_for(healthCheck._probeEngine, "do_connect")
+  def refuse(dialect, connectionRecord, cargs, cparams):
+    connectArgs.update(cparams)
+    raise ConnectionError("refused")
+
+  assert healthCheck.probe()["error"] == "ConnectionError"
+  assert connectArgs["connect_timeout"] == 2
+  assert connectArgs["options"] == "-c statement_timeout=1500"
+  assert healthCheck._probeEngine.pool.size() == 1
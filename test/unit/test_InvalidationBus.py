@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_InvalidationBus.py
+Description: This script tests the cache invalidation bus of the car sharing
+ API between workers, over the in-process stand-in broker.
+"""
+
+### Imports ###
+import time
+from sqlmodel import Session, create_engine
+from core.invalidationBus import InvalidationBus, InProcessBroker
+
+
+def waitFor(condition, timeout: float = 2):
+  """
+  Wait until a condition holds, as messages are delivered by other threads.
+  """
+  deadline = time.monotonic() + timeout
+  while not condition() and time.monotonic() < deadline:
+    time.sleep(0.01)
+  return condition()
+
+
+def testWorkersEvictEachOthersEntries():
+  """
+  Test that an invalidation reaches the other workers only, when its
+  transaction commits, and that every cache is flushed on connect and on
+  reconnect.
+  """
+  broker = InProcessBroker()
+  engine = create_engine("sqlite://")
+  evicted = {"writer": [], "reader": []}
+  buses = {}
+  for name in evicted:
+    buses[name] = InvalidationBus(broker, enabled=True, reconnectDelay=0.01)
+    buses[name].subscribe("car", evicted[name].append)
+    buses[name].start()
+  try:
+    # Both listeners flush when they connect
+    assert waitFor(lambda: evicted["reader"] == [None])
+    with Session(engine) as session:
+      buses["writer"].publish(session, "car", 7)
+      buses["writer"].publish(session, "trip", 3)
+      time.sleep(0.05)
+      assert evicted["reader"] == [None]
+      session.commit()
+    assert waitFor(lambda: evicted["reader"] == [None, 7])
+    assert evicted["writer"] == [None]
+
+    broker.disconnect()
+    assert waitFor(lambda: evicted["reader"] == [None, 7, None])
+
+    with Session(engine) as session:
+      buses["writer"].publish(session, "car", 8)
+      session.rollback()
+      buses["writer"].publish(session, "car", 9)
+      session.commit()
+    assert waitFor(lambda: evicted["reader"] == [None, 7, None, 9])
+  finally:
+    for bus in buses.values():
+      bus.stop()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_LoopMonitor.py
+Description: This script tests the event-loop lag monitor, and the detection
+ of the calls blocking the loop.
+"""
+
+### Imports ###
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.loopMonitor import (LoopMonitor, LoopMonitorMiddleware,
+                              BlockingCallError, blockingRoute, ROUTERS_DIR)
+
+
+def makeApp(monitor: LoopMonitor) -> FastAPI:
+  """
+  Build an app monitored by the given monitor, with a blocking async route
+  and a sleeping sync route.
+  """
+
+  @asynccontextmanager
+  async def lifespan(app: FastAPI):
+    await monitor.start()
+    yield
+    await monitor.stop()
+
+  app = FastAPI(lifespan=lifespan)
+  app.add_middleware(LoopMonitorMiddleware, monitor=monitor)
+
+  @app.get("/blocking")
+  async def blocking():
+    time.sleep(0.3)
+    return {}
+
+  @app.get("/threaded")
+  def threaded():
+    time.sleep(0.3)
+    return {}
+
+  return app
+
+
+def testStrictModeFailsBlockingRoutes():
+  """
+  Test that in strict mode an async route blocking the loop fails, with the
+  blocked stack, while a sync route sleeping in a thread does not.
+  """
+  monitor = LoopMonitor(enabled=True,
+                        interval=0.02,
+                        threshold=0.1,
+                        strict=True,
+                        maxEvents=5)
+
+  with TestClient(makeApp(monitor)) as client:
+    assert client.get("/threaded").status_code == 200
+    with pytest.raises(BlockingCallError) as raised:
+      client.get("/blocking")
+
+  assert "time.sleep(0.3)" in str(raised.value)
+  event = monitor.metrics()["events"][-1]
+  assert event["request"] == "GET /blocking"
+  assert event["blockedMs"] >= 100
+  assert event["durationMs"] >= 250
+  assert monitor.blockedCount == 1
+
+
+def testOnlyTheBlockingRequestFails():
+  """
+  Test that in strict mode a request in flight while another one blocks the
+  loop is not failed.
+  """
+  monitor = LoopMonitor(enabled=True,
+                        interval=0.02,
+                        threshold=0.1,
+                        strict=True,
+                        maxEvents=5)
+
+  with TestClient(makeApp(monitor)) as client:
+    with ThreadPoolExecutor(1) as executor:
+      threaded = executor.submit(client.get, "/threaded")
+      time.sleep(0.05)
+      with pytest.raises(BlockingCallError):
+        client.get("/blocking")
+      assert threaded.result().status_code == 200
+
+
+def testLagIsMeasured():
+  """
+  Test that the lag of the loop is reported without failing requests outside
+  of strict mode.
+  """
+  monitor = LoopMonitor(enabled=True,
+                        interval=0.02,
+                        threshold=0.1,
+                        strict=False,
+                        maxEvents=5)
+
+  with TestClient(makeApp(monitor)) as client:
+    assert client.get("/blocking").status_code == 200
+    time.sleep(0.1)
+    metrics = monitor.metrics()
+
+  assert metrics["running"]
+  assert metrics["ticks"] > 0
+  assert metrics["maxLagMs"] >= 150
+  assert metrics["blockedCount"] == 1
+  assert not monitor.metrics()["running"]
+
+
+def testBlockingRouteIsTheInnermostRouteFrame():
+  """
+  Test that a blocked stack is attributed to the innermost function of a
+  route module.
+  """
+  stack = traceback.StackSummary.from_list([
+      ("main.py", 1, "dispatch", None),
+      (os.path.join(ROUTERS_DIR, "auth.py"), 30, "login", None),
+      ("security.py", 12, "verifyPassword", None)
+  ])
+
+  assert blockingRoute(stack) == "login"
+  assert blockingRoute(stack[:1]) is None
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_MemoryDiagnostics.py
+Description: This script tests the opt-in memory diagnostics: their
+ protection, the bounded tracing, the heap snapshot diffs and the live object
+ counts.
+"""
+
+### Imports ###
+import os
+import time
+import pytest
+from fastapi import HTTPException, Request
+from models import Car, Trip
+from core.memoryDiagnostics import MemoryDiagnostics
+
+
+def makeDiagnostics(directory: str = "memory") -> MemoryDiagnostics:
+  """
+  Build enabled diagnostics, with the token "secret".
+  """
+  return MemoryDiagnostics(enabled=True,
+                           token="secret",
+                           sampleRate=1,
+                           frames=1,
+                           maxSeconds=1,
+                           directory=directory,
+                           maxBytes=1024 * 1024,
+                           top=20)
+
+
+def makeRequest(token: str | None) -> Request:
+  """
+  Build a request, with the diagnostics token header when given.
+  """
+  headers = [(b"x-diagnostics-token", token.encode())] if token else []
+  return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def testEndpointsNeedConfigAndToken():
+  """
+  Test that the diagnostics are refused when disabled, or without the token.
+  """
+  diagnostics = makeDiagnostics()
+  diagnostics.authorize(makeRequest("secret"))
+
+  with pytest.raises(HTTPException) as raised:
+    diagnostics.authorize(makeRequest("wrong"))
+  assert raised.value.status_code == 403
+  diagnostics.enabled = False
+  with pytest.raises(HTTPException) as raised:
+    diagnostics.authorize(makeRequest("secret"))
+  assert raised.value.status_code == 404
+
+  # The runtime metrics only need the token
+  diagnostics.authorizeToken(makeRequest("secret"))
+  with pytest.raises(HTTPException) as raised:
+    diagnostics.authorizeToken(makeRequest(None))
+  assert raised.value.status_code == 403
+
+
+def testTracingStopsOnItsOwn(tmp_path):
+  """
+  Test that tracing is capped in time, and that snapshots are diffed against
+  the previous one and written to files.
+  """
+  diagnostics = makeDiagnostics(str(tmp_path))
+  assert diagnostics.start(60) == 1
+  assert diagnostics.snapshot()["kind"] == "top"
+  cars = [Car(id=id, size="m") for id in range(1000)]
+  diff = diagnostics.snapshot()
+  for _ in range(30):
+    if not diagnostics.tracing:
+      break
+    time.sleep(0.1)
+
+  assert not diagnostics.tracing
+  assert diff["kind"] == "diff"
+  assert diff["sizeDiffBytes"] > 0
+  assert sorted(os.listdir(tmp_path))[0].endswith(".txt")
+  assert len(os.listdir(tmp_path)) == 2
+  assert len(cars) == 1000
+
+
+def testPeaksAndLiveObjectsAreCounted():
+  """
+  Test that the peaks are aggregated per route, and that the live Car and
+  Trip instances are counted.
+  """
+  diagnostics = makeDiagnostics()
+  diagnostics.record("getCars", 300)
+  diagnostics.record("getCars", 100)
+  cars = [Car(id=1), Car(id=2)]
+  trip = Trip(start=0, end=1, description="From store to home")
+
+  route = diagnostics.metrics()["routes"]["getCars"]
+  objects = diagnostics.objects()
+
+  assert (route["samples"], route["maxPeakBytes"], route["avgPeakBytes"],
+          route["lastPeakBytes"]) == (2, 300, 200, 100)
+  assert objects["cars"] >= len(cars)
+  assert objects["trips"] >= 1
+  assert trip.description
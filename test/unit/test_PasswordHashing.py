@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_PasswordHashing.py
+Description: This script tests the bulk password hashing pool of the car
+ sharing API. It checks that concurrent callers share a single pool, and that
+ the pool follows the requested number of workers.
+"""
+
+### Imports ###
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+from utils import passwordHashing
+
+
+def testPoolIsCreatedOnce():
+  """
+  Test that concurrent first calls create one pool, recreated on resize.
+  """
+  with patch.object(passwordHashing, "ProcessPoolExecutor") as executor:
+    executor.side_effect = lambda **kwargs: Mock()
+    with ThreadPoolExecutor(8) as threads:
+      pools = set(threads.map(lambda _: passwordHashing._getPool(2), range(8)))
+    assert len(pools) == 1
+    assert executor.call_count == 1
+
+    pool = pools.pop()
+    assert passwordHashing._getPool(3) is not pool
+    pool.shutdown.assert_called_once()
+    passwordHashing.shutdownHashingPool()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_RequestDeadline.py
+Description: This script tests the database deadlines of the routes, and the
+ cancellation of the queries of disconnected clients.
+"""
+
+### Imports ###
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+import pytest
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine
+from core.requestDeadline import (RequestDeadlines, RequestTracker,
+                                  DeadlineMiddleware, TRACKER_KEY)
+
+
+def makeRequest(routeName: str) -> Request:
+  """
+  Build a request routed to the named endpoint.
+  """
+  return Request({
+      "type": "http",
+      "method": "GET",
+      "path": "/",
+      "headers": [],
+      "route": SimpleNamespace(name=routeName)
+  })
+
+
+def testDeadlinesByRoute():
+  """
+  Test that routes get their own deadline or the default one, and that 0
+  disables it.
+  """
+  deadlines = RequestDeadlines(default=30, routes={"getCars": 60})
+
+  assert deadlines.deadlineFor("getCars") == 60
+  assert deadlines.deadlineFor("getCarById") == 5
+  assert deadlines.deadlineFor("addCar") == 30
+  assert RequestDeadlines(default=0, routes={}).deadlineFor("addCar") is None
+
+
+def testExpiredDeadlineIsA504():
+  """
+  Test that a transaction begun after the deadline fails, and that the
+  failure is reported as a 504 even when the route turned it into a 500.
+  """
+  engine = create_engine("sqlite://", poolclass=StaticPool)
+  deadlines = RequestDeadlines(default=1e-9, routes={})
+
+  with Session(engine) as session:
+    tracker = deadlines.attach(session, makeRequest("getCars"))
+    with pytest.raises(Exception) as raised:
+      try:
+        session.exec(text("SELECT 1"))
+      except Exception as e:
+        raise RuntimeError("Failed to get cars") from e
+
+  assert deadlines.httpError(raised.value, tracker).status_code == 504
+
+
+def testDatabaseFailuresAreTranslated():
+  """
+  Test that cancelled statements and an exhausted pool are reported as 504
+  and 503, and that other failures are left alone.
+  """
+  canceled = Exception("canceling statement due to statement timeout")
+  canceled.pgcode = "57014"
+  tracker = RequestTracker()
+
+  assert RequestDeadlines.httpError(canceled, tracker).status_code == 504
+  assert RequestDeadlines.httpError(PoolTimeoutError(),
+                                    tracker).status_code == 503
+  assert RequestDeadlines.httpError(ValueError(), tracker) is None
+  tracker.disconnected = True
+  assert RequestDeadlines.httpError(canceled, tracker).status_code == 503
+
+
+def testDisconnectCancelsQueries():
+  """
+  Test that the middleware cancels the queries of a request whose client
+  disconnects while the route runs, without the route reading the messages.
+  """
+  connection = MagicMock(spec=["cancel"])
+
+  async def app(scope, receive, send):
+    scope["state"][TRACKER_KEY].track(connection)
+    while not connection.cancel.called:
+      await asyncio.sleep(0.01)
+
+  async def receive():
+    return {"type": "http.disconnect"}
+
+  async def send(message):
+    pass
+
+  scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+  asyncio.run(
+      asyncio.wait_for(DeadlineMiddleware(app)(scope, receive, send), 5))
+
+  connection.cancel.assert_called_once()
+  assert scope["state"][TRACKER_KEY].disconnected
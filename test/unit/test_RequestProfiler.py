@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_RequestProfiler.py
+Description: This script tests the RequestProfiler of the car sharing API. It
+ checks how requests are selected and that captures stay under the disk cap.
+"""
+
+### Imports ###
+import os
+import threading
+import time
+from collections import Counter
+from unittest.mock import Mock
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.testclient import TestClient
+from core.requestProfiler import RequestProfiler, ProfiledRoute
+
+
+def makeProfiler(directory, **overrides) -> RequestProfiler:
+  """
+  Build an enabled profiler writing to `directory`.
+  """
+  settings = {
+      "enabled": True,
+      "token": "secret",
+      "sampleRate": 0.0,
+      "directory": str(directory),
+      "maxBytes": 1000,
+      "maxConcurrent": 1,
+      "interval": 0.001
+  }
+  settings.update(overrides)
+  return RequestProfiler(**settings)
+
+
+def makeRequest(headers: dict) -> Mock:
+  """
+  Build a request to GET /api/cars routed to getCars.
+  """
+  request = Mock(headers=headers, method="GET")
+  request.scope = {"route": Mock()}
+  request.scope["route"].name = "getCars"
+  return request
+
+
+def testSelection(tmp_path):
+  """
+  Test that only the token header selects a request when sampling is off.
+  """
+  profiler = makeProfiler(tmp_path)
+  assert profiler.wants(makeRequest({"X-Profile": "secret"}))
+  assert not profiler.wants(makeRequest({"X-Profile": "guess"}))
+  assert not profiler.wants(makeRequest({}))
+  assert not makeProfiler(tmp_path, enabled=False).wants(
+      makeRequest({"X-Profile": "secret"}))
+
+
+def testDiskCap(tmp_path):
+  """
+  Test that the oldest captures are evicted to stay under the disk cap.
+  """
+  profiler = makeProfiler(tmp_path, maxBytes=250)
+  stacks = Counter({"main;getCars;exec": 40})
+  names = [profiler.write(makeRequest({}), stacks, 12.0) for _ in range(20)]
+
+  assert all("_GET_getCars_12ms_" in name for name in names)
+  sizes = [entry.stat().st_size for entry in os.scandir(tmp_path)]
+  assert sum(sizes) <= 250
+  assert names[-1] in os.listdir(tmp_path)
+
+
+def spin(seconds: float):
+  """
+  Keep a thread busy for a while.
+  """
+  end = time.monotonic() + seconds
+  while time.monotonic() < end:
+    pass
+
+
+def testOnlyTheRequestThreadIsSampled(tmp_path):
+  """
+  Test that a capture holds the stacks of its route, and not those of the
+  other busy threads.
+  """
+  profiler = makeProfiler(tmp_path, maxBytes=100000)
+  router = APIRouter(route_class=ProfiledRoute)
+
+  @router.get("/busy")
+  def busyRoute():
+    spin(0.2)
+    return {}
+
+  app = FastAPI()
+  app.include_router(router)
+
+  @app.middleware("http")
+  async def profilerMiddleware(request: Request, callNext):
+    return await profiler(request, callNext)
+
+  def otherWork():
+    spin(0.4)
+
+  other = threading.Thread(target=otherWork)
+  other.start()
+  response = TestClient(app).get("/busy", headers={"X-Profile": "secret"})
+  other.join()
+
+  with open(tmp_path / response.headers["X-Profile-File"]) as file:
+    profile = file.read()
+  assert "busyRoute" in profile
+  assert "otherWork" not in profile
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_Server.py
+Description: This script tests the production server options of the car sharing
+ API.
+"""
+
+### Imports ###
+import uvicorn
+from core.config import Config
+from core.server import workerCount, uvicornOptions, gunicornOptions, cpuCount
+
+
+def testServerOptionsFollowConfig(monkeypatch):
+  """
+  Test that the worker count defaults to the cores and that the options are
+  accepted by Uvicorn.
+  """
+  monkeypatch.setenv("SERVER_MAX_REQUESTS", "5000")
+  monkeypatch.setenv("SERVER_MAX_REQUESTS_JITTER", "500")
+  monkeypatch.delenv("SERVER_WORKERS", raising=False)
+  config = Config()
+
+  assert workerCount(config) == cpuCount()
+  options = uvicornOptions(config)
+  assert options["limit_max_requests"] == 5000
+  assert options["limit_max_requests_jitter"] == 500
+  uvicorn.Config("main:app", **options)
+
+  monkeypatch.setenv("SERVER_WORKERS", "3")
+  monkeypatch.setenv("SERVER_PRELOAD", "true")
+  config = Config()
+  assert workerCount(config) == 3
+  assert gunicornOptions(config)["preload_app"] is True
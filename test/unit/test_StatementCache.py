@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_StatementCache.py
+Description: This script tests the statements built once by the car sharing
+ API, and the compiled statement cache statistics.
+"""
+
+### Imports ###
+from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy.pool import StaticPool
+from models import Car
+from core.statementCache import StatementCache
+from routers.cars import carListStatement
+
+
+def testCarListStatementIsBuiltOnce():
+  """
+  Test that the car listing is built once per combination of filters, with
+  the filter values left as bound parameters.
+  """
+  statement = carListStatement(("size", "doors"))
+
+  assert carListStatement(("size", "doors")) is statement
+  assert carListStatement(("size",)) is not statement
+  assert "car.size = :size AND car.doors = :doors" in str(statement)
+
+
+def testCacheHitsAreCounted():
+  """
+  Test that a prebuilt statement is compiled on its first run only, and that
+  driver-level SQL is counted apart.
+  """
+  engine = create_engine("sqlite://", poolclass=StaticPool)
+  SQLModel.metadata.create_all(engine)
+  statementCache = StatementCache(engine)
+
+  with Session(engine) as session:
+    session.add(Car(size="s", doors=5))
+    session.commit()
+    for size in ("s", "m", "s"):
+      session.exec(carListStatement(("size",)), params={"size": size}).all()
+    session.connection().exec_driver_sql("SELECT 1")
+
+  metrics = statementCache.metrics()
+  assert metrics["misses"] == 2  # the INSERT and the listing
+  assert metrics["hits"] == 2
+  assert metrics["hitRatio"] == 0.5
+  assert metrics["raw"] >= 1
+  assert metrics["driver"] == "pysqlite"
+  assert metrics["prepareThreshold"] is None
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_SyntheticData.py
+Description: This script tests the synthetic data generator and the COPY
+ encoding of the data loader of the car sharing API.
+"""
+
+### Imports ###
+from utils.syntheticData import generateCars
+from utils.dataLoader import copyText, splitChunk
+
+
+def testGeneratedCarsMatchModels():
+  """
+  Test that generated cars are reproducible and shaped like the Car and Trip
+  models, with increasing odometers.
+  """
+  cars = list(generateCars(50, trips="uniform:1-4", seed=7, startId=10))
+
+  assert cars == list(generateCars(50, trips="uniform:1-4", seed=7, startId=10))
+  assert [car["id"] for car in cars] == list(range(10, 60))
+  assert all(1 <= len(car["trips"]) <= 4 for car in cars)
+  for car in cars:
+    assert set(car) == {"id", "size", "fuel", "doors", "transmission", "trips"}
+    for trip in car["trips"]:
+      assert trip["start"] < trip["end"]
+
+
+def testCopyEncoding():
+  """
+  Test that trip rows reference their car and that COPY text is escaped.
+  """
+  carRows, tripRows = splitChunk([{
+      "id": 3,
+      "size": None,
+      "trips": [{
+          "start": 0,
+          "end": 5,
+          "description": "tab\there"
+      }]
+  }])
+
+  assert carRows == [(3, None, None, None, None)]
+  assert tripRows == [(0, 5, "tab\there", 3)]
+  assert copyText(tripRows) == "0\t5\ttab\\there\t3\n"
+  assert copyText(carRows) == "3\t\\N\t\\N\t\\N\t\\N\n"
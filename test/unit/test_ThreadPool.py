@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_ThreadPool.py
+Description: This script tests the sizing and saturation metrics of the worker
+ threads running the sync routes of the car sharing API.
+"""
+
+### Imports ###
+import asyncio
+import threading
+from unittest.mock import MagicMock
+from anyio import to_thread
+from core.threadPool import ThreadPool
+
+
+def makeEngine() -> MagicMock:
+  """
+  Build an engine with a pool of 5 connections plus 10 of overflow.
+  """
+  engine = MagicMock()
+  engine.pool.size.return_value = 5
+  engine.pool._max_overflow = 10
+  return engine
+
+
+def testCapacityFollowsPool():
+  """
+  Test that the thread count defaults to the pool connections plus headroom,
+  and that an explicit size wins.
+  """
+  assert ThreadPool(makeEngine(), None, 3, 0).capacity() == 18
+  assert ThreadPool(makeEngine(), 8, 3, 0).capacity() == 8
+
+
+def testStartResizesLimiter():
+  """
+  Test that start resizes the thread limiter of the running event loop.
+  """
+
+  async def run():
+    threadPool = ThreadPool(makeEngine(), None, 3, 0)
+    await threadPool.start()
+    return to_thread.current_default_thread_limiter().total_tokens
+
+  assert asyncio.run(run()) == 18
+
+
+def testProbeMeasuresSaturation():
+  """
+  Test that a probe made while every thread is busy waits for one, and that
+  the metrics report the busy threads and the waiting calls.
+  """
+
+  async def run():
+    threadPool = ThreadPool(makeEngine(), 1, 0, 0)
+    await threadPool.start()
+    release = threading.Event()
+    blocked = asyncio.create_task(to_thread.run_sync(release.wait))
+    await asyncio.sleep(0.05)
+    probe = asyncio.create_task(threadPool.probe())
+    await asyncio.sleep(0.05)
+    saturated = threadPool.metrics()
+    release.set()
+    await blocked
+    waitMs = await probe
+    return saturated, waitMs, threadPool.metrics()
+
+  saturated, waitMs, metrics = asyncio.run(run())
+
+  assert saturated["size"] == 1
+  assert saturated["busy"] == 1 and saturated["waiting"] == 1
+  assert waitMs >= 40
+  assert metrics["probes"] == 1 and metrics["maxWaitMs"] == waitMs
+  assert metrics["busy"] == 0 and metrics["waiting"] == 0
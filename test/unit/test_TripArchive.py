@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_TripArchive.py
+Description: This script tests the cold trip archive of the car sharing API.
+ It checks that archived trips are read back per car through the offset
+ index, merged with the trips of the table, and moved out of the table.
+"""
+
+### Imports ###
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy.pool import StaticPool
+from models import Car, Trip
+from core.tripArchive import TripArchive
+
+
+def makeTrips(carId: int, ids) -> list[dict]:
+  """
+  Build trips of a car as stored in the segments.
+  """
+  return [{
+      "id": id,
+      "start": id,
+      "end": id + 1,
+      "description": f"Trip {id}",
+      "carId": carId
+  } for id in ids]
+
+
+def testSegmentsAreReadPerCar(tmp_path):
+  """
+  Test that each car's trips are read back from its own gzip member, across
+  segments, in ID order.
+  """
+  tripArchive = TripArchive(str(tmp_path))
+  first = tripArchive.writeSegment("a.ndjson.gz",
+                                   makeTrips(1, [1, 2]) + makeTrips(2, [3]))
+  second = tripArchive.writeSegment("b.ndjson.gz", makeTrips(1, [4]))
+  tripArchive._writeIndex({1: [first[1], second[1]], 2: [first[2]]})
+
+  assert first[2][1] == first[1][2]
+  assert [trip["id"] for trip in tripArchive.read(1)] == [1, 2, 4]
+  assert tripArchive.read(2) == makeTrips(2, [3])
+  assert tripArchive.read(3) == []
+  assert tripArchive.count(1) == 3
+
+
+def testMergeWithTableTrips(tmp_path):
+  """
+  Test that archived trips are merged in order and under the limit, that
+  copies of table trips are skipped, and that the segments are not read when
+  the newest trips of the table fill the limit.
+  """
+  tripArchive = TripArchive(str(tmp_path))
+  entries = tripArchive.writeSegment("a.ndjson.gz", makeTrips(1, [1, 2, 3]))
+  tripArchive._writeIndex({1: [entries[1]]})
+  tableTrips = [{"id": 4}, {"id": 3}]
+
+  oldest = tripArchive.merge({1: (tableTrips, 2)}, [1, 2], ["id"], 3, False)
+  assert oldest == {1: ([{"id": 1}, {"id": 2}, {"id": 3}], 4)}
+
+  tripArchive.read = None
+  newest = tripArchive.merge({1: (tableTrips, 2)}, [1], ["id"], 2, True)
+  assert newest == {1: (tableTrips, 5)}
+
+
+def testArchiveMovesColdTrips(tmp_path):
+  """
+  Test that the job moves the trips beyond the newest of each car, and below
+  the watermark, out of the table and into the archive.
+  """
+  engine = create_engine("sqlite://", poolclass=StaticPool)
+  SQLModel.metadata.create_all(engine)
+  tripArchive = TripArchive(str(tmp_path))
+  with Session(engine) as session:
+    session.add_all([Car(id=1), Car(id=2)])
+    session.add_all(
+        Trip(**trip) for trip in makeTrips(2, [1, 2]) +
+        makeTrips(1, range(3, 8)))
+    session.commit()
+
+    assert tripArchive.archive(session, keepNewest=0) == 0
+    archived = tripArchive.archive(session,
+                                   keepNewest=2,
+                                   beforeId=2,
+                                   batchSize=2)
+    tableIds = session.exec(select(Trip.id).order_by(Trip.id)).all()
+
+  assert archived == 4
+  assert tableIds == [2, 6, 7]
+  assert [trip["id"] for trip in tripArchive.read(1)] == [3, 4, 5]
+  assert [trip["id"] for trip in tripArchive.read(2)] == [1]
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_TripQueue.py
+Description: This script tests the TripQueue write-behind queue of the car
+ sharing API. It checks that trips are written in batches, that a full queue
+ refuses trips, that stopping the queue drains it and that only the trips the
+ database rejects are dropped.
+"""
+
+### Imports ###
+from unittest.mock import Mock
+from sqlalchemy.exc import IntegrityError, OperationalError
+from core.tripQueue import TripQueue
+
+
+def testBatchesAndDrain():
+  """
+  Test that queued trips are written in batches and drained on stop.
+  """
+  tripQueue = TripQueue(Mock(), maxSize=10, batchSize=4, flushInterval=60)
+  batches = []
+  tripQueue._insert = lambda trips: batches.append(trips) or [
+      {**trip, "id": i} for i, trip in enumerate(trips)
+  ]
+
+  assert not tripQueue.put({"carId": 1})
+  tripQueue.start()
+  for end in range(6):
+    assert tripQueue.put({"start": 0, "end": end, "carId": 1})
+  # The long flush interval means only a full batch or the drain flushes
+  tripQueue.stop()
+
+  assert [len(batch) for batch in batches] == [4, 2]
+  metrics = tripQueue.metrics()
+  assert metrics["flushed"] == 6
+  assert metrics["depth"] == 0
+  assert not metrics["running"]
+
+
+def testFullQueueRejects():
+  """
+  Test that a full queue refuses new trips instead of blocking.
+  """
+  tripQueue = TripQueue(Mock(), maxSize=1, batchSize=1, flushInterval=60)
+  tripQueue._stopping.clear()
+  tripQueue._thread = Mock()
+
+  assert tripQueue.put({"carId": 1})
+  assert not tripQueue.put({"carId": 1})
+  assert tripQueue.metrics()["rejected"] == 1
+
+
+def testTransientErrorsAreRetried():
+  """
+  Test that a batch failing on the connection is retried, not dropped, and
+  that only a trip rejected by the database is dropped.
+  """
+  tripQueue = TripQueue(Mock(),
+                        maxSize=10,
+                        batchSize=10,
+                        flushInterval=60,
+                        retryDelay=0)
+  failures = [OperationalError("INSERT", {}, Exception("connection lost"))]
+
+  def insert(trips):
+    if failures:
+      raise failures.pop()
+    if any(trip["carId"] == 0 for trip in trips):
+      raise IntegrityError("INSERT", {}, Exception("unknown carId"))
+    return [{**trip, "id": trip["end"]} for trip in trips]
+
+  tripQueue._insert = insert
+  tripQueue._flush([{"end": end, "carId": end % 3} for end in range(6)])
+
+  metrics = tripQueue.metrics()
+  assert metrics["retries"] == 1
+  assert metrics["flushed"] == 4
+  assert metrics["failed"] == 2
+
+
+def testStoppingQueueRefuses():
+  """
+  Test that the queue refuses trips as soon as it starts stopping.
+  """
+  tripQueue = TripQueue(Mock(), maxSize=10, batchSize=10, flushInterval=60)
+  tripQueue._insert = lambda trips: []
+  tripQueue.start()
+  tripQueue._stopping.set()
+
+  assert not tripQueue.put({"carId": 1})
+  tripQueue.stop()
+  assert tripQueue.metrics()["enqueued"] == 0
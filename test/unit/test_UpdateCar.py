@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_UpdateCar.py
+Description: This script tests the updateCar, patchCar and deleteCar functions
+ of the car sharing API. It checks that each mutation is a single statement
+ and that a missing car is reported from the returned rows.
+"""
+
+### Imports ###
+import pytest
+from unittest.mock import Mock
+from fastapi import HTTPException
+from routers.cars import patchCar, deleteCar
+from schemas import CarSchema
+from core.changeFeed import changeFeed
+
+
+def testPatchWritesOnlyChangedColumns():
+  """
+  Test that patchCar sends one UPDATE holding only the fields in the body.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.one_or_none.return_value._asdict.return_value = {
+      "id": 1,
+      "size": "l"
+  }
+
+  result = patchCar(CarSchema(size="l"), 1, mockSession)
+
+  query = str(mockSession.exec.call_args.args[0])
+  assert query.startswith("UPDATE car SET size=")
+  assert "fuel" not in query.split("RETURNING")[0]
+  assert "RETURNING" in query
+  mockSession.commit.assert_called_once()
+  assert result.message.size == "l"
+
+
+def testDeleteMissingCar():
+  """
+  Test that deleteCar answers 404 when no row is returned, without committing.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.one_or_none.return_value = None
+
+  with pytest.raises(HTTPException) as error:
+    deleteCar(99, mockSession)
+
+  assert error.value.status_code == 404
+  assert "DELETE FROM trip" in str(mockSession.exec.call_args.args[0])
+  mockSession.commit.assert_not_called()
+
+
+def testDeletedCarIsPublished():
+  """
+  Test that a committed delete reaches the change feed.
+  """
+  mockSession = Mock()
+  mockSession.exec.return_value.one_or_none.return_value._asdict.return_value = {
+      "id": 5,
+      "size": "s"
+  }
+  lastSeq = changeFeed.lastSeq
+
+  result = deleteCar(5, mockSession)
+
+  mockSession.commit.assert_called_once()
+  assert result.code == 200
+  events, _ = changeFeed.since(lastSeq)
+  assert [(event["action"], event["id"]) for event in events] == [("deleted",
+                                                                  5)]
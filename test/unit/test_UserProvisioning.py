@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: test_UserProvisioning.py
+Description: This script tests the bulk user provisioning of the car sharing
+ API. It checks that duplicate usernames are reported without aborting the
+ batch and that their passwords are not hashed.
+"""
+
+### Imports ###
+from unittest.mock import Mock, patch
+from core.userProvisioning import provisionBatch
+from schemas import UserSchema
+
+
+def testDuplicatesAreReported():
+  """
+  Test that repeated and existing usernames are skipped and reported.
+  """
+  mockSession = Mock()
+  # First the lookup of existing usernames, then the INSERT ... RETURNING
+  mockSession.exec.return_value.all.return_value = ["taken"]
+  mockSession.exec.return_value.scalars.return_value.all.return_value = [
+      "new1", "new2"
+  ]
+  users = [
+      UserSchema(username="new1", password="a"),
+      UserSchema(username="taken", password="b"),
+      UserSchema(username="new2", password="c"),
+      UserSchema(username="new1", password="d"),
+  ]
+
+  with patch("core.userProvisioning.hashPasswords",
+             side_effect=lambda passwords, workers: passwords) as hashMock:
+    created, duplicates = provisionBatch(mockSession, users)
+
+  assert created == 2
+  assert sorted(duplicates) == ["new1", "taken"]
+  # Only the new users' passwords are hashed
+  assert hashMock.call_args.args[0] == ["a", "c"]
+  insertQuery = str(mockSession.exec.call_args.args[0])
+  assert "ON CONFLICT" in insertQuery
+  mockSession.commit.assert_called_once()
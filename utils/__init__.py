@@ -2,7 +2,8 @@
 """
 Package Name: utils
 Description: This package contains utility modules for the car sharing service,
- including query and path parameters for API documentation.
+ including query and path parameters for API documentation and password
+ hashing.
 Author: MathTeixeira
 Date: July 6, 2024
 Version: 4.0.0
@@ -11,3 +12,5 @@ Contact Information: mathteixeira55
 """
 
 from .docDetails import *
+from .passwordHashing import (hashPassword, hashPasswords, verifyPassword,
+                              shutdownHashingPool)
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: dataLoader.py
+Description: This script loads NDJSON cars and trips, as produced by
+ utils.syntheticData, into the database. On PostgreSQL the rows are streamed
+ with COPY, chunk by chunk; other databases fall back to batched inserts:
+   python -m utils.dataLoader data/synthetic.ndjson --chunk-size 20000
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import argparse
+import io
+import json
+import sys
+import time
+from typing import Iterable, Iterator
+from sqlalchemy import Engine
+from sqlmodel import SQLModel, Session, create_engine, insert
+
+CAR_COLUMNS = ("id", "size", "fuel", "doors", "transmission")
+TRIP_COLUMNS = ("start", "end", "description", "carId")
+# Characters that must be escaped in COPY text format
+COPY_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r"
+})
+
+
+def readCars(path: str) -> Iterator[dict]:
+  """
+  Read cars, one JSON object per line.
+
+  Args:
+    path (str): The NDJSON file path, - for stdin.
+
+  Yields:
+    dict: The next car, with its trips.
+  """
+  file = sys.stdin if path == "-" else open(path)
+  try:
+    for line in file:
+      if line.strip():
+        yield json.loads(line)
+  finally:
+    if file is not sys.stdin:
+      file.close()
+
+
+def chunked(cars: Iterable[dict], chunkSize: int) -> Iterator[list[dict]]:
+  """
+  Split cars into lists of at most `chunkSize` cars.
+
+  Args:
+    cars (Iterable[dict]): The cars to split.
+    chunkSize (int): The maximum number of cars per chunk.
+
+  Yields:
+    list[dict]: The next chunk.
+  """
+  chunk = []
+  for car in cars:
+    chunk.append(car)
+    if len(chunk) == chunkSize:
+      yield chunk
+      chunk = []
+  if chunk:
+    yield chunk
+
+
+def copyText(rows: Iterable[tuple]) -> str:
+  """
+  Encode rows in PostgreSQL COPY text format.
+
+  Args:
+    rows (Iterable[tuple]): The rows to encode.
+
+  Returns:
+    str: The tab-separated rows, with None as \\N.
+  """
+  return "".join("\t".join("\\N" if value is None else str(value).translate(
+      COPY_ESCAPES) for value in row) + "\n" for row in rows)
+
+
+def splitChunk(chunk: list[dict]) -> tuple[list[tuple], list[tuple]]:
+  """
+  Split a chunk of cars into car rows and trip rows.
+
+  Args:
+    chunk (list[dict]): The cars, with their trips.
+
+  Returns:
+    tuple[list[tuple], list[tuple]]: The car rows and the trip rows.
+  """
+  carRows = [tuple(car.get(column) for column in CAR_COLUMNS) for car in chunk]
+  tripRows = [(trip["start"], trip["end"], trip["description"], car["id"])
+              for car in chunk
+              for trip in car.get("trips", [])]
+  return carRows, tripRows
+
+
+def copyRows(cursor, table: str, columns: tuple, rows: list[tuple]):
+  """
+  Stream rows into a table with COPY, with either psycopg or psycopg2.
+
+  Args:
+    cursor (Cursor): The DBAPI cursor.
+    table (str): The table name.
+    columns (tuple): The column names.
+    rows (list[tuple]): The rows to copy.
+  """
+  if not rows:
+    return
+  quotedColumns = ", ".join(f'"{column}"' for column in columns)
+  query = f'COPY "{table}" ({quotedColumns}) FROM STDIN'
+  data = copyText(rows)
+  if hasattr(cursor, "copy"):
+    # psycopg 3
+    with cursor.copy(query) as copy:
+      copy.write(data)
+  else:
+    # psycopg2
+    cursor.copy_expert(query, io.StringIO(data))
+
+
+def loadPostgres(engine: Engine, cars: Iterable[dict],
+                 chunkSize: int) -> tuple[int, int]:
+  """
+  Load cars and trips with COPY, committing each chunk.
+
+  Args:
+    engine (Engine): The PostgreSQL engine.
+    cars (Iterable[dict]): The cars, with their trips.
+    chunkSize (int): The number of cars per COPY.
+
+  Returns:
+    tuple[int, int]: The number of loaded cars and trips.
+  """
+  from schemas.carSchema import CAR_VALUES
+  from models.carCodeModel import encodeCarValue
+
+  carCount = tripCount = 0
+  connection = engine.raw_connection()
+  try:
+    cursor = connection.cursor()
+    for chunk in chunked(cars, chunkSize):
+      carRows, tripRows = splitChunk(chunk)
+      # COPY bypasses the column types, so the enumerated columns are encoded
+      # here
+      carRows = [
+          tuple(
+              encodeCarValue(column, value) if column in CAR_VALUES else value
+              for column, value in zip(CAR_COLUMNS, row))
+          for row in carRows
+      ]
+      copyRows(cursor, "car", CAR_COLUMNS, carRows)
+      copyRows(cursor, "trip", TRIP_COLUMNS, tripRows)
+      connection.commit()
+      carCount += len(carRows)
+      tripCount += len(tripRows)
+    # The IDs were given explicitly, so move the sequence past them, and
+    # refresh the planner statistics for the new volume
+    cursor.execute("SELECT setval(pg_get_serial_sequence('car', 'id'), "
+                   "(SELECT coalesce(max(id), 1) FROM car))")
+    cursor.execute("ANALYZE car")
+    cursor.execute("ANALYZE trip")
+    connection.commit()
+  finally:
+    connection.close()
+  return carCount, tripCount
+
+
+def loadBatched(engine: Engine, cars: Iterable[dict],
+                chunkSize: int) -> tuple[int, int]:
+  """
+  Load cars and trips with batched multi-row inserts, committing each chunk.
+
+  Args:
+    engine (Engine): The engine of a database without COPY.
+    cars (Iterable[dict]): The cars, with their trips.
+    chunkSize (int): The number of cars per batch.
+
+  Returns:
+    tuple[int, int]: The number of loaded cars and trips.
+  """
+  from models import Car, Trip
+
+  carCount = tripCount = 0
+  with Session(engine) as session:
+    for chunk in chunked(cars, chunkSize):
+      carRows, tripRows = splitChunk(chunk)
+      session.exec(insert(Car),
+                   params=[dict(zip(CAR_COLUMNS, row)) for row in carRows])
+      if tripRows:
+        session.exec(
+            insert(Trip),
+            params=[dict(zip(TRIP_COLUMNS, row)) for row in tripRows])
+      session.commit()
+      carCount += len(carRows)
+      tripCount += len(tripRows)
+  return carCount, tripCount
+
+
+def loadCars(engine: Engine, cars: Iterable[dict],
+             chunkSize: int) -> tuple[int, int]:
+  """
+  Load cars and trips with the fastest method the database supports.
+
+  Args:
+    engine (Engine): The database engine.
+    cars (Iterable[dict]): The cars, with their trips.
+    chunkSize (int): The number of cars per chunk.
+
+  Returns:
+    tuple[int, int]: The number of loaded cars and trips.
+  """
+  SQLModel.metadata.create_all(engine)
+  if engine.dialect.name == "postgresql":
+    return loadPostgres(engine, cars, chunkSize)
+  return loadBatched(engine, cars, chunkSize)
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="Load NDJSON cars and trips into the database")
+  parser.add_argument("path", help="NDJSON file, - for stdin")
+  parser.add_argument("--url",
+                      default=None,
+                      help="Database URL (defaults to the configured one)")
+  parser.add_argument("--chunk-size", type=int, default=20000)
+  args = parser.parse_args()
+
+  # The schemas must be imported before the models they are used by
+  import schemas
+  if args.url:
+    engine = create_engine(args.url)
+  else:
+    from core.database import carsDb
+    engine = carsDb.engine
+
+  start = time.perf_counter()
+  carCount, tripCount = loadCars(engine, readCars(args.path), args.chunk_size)
+  seconds = time.perf_counter() - start
+  print(
+      json.dumps({
+          "cars": carCount,
+          "trips": tripCount,
+          "seconds": round(seconds, 3),
+          "rowsPerSecond": round((carCount + tripCount) / seconds)
+      }))
+
+
+if __name__ == "__main__":
+  main()
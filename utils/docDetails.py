@@ -10,6 +10,7 @@ License: MIT License
 Contact Information: mathteixeira55
 """
 
+from typing import Literal
 from fastapi import Query, Path
 
 ### Query Parameters ###
@@ -31,6 +32,22 @@ doorsQuery: int | None = Query(
         "value": 5
     }})
 
+fuelQuery: str | None = Query(
+    None,
+    description="Filter cars by fuel type (gasoline, diesel, electric, hybrid)",
+    openapi_examples={"gasoline": {
+        "summary": "Gasoline car",
+        "value": "gasoline"
+    }})
+
+transmissionQuery: str | None = Query(
+    None,
+    description="Filter cars by transmission (manual, automatic)",
+    openapi_examples={"automatic": {
+        "summary": "Automatic transmission",
+        "value": "automatic"
+    }})
+
 tripQuery: bool = Query(False,
                         description="include trips in the response",
                         openapi_examples={
@@ -40,6 +57,119 @@ tripQuery: bool = Query(False,
                             }
                         })
 
+idsQuery: list[int] | None = Query(
+    None,
+    description="Filter cars by ID (repeat the parameter for several IDs)",
+    openapi_examples={"IDs 1 and 2": {
+        "summary": "IDs 1 and 2",
+        "value": [1, 2]
+    }})
+
+dryRunQuery: bool = Query(
+    False,
+    description="Only count the matching cars, without modifying them",
+    openapi_examples={"Dry run": {
+        "summary": "Dry run",
+        "value": True
+    }})
+
+fieldsQuery: str | None = Query(
+    None,
+    description="Comma-separated car columns to return, with trips.<column> "
+    "for trip columns, or trips for every trip column",
+    openapi_examples={
+        "ID and size": {
+            "summary": "ID and size",
+            "value": "id,size"
+        },
+        "With trip distances": {
+            "summary": "With trip distances",
+            "value": "id,trips.start,trips.end"
+        }
+    })
+
+sortQuery: str | None = Query(
+    None,
+    description="Sort cars by id, size, doors, fuel or transmission, prefixed "
+    "with - for descending order (ties are broken by ID)",
+    openapi_examples={
+        "Most doors first": {
+            "summary": "Most doors first",
+            "value": "-doors"
+        }
+    })
+
+limitQuery: int | None = Query(
+    None,
+    ge=1,
+    description="Maximum number of cars per page (all cars when not given)",
+    openapi_examples={"Page of 50": {
+        "summary": "Page of 50",
+        "value": 50
+    }})
+
+cursorQuery: str | None = Query(
+    None,
+    description="Return the page after this cursor, read from the "
+    "X-Next-Cursor header of the previous page")
+
+totalQuery: Literal["exact", "estimate", "cached", "none"] | None = Query(
+    None,
+    description="How the X-Total-Count header of paginated listings is "
+    "computed: exact COUNT(*), planner estimate, cached count kept up to date "
+    "on creates and deletes, or none (defaults to the configured mode)",
+    openapi_examples={"Planner estimate": {
+        "summary": "Planner estimate",
+        "value": "estimate"
+    }})
+
+tripLimitQuery: int | None = Query(
+    None,
+    ge=1,
+    description="Maximum number of trips returned per car (defaults to the "
+    "configured limit)",
+    openapi_examples={"Last 10 trips": {
+        "summary": "Last 10 trips",
+        "value": 10
+    }})
+
+tripOrderQuery: Literal["newest", "oldest"] | None = Query(
+    None,
+    description="Which trips of each car come first, and are kept by "
+    "tripLimit (defaults to newest)",
+    openapi_examples={"Newest first": {
+        "summary": "Newest first",
+        "value": "newest"
+    }})
+
+archivedQuery: bool = Query(
+    False,
+    description="Include the trips moved to the archive, read from its "
+    "segment files",
+    openapi_examples={"Whole history": {
+        "summary": "Whole history",
+        "value": True
+    }})
+
+fieldsArchivedQuery: bool = Query(
+    False,
+    description="Include the trips moved to the archive, read from its "
+    "segment files; only with fields selecting trip columns, as the car is "
+    "returned without its trips otherwise",
+    openapi_examples={"Whole history": {
+        "summary": "Whole history",
+        "value": True
+    }})
+
+batchIdsQuery: list[int] = Query(
+    ...,
+    description="IDs of the cars to return, in the order wanted (repeat the "
+    "parameter for several IDs)",
+    openapi_examples={"IDs 3, 1 and 2": {
+        "summary": "IDs 3, 1 and 2",
+        "value": [3, 1, 2]
+    }})
+
 ### Path Parameters ###
 # Path is used to define path parameters for the API endpoints.
 idPath: int = Path(
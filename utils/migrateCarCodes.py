@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: migrateCarCodes.py
+Description: This script converts the size, fuel and transmission columns of
+ an existing PostgreSQL car table from free-form text to the SMALLINT codes of
+ CarCodeType, fixing the known alternative spellings on the way, and reports
+ the table and index sizes before and after:
+   python -m utils.migrateCarCodes --dry-run
+   python -m utils.migrateCarCodes
+ The conversion rewrites the table under an exclusive lock, so it is meant to
+ run during a maintenance window. Running it again only refreshes the lookup
+ table and the CHECK constraints.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import argparse
+import json
+import sys
+from sqlalchemy import Connection, Engine, text
+from sqlalchemy.dialects.postgresql import insert
+
+# The schemas must be imported before the models they are used by
+from schemas.carSchema import CAR_VALUES, CAR_ALIASES
+from models.carCodeModel import (CarCode, UNKNOWN_CODE, carCodeRows,
+                                 encodeCarValue)
+
+
+def measureCars(connection: Connection) -> dict:
+  """
+  Measure the storage of the car table.
+
+  Args:
+    connection (Connection): The PostgreSQL connection.
+
+  Returns:
+    dict: The table and index sizes in bytes, the size of each index, and the
+      average bytes per row of each enumerated column.
+  """
+  tableBytes, indexBytes = connection.execute(
+      text("SELECT pg_table_size('car'), pg_indexes_size('car')")).one()
+  indexes = dict(
+      connection.execute(
+          text("SELECT indexname, "
+               "pg_relation_size(quote_ident(indexname)::regclass) "
+               "FROM pg_indexes WHERE tablename = 'car' ORDER BY indexname")))
+  widths = connection.execute(
+      text("SELECT " + ", ".join(f"avg(pg_column_size({column}))"
+                                 for column in CAR_VALUES) +
+           " FROM car")).one()
+  return {
+      "tableBytes": tableBytes,
+      "indexBytes": indexBytes,
+      "indexes": indexes,
+      "columnBytes": {
+          column: round(float(width or 0), 2)
+          for column, width in zip(CAR_VALUES, widths)
+      }
+  }
+
+
+def textColumns(connection: Connection) -> list[str]:
+  """
+  Find the enumerated columns still stored as text.
+
+  Args:
+    connection (Connection): The PostgreSQL connection.
+
+  Returns:
+    list[str]: The columns to convert.
+  """
+  types = dict(
+      connection.execute(
+          text("SELECT column_name, data_type FROM information_schema.columns "
+               "WHERE table_name = 'car'")))
+  return [column for column in CAR_VALUES if types.get(column) != "smallint"]
+
+
+def unknownValues(connection: Connection, columns: list[str]) -> dict:
+  """
+  Find the stored values that no code stands for, even after fixing their
+  spelling.
+
+  Args:
+    connection (Connection): The PostgreSQL connection.
+    columns (list[str]): The text columns to check.
+
+  Returns:
+    dict: The unknown values of each column that has some.
+  """
+  unknown = {}
+  for column in columns:
+    values = connection.execute(
+        text(f"SELECT DISTINCT {column} FROM car "
+             f"WHERE {column} IS NOT NULL")).scalars()
+    columnUnknown = sorted(value for value in values
+                           if encodeCarValue(column, value) == UNKNOWN_CODE)
+    if columnUnknown:
+      unknown[column] = columnUnknown
+  return unknown
+
+
+def codeCase(column: str) -> str:
+  """
+  Build the SQL expression converting a text column to its codes.
+
+  Args:
+    column (str): The column, a key of CAR_VALUES.
+
+  Returns:
+    str: A CASE over the normalized value, NULL for the unknown ones.
+  """
+  spellings = {value: value for value in CAR_VALUES[column]}
+  spellings.update(CAR_ALIASES[column])
+  branches = " ".join(
+      f"WHEN '{spelling}' THEN {encodeCarValue(column, value)}"
+      for spelling, value in spellings.items())
+  return f"CASE lower(btrim({column})) {branches} END"
+
+
+def migrate(connection: Connection, nullUnknown: bool = False) -> dict:
+  """
+  Convert the enumerated car columns to codes, and refresh the lookup table
+  and the CHECK constraints, in the connection's transaction.
+
+  Args:
+    connection (Connection): The PostgreSQL connection.
+    nullUnknown (bool): Whether the unknown values are replaced with NULL,
+      instead of stopping the migration.
+
+  Returns:
+    dict: The converted columns.
+
+  Raises:
+    ValueError: If some values are unknown and nullUnknown is not set.
+  """
+  columns = textColumns(connection)
+  unknown = unknownValues(connection, columns)
+  if unknown and not nullUnknown:
+    raise ValueError(f"Unknown values, fix them or use --null-unknown: "
+                     f"{json.dumps(unknown)}")
+
+  if columns:
+    # One statement, so the table and its indexes are rewritten once
+    connection.execute(
+        text("ALTER TABLE car " + ", ".join(
+            f"ALTER COLUMN {column} TYPE smallint USING {codeCase(column)}"
+            for column in columns)))
+  connection.execute(
+      text("ALTER TABLE car " + ", ".join(
+          f"DROP CONSTRAINT IF EXISTS ck_car_{column}_code, "
+          f"ADD CONSTRAINT ck_car_{column}_code "
+          f"CHECK ({column} BETWEEN 1 AND {len(values)})"
+          for column, values in CAR_VALUES.items())))
+
+  CarCode.__table__.create(connection, checkfirst=True)
+  # Values appended to CAR_VALUES since the table was created
+  connection.execute(
+      insert(CarCode.__table__).values(carCodeRows()).on_conflict_do_nothing())
+  if columns:
+    connection.execute(text("ANALYZE car"))
+  return {"columns": columns, "nulled": unknown}
+
+
+def reduction(before: int, after: int) -> float:
+  """
+  Compute the relative size reduction, in percent.
+  """
+  return round(100 * (before - after) / before, 1) if before else 0.0
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="Store the car size, fuel and transmission as codes")
+  parser.add_argument("--dry-run",
+                      action="store_true",
+                      help="Only measure the table and list unknown values")
+  parser.add_argument("--null-unknown",
+                      action="store_true",
+                      help="Replace the unknown values with NULL")
+  args = parser.parse_args()
+
+  from core.database import carsDb
+  engine: Engine = carsDb.engine
+  if engine.dialect.name != "postgresql":
+    sys.exit("The migration needs PostgreSQL")
+
+  with engine.begin() as connection:
+    before = measureCars(connection)
+    if args.dry_run:
+      columns = textColumns(connection)
+      print(
+          json.dumps({
+              "columns": columns,
+              "unknown": unknownValues(connection, columns),
+              "before": before
+          }))
+      return
+    try:
+      result = migrate(connection, args.null_unknown)
+    except ValueError as e:
+      sys.exit(str(e))
+  with engine.connect() as connection:
+    after = measureCars(connection)
+
+  print(
+      json.dumps({
+          **result, "before": before,
+          "after": after,
+          "reductionPercent": {
+              "table": reduction(before["tableBytes"], after["tableBytes"]),
+              "indexes": reduction(before["indexBytes"], after["indexBytes"]),
+              **{
+                  index: reduction(size, after["indexes"].get(index, 0))
+                  for index, size in before["indexes"].items()
+              }
+          }
+      }))
+
+
+if __name__ == "__main__":
+  main()
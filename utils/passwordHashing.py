@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: passwordHashing.py
+Description: This script provides password hashing for the car sharing service,
+ either one password at a time or spread over a pool of processes for bulk
+ user provisioning. It only depends on passlib, so the pool's worker processes
+ import it cheaply.
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from passlib.context import CryptContext
+
+# Building a CryptContext is not free, so one is shared by every hash
+passContext = CryptContext(schemes=["bcrypt"])
+
+# Pool reused by every bulk hashing call, created on first use
+_pool: ProcessPoolExecutor | None = None
+_poolWorkers = 0
+_poolLock = Lock()
+
+
+def hashPassword(password: str) -> str:
+  """
+  Hash a password with bcrypt.
+
+  Args:
+    password (str): The password to hash.
+
+  Returns:
+    str: The password hash.
+  """
+  return passContext.hash(password)
+
+
+def verifyPassword(password: str, passwordHash: str) -> bool:
+  """
+  Verify a password against a bcrypt hash.
+
+  Args:
+    password (str): The password to verify.
+    passwordHash (str): The stored hash.
+
+  Returns:
+    bool: True if the password matches the hash, False otherwise.
+  """
+  return passContext.verify(password, passwordHash)
+
+
+def hashPasswords(passwords: list[str], workers: int | None = None) -> list[str]:
+  """
+  Hash many passwords in parallel, using one process per usable core by
+  default. The server passes `config.PASSWORD_HASH_WORKERS`.
+
+  Args:
+    passwords (list[str]): The passwords to hash.
+    workers (int, optional): The number of processes of the pool.
+
+  Returns:
+    list[str]: The hashes, in the order of the passwords.
+  """
+  workers = workers or _usableCpus()
+  if workers == 1 or len(passwords) < 2:
+    return [hashPassword(password) for password in passwords]
+  pool = _getPool(workers)
+  chunkSize = max(1, len(passwords) // (workers * 4))
+  return list(pool.map(hashPassword, passwords, chunksize=chunkSize))
+
+
+def _usableCpus() -> int:
+  """
+  Get the number of cores this process may run on, which is lower than
+  os.cpu_count() when the process is pinned to some cores.
+
+  Returns:
+    int: The number of usable cores.
+  """
+  if hasattr(os, "sched_getaffinity"):
+    return len(os.sched_getaffinity(0)) or 1
+  return os.cpu_count() or 1
+
+
+def _getPool(workers: int) -> ProcessPoolExecutor:
+  """
+  Get the shared pool, creating it (or resizing it) with `workers` processes.
+
+  Args:
+    workers (int): The number of processes of the pool.
+
+  Returns:
+    ProcessPoolExecutor: The hashing pool.
+  """
+  global _pool, _poolWorkers
+  with _poolLock:
+    if _pool is not None and _poolWorkers != workers:
+      _pool.shutdown()
+      _pool = None
+    if _pool is None:
+      # Spawned workers do not inherit the server's threads and locks
+      _pool = ProcessPoolExecutor(
+          max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+      _poolWorkers = workers
+    return _pool
+
+
+def shutdownHashingPool():
+  """
+  Stop the processes of the hashing pool, if it was started.
+  """
+  global _pool
+  with _poolLock:
+    if _pool is not None:
+      _pool.shutdown()
+      _pool = None
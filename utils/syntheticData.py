@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+File Name: syntheticData.py
+Description: This script generates synthetic cars and trips for scale testing.
+ Cars are streamed as NDJSON, one car per line with its trips, in the same shape
+ as data/carsDb.json, so millions of rows never have to fit in memory:
+   python -m utils.syntheticData --cars 1000000 --trips exponential:20 \
+     --out data/synthetic.ndjson
+Author: MathTeixeira
+Date: July 6, 2024
+Version: 4.0.0
+License: MIT License
+Contact Information: mathteixeira55
+"""
+
+### Imports ###
+import argparse
+import json
+import random
+import sys
+from typing import Callable, Iterator
+
+# Values of each car column, with their relative frequencies
+SIZES = (("s", 3), ("m", 5), ("l", 2))
+FUELS = (("gasoline", 6), ("diesel", 2), ("electric", 2))
+DOORS = ((3, 2), (5, 8))
+TRANSMISSIONS = (("automatic", 7), ("manual", 3))
+DESCRIPTIONS = ("From home to work", "From work to home", "Grocery shopping",
+                "Airport drop-off", "Weekend trip", "Client visit")
+
+
+def tripCountSampler(spec: str, rng: random.Random) -> Callable[[], int]:
+  """
+  Build a sampler of trips per car from a distribution spec.
+
+  Supported specs are "fixed:N", "uniform:MIN-MAX" and "exponential:MEAN"; the
+  exponential one gives the long tail of a real fleet, where a few old cars
+  hold most of the trips.
+
+  Args:
+    spec (str): The distribution spec.
+    rng (random.Random): The random generator.
+
+  Returns:
+    Callable[[], int]: A function returning the trip count of the next car.
+
+  Raises:
+    ValueError: If the spec is not supported.
+  """
+  kind, _, value = spec.partition(":")
+  if kind == "fixed":
+    count = int(value)
+    return lambda: count
+  if kind == "uniform":
+    low, high = (int(bound) for bound in value.split("-"))
+    return lambda: rng.randint(low, high)
+  if kind == "exponential":
+    rate = 1 / float(value)
+    return lambda: int(rng.expovariate(rate))
+  raise ValueError(f"Unsupported trip distribution: {spec}")
+
+
+def weightedChoice(rng: random.Random, options: tuple) -> Callable[[], object]:
+  """
+  Build a sampler picking values by their relative frequencies.
+
+  Args:
+    rng (random.Random): The random generator.
+    options (tuple): The (value, weight) pairs.
+
+  Returns:
+    Callable[[], object]: A function returning the next value.
+  """
+  values = [value for value, _ in options]
+  weights = [weight for _, weight in options]
+  return lambda: rng.choices(values, weights)[0]
+
+
+def generateCars(count: int,
+                 trips: str = "exponential:10",
+                 seed: int | None = None,
+                 startId: int = 1) -> Iterator[dict]:
+  """
+  Generate cars with their trips, matching the Car and Trip models.
+
+  Args:
+    count (int): The number of cars.
+    trips (str): The trips per car distribution spec.
+    seed (int, optional): The random seed, for reproducible data.
+    startId (int): The ID of the first car.
+
+  Yields:
+    dict: The next car, with its trips.
+  """
+  rng = random.Random(seed)
+  tripCount = tripCountSampler(trips, rng)
+  size = weightedChoice(rng, SIZES)
+  fuel = weightedChoice(rng, FUELS)
+  doors = weightedChoice(rng, DOORS)
+  transmission = weightedChoice(rng, TRANSMISSIONS)
+
+  for carId in range(startId, startId + count):
+    odometer = rng.randint(0, 50000)
+    carTrips = []
+    for _ in range(tripCount()):
+      distance = rng.randint(1, 300)
+      carTrips.append({
+          "start": odometer,
+          "end": odometer + distance,
+          "description": rng.choice(DESCRIPTIONS)
+      })
+      odometer += distance
+    yield {
+        "id": carId,
+        "size": size(),
+        "fuel": fuel(),
+        "doors": doors(),
+        "transmission": transmission(),
+        "trips": carTrips
+    }
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="Generate synthetic cars and trips as NDJSON")
+  parser.add_argument("--cars", type=int, default=1000)
+  parser.add_argument("--trips",
+                      default="exponential:10",
+                      help="fixed:N, uniform:MIN-MAX or exponential:MEAN")
+  parser.add_argument("--seed", type=int, default=None)
+  parser.add_argument("--start-id", type=int, default=1)
+  parser.add_argument("--out", default="-", help="Output file, - for stdout")
+  args = parser.parse_args()
+
+  output = sys.stdout if args.out == "-" else open(args.out, "w")
+  try:
+    for car in generateCars(args.cars, args.trips, args.seed, args.start_id):
+      output.write(json.dumps(car, separators=(",", ":")))
+      output.write("\n")
+  finally:
+    if output is not sys.stdout:
+      output.close()
+
+
+if __name__ == "__main__":
+  main()